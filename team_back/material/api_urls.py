@@ -1,5 +1,8 @@
 from django.urls import path
 from material import views
+from material import review_queue
+from material import rules
+from material import triage
 
 urlpatterns = [
     # 学生端我的申请路由
@@ -66,9 +69,25 @@ urlpatterns = [
     
     # 管理员/教师相关路由
     path('admin/applications/', views.AdminMaterialApplicationViewSet.as_view({'get': 'list'})),
+    path('admin/applications/batch-review/', views.AdminMaterialApplicationViewSet.as_view({'post': 'batch_review'})),
     path('admin/applications/<uuid:pk>/', views.AdminMaterialApplicationViewSet.as_view({'get': 'retrieve'})),
     path('admin/applications/<uuid:pk>/approve/', views.AdminMaterialApplicationViewSet.as_view({'post': 'approve'})),
     path('admin/applications/<uuid:pk>/reject/', views.AdminMaterialApplicationViewSet.as_view({'post': 'reject'})),
     path('reviews/recent-applications/', views.AdminMaterialApplicationViewSet.as_view({'get': 'recent_applications'})),
     path('reviews/recent-applications/<uuid:pk>/', views.AdminMaterialApplicationViewSet.as_view({'get': 'retrieve'})),
+    path('reviews/inbox/', review_queue.ReviewInboxViewSet.as_view({'get': 'list'})),
+    path('reviews/inbox/count/', review_queue.ReviewInboxViewSet.as_view({'get': 'count'})),
+    path('reviews/inbox/next/', review_queue.ReviewInboxViewSet.as_view({'get': 'next'})),
+    path('reviews/claims/claim/', review_queue.ReviewClaimViewSet.as_view({'post': 'claim'})),
+    path('reviews/claims/release/', review_queue.ReviewClaimViewSet.as_view({'post': 'release'})),
+    path('reviews/claims/throughput/', review_queue.ReviewClaimViewSet.as_view({'get': 'throughput'})),
+    path('reviews/triage/', triage.TriageViewSet.as_view({'get': 'list'})),
+    path('reviews/triage/run/', triage.TriageViewSet.as_view({'post': 'run'})),
+    path('bonus-rules/', rules.BonusRuleViewSet.as_view({'get': 'list', 'post': 'create'})),
+    path('bonus-rules/rescore/', rules.BonusRuleViewSet.as_view({'post': 'rescore'})),
+    path('bonus-rules/shadow/', rules.BonusRuleViewSet.as_view({'post': 'shadow'})),
+    path('bonus-rules/<int:pk>/', rules.BonusRuleViewSet.as_view({'get': 'retrieve'})),
+    path('bonus-rules/<int:pk>/activate/', rules.BonusRuleViewSet.as_view({'post': 'activate'})),
+    path('scoring-rules/', rules.scoring_rules),
+    path('scoring-rules/<int:version>/', rules.scoring_rules),
 ]
\ No newline at end of file
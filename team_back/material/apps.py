@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MaterialConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'material'
+
+    def ready(self):
+        from .attachments import build_attachment_descriptors
+        from .signals import connect_signals
+        connect_signals()
+        build_attachment_descriptors()
@@ -0,0 +1,114 @@
+"""
+申请附件清单：申请保存时生成一次附件列表（名称、URL、文件名），保存在申请和申请索引中，
+列表和详情接口直接读取，不再逐条检查模型字段、解析存储URL
+各申请模型的附件字段在应用启动时确定一次
+"""
+from django.db import models, transaction
+
+from .models import APPLICATION_MODEL_NAMES, APPLICATION_MODELS, ApplicationIndex
+
+
+# 可能保存附件（URL字符串或URL列表）的非文件字段名
+LEGACY_ATTACHMENT_FIELDS = [
+    'attachments', 'score_report', 'screenshot', 'file_url', 'path',
+    'proof_materials', 'materials', 'documents', 'paper_attachments',
+    'academic_paper_attachments', 'document_urls', 'file_urls', 'file_paths',
+    'attachment_urls', 'file', 'proof_file', 'evidence_file',
+    'supporting_document', 'report', 'certificate', 'diploma',
+    'award_certificate', 'competition_certificate', 'volunteer_certificate'
+]
+
+MANIFEST_BATCH_SIZE = 500
+
+# 申请模型 -> ((字段名, 是否为文件字段), ...)，由 build_attachment_descriptors 在应用启动时生成
+ATTACHMENT_DESCRIPTORS = {}
+
+
+def build_attachment_descriptors():
+    """确定各申请模型的附件字段：文件字段，以及名称在 LEGACY_ATTACHMENT_FIELDS 中的其他字段"""
+    for model in APPLICATION_MODELS:
+        descriptors = []
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                descriptors.append((field.name, True))
+            elif field.name in LEGACY_ATTACHMENT_FIELDS:
+                descriptors.append((field.name, False))
+        ATTACHMENT_DESCRIPTORS[model] = tuple(descriptors)
+
+
+def get_attachment_descriptors(model):
+    if model not in ATTACHMENT_DESCRIPTORS:
+        build_attachment_descriptors()
+    return ATTACHMENT_DESCRIPTORS[model]
+
+
+def _is_url(value):
+    return isinstance(value, str) and value.startswith(('http://', 'https://', '/'))
+
+
+def commit_pending_files(application):
+    """先保存新上传的文件，使附件清单中的文件名和URL为最终值（保存申请时不会重复保存）"""
+    for field_name, is_file in get_attachment_descriptors(type(application)):
+        file = getattr(application, field_name) if is_file else None
+        if file and not file._committed:
+            file.save(file.name, file.file, save=False)
+
+
+def build_attachment_manifest(application):
+    """生成附件清单：[{'name', 'url', 'original_name'}]，相同URL只保留一条"""
+    manifest = []
+    seen = set()
+
+    def add(name, url, original_name):
+        if url not in seen:
+            seen.add(url)
+            manifest.append({'name': name, 'url': url, 'original_name': original_name})
+
+    for field_name, is_file in get_attachment_descriptors(type(application)):
+        value = getattr(application, field_name)
+        if not value:
+            continue
+        if is_file:
+            add(field_name, value.url, value.name)
+        elif _is_url(value):
+            add(field_name, value, value.split('/')[-1])
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                if _is_url(item):
+                    add(f"{field_name}_{i+1}", item, item.split('/')[-1])
+    return manifest
+
+
+def get_attachments(application):
+    """申请的附件清单；尚未生成清单的申请（如清单功能上线前的数据）当场生成"""
+    if application.attachment_manifest is not None:
+        return application.attachment_manifest
+    return build_attachment_manifest(application)
+
+
+def rebuild_attachment_manifests(batch_size=MANIFEST_BATCH_SIZE):
+    """重新生成全部申请的附件清单并同步到申请索引，返回 {申请类型: 申请数}"""
+    counts = {}
+    for model in APPLICATION_MODELS:
+        field_names = [field_name for field_name, _ in get_attachment_descriptors(model)]
+        queryset = model.objects.only('id', *field_names).order_by('id')
+        total = 0
+        last_id = None
+        while True:
+            batch = list((queryset.filter(id__gt=last_id) if last_id is not None else queryset)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            for application in batch:
+                application.attachment_manifest = build_attachment_manifest(application)
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ['attachment_manifest'], batch_size=batch_size)
+                ApplicationIndex.objects.bulk_update(
+                    [ApplicationIndex(id=application.id, attachments=application.attachment_manifest)
+                     for application in batch],
+                    ['attachments'],
+                    batch_size=batch_size
+                )
+            total += len(batch)
+        counts[APPLICATION_MODEL_NAMES[model]] = total
+    return counts
@@ -0,0 +1,122 @@
+"""
+批量审核：一次审核多个不同类型的申请
+按类型批量加载并锁定申请、批量检查审核权限，每种申请模型一次 bulk_update，
+之后批量同步申请索引和审核队列，事务提交后将受影响的学生标记为待重算，由重算队列处理
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .index import INDEX_TYPE_MODELS, build_index_entry, get_application_model, save_index_entries
+from .models import ApplicationIndex, ReviewQueueItem
+from .review_queue import STAGE_PERMISSION_CHECKS, requeue_review_items
+
+
+STAGE_NAMES = {
+    'first_review': '一审',
+    'second_review': '二审',
+    'third_review': '三审',
+}
+
+
+def resolve_application_types(application_ids):
+    """申请ID -> 申请模型，优先从申请索引一次查出，索引中没有的逐个查找"""
+    models_by_id = {
+        application_id: INDEX_TYPE_MODELS[application_type]
+        for application_id, application_type in
+        ApplicationIndex.objects.filter(id__in=application_ids).values_list('id', 'application_type')
+    }
+    for application_id in application_ids:
+        if application_id not in models_by_id:
+            model = get_application_model(application_id)
+            if model is not None:
+                models_by_id[application_id] = model
+    return models_by_id
+
+
+def get_review_changes(application, reviewer, stage, result, review_comment, bonus_points):
+    """某一审核阶段需要写入的字段；一审通过时指定的分数直接作为加分，二审、三审取最低分"""
+    if stage == 'first_review':
+        changes, _ = application.first_review_changes(reviewer, result, review_comment)
+        if result == 'passed' and bonus_points is not None:
+            changes['bonus_points'] = bonus_points
+    elif stage == 'second_review':
+        changes, _ = application.second_review_changes(reviewer, result, review_comment, bonus_points)
+    else:
+        changes, _ = application.third_review_changes(reviewer, result, review_comment, bonus_points)
+    return application.prepare_review_changes(changes)
+
+
+def batch_review(reviewer, application_ids, stage, result, review_comment='', bonus_points=None,
+                 check_permission=True):
+    """
+    批量执行同一审核阶段的审核
+    check_permission 为 False 时（如规则自动审核）只检查申请是否处于该审核阶段，reviewer 可以为 None
+    返回与 application_ids 顺序一致的结果列表：[{'id', 'success', 'review_status' 或 'error'}]
+    """
+    application_ids = list(dict.fromkeys(application_ids))
+    results = {application_id: {'id': str(application_id), 'success': False} for application_id in application_ids}
+    models_by_id = resolve_application_types(application_ids)
+    ids_by_model = defaultdict(list)
+    for application_id, model in models_by_id.items():
+        ids_by_model[model].append(application_id)
+
+    permission_check = STAGE_PERMISSION_CHECKS[stage]
+    reviewer_id = reviewer.id if reviewer else None
+    reviewed = []
+    affects_score = set()
+    with transaction.atomic():
+        # 被其他老师领取且租约未到期的申请不能审核
+        leased = set(
+            ReviewQueueItem.objects
+            .filter(id__in=application_ids, lease_expires_at__gt=timezone.now())
+            .exclude(leased_by_id=reviewer_id)
+            .values_list('id', flat=True)
+        )
+        for model, ids in ids_by_model.items():
+            applications = (
+                model.objects
+                .select_related('user')
+                .select_for_update(of=('self',))
+                .filter(id__in=ids)
+            )
+            updated = []
+            fields = set()
+            for application in applications:
+                if application.id in leased:
+                    results[application.id]['error'] = "该申请已被其他老师领取"
+                    continue
+                if check_permission:
+                    allowed = getattr(application, permission_check)(reviewer)
+                else:
+                    allowed = application.get_current_review_stage() == stage
+                if not allowed:
+                    results[application.id]['error'] = f"当前状态无法进行{STAGE_NAMES[stage]}"
+                    continue
+                old_status = application.review_status
+                changes = get_review_changes(application, reviewer, stage, result, review_comment, bonus_points)
+                for field, value in changes.items():
+                    setattr(application, field, value)
+                fields.update(changes)
+                updated.append(application)
+                if 'approved' in (old_status, application.review_status):
+                    affects_score.add(application.user_id)
+                results[application.id].update(success=True, review_status=application.review_status)
+            if updated:
+                model.objects.bulk_update(updated, sorted(fields), batch_size=500)
+                reviewed.extend(updated)
+
+        # bulk_update 不触发信号：在同一事务中批量同步申请索引、审核队列，提交后将受影响的学生标记为待重算
+        if reviewed:
+            save_index_entries([build_index_entry(application, application.user) for application in reviewed])
+            requeue_review_items(reviewed)
+        if affects_score:
+            from score.incremental import mark_students_dirty
+            transaction.on_commit(lambda: mark_students_dirty(affects_score))
+
+    for application_id, item in results.items():
+        if not item['success'] and 'error' not in item:
+            item['error'] = "申请不存在"
+
+    return [results[application_id] for application_id in application_ids]
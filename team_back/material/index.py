@@ -0,0 +1,191 @@
+"""
+申请索引（application_index）：12类申请的统一只读视图
+申请保存或删除时由信号同步，也可以用 rebuild_application_index 命令全量重建
+"""
+from django.core.cache import cache
+from django.db import models, transaction
+
+from .models import APPLICATION_MODEL_NAMES, APPLICATION_MODELS, ApplicationIndex
+
+
+# 前端展示使用的申请类别
+CATEGORY_MAP = {
+    'english_scores': 'english',
+    'academic_papers': 'academic_paper',
+    'patent_works': 'patent_work',
+    'academic_competitions': 'academic_competition',
+    'innovation_projects': 'innovation',
+    'ccf_csp_certifications': 'ccf_csp',
+    'international_internships': 'internship',
+    'military_services': 'military',
+    'volunteer_services': 'volunteer_service',
+    'honorary_titles': 'honor',
+    'social_works': 'social',
+    'sports_competitions': 'sports_competition'
+}
+
+# 同步到索引的字段
+INDEX_FIELDS = [
+    'application_type', 'title', 'user', 'student_name', 'student_school_id', 'college', 'clazz',
+    'review_status', 'estimated_score', 'bonus_points',
+    'first_reviewer_id', 'second_reviewer_id', 'third_reviewer_id', 'attachments', 'created_at', 'updated_at'
+]
+
+INDEX_BATCH_SIZE = 1000
+
+# 申请类型标识 -> 模型
+INDEX_TYPE_MODELS = {model_name: model for model, model_name in APPLICATION_MODEL_NAMES.items()}
+
+# 申请ID对应的类型不会改变，缓存较长时间
+# 使用 Django 默认缓存：未配置 CACHES 时为各进程各自的内存缓存，未命中时查询申请索引（一次主键查询）
+APPLICATION_TYPE_CACHE_PREFIX = 'material:application_type:'
+APPLICATION_TYPE_CACHE_TIMEOUT = 7 * 24 * 3600
+
+# 加载申请详情时一并加载的关联对象
+APPLICATION_RELATED_FIELDS = ['user__college', 'user__clazz', 'first_reviewer', 'second_reviewer', 'third_reviewer']
+
+
+def get_application_title(application, model_name=None):
+    """申请的项目名称"""
+    model_name = model_name or APPLICATION_MODEL_NAMES[type(application)]
+    if model_name == 'english_scores':
+        return f"{application.get_exam_type_display()}"
+    elif model_name == 'academic_papers':
+        return application.paper_title or "学术论文加分申请"
+    elif model_name == 'patent_works':
+        return application.paper_title or "专利著作加分申请"
+    elif model_name == 'academic_competitions':
+        return application.competition_specific_name or application.competition_name or "学业竞赛加分申请"
+    elif model_name == 'innovation_projects':
+        return application.project_name or "创新项目加分申请"
+    elif model_name == 'ccf_csp_certifications':
+        return f"CCF CSP认证_{application.score}"
+    elif model_name == 'international_internships':
+        return application.organization_name or "国际实习加分申请"
+    elif model_name == 'military_services':
+        return "参军入伍服兵役加分申请_一年以上两年以内"
+    elif model_name == 'volunteer_services':
+        return application.activity_name or "志愿服务加分申请"
+    elif model_name == 'honorary_titles':
+        return application.title_name or "荣誉称号加分申请"
+    elif model_name == 'social_works':
+        return application.organization or "社会工作加分申请"
+    elif model_name == 'sports_competitions':
+        return application.competition_name or "体育竞赛加分申请"
+    return ""
+
+
+def build_index_entry(application, student=None):
+    """由申请对象生成索引记录；student 为申请所属学生（已加载时传入，避免额外查询）"""
+    model_name = APPLICATION_MODEL_NAMES[type(application)]
+    student = student or application.user
+    return ApplicationIndex(
+        id=application.id,
+        application_type=model_name,
+        title=(get_application_title(application, model_name) or '')[:255],
+        user_id=application.user_id,
+        student_name=student.name or '',
+        student_school_id=student.school_id or '',
+        college_id=student.college_id,
+        clazz_id=student.clazz_id,
+        review_status=application.review_status,
+        estimated_score=application.estimated_score or 0,
+        bonus_points=application.bonus_points or 0,
+        first_reviewer_id=application.first_reviewer_id,
+        second_reviewer_id=application.second_reviewer_id,
+        third_reviewer_id=application.third_reviewer_id,
+        attachments=application.attachment_manifest,
+        created_at=application.created_at,
+        updated_at=application.updated_at
+    )
+
+
+def save_index_entries(entries, batch_size=INDEX_BATCH_SIZE):
+    """批量写入索引记录（已存在则更新）"""
+    ApplicationIndex.objects.bulk_create(
+        entries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=INDEX_FIELDS
+    )
+
+
+def sync_application(application):
+    """同步单个申请"""
+    save_index_entries([build_index_entry(application)])
+
+
+def remove_application(application_id):
+    ApplicationIndex.objects.filter(id=application_id).delete()
+
+
+def sync_student(student):
+    """学生姓名、学号、学院、班级变化时同步其全部申请"""
+    ApplicationIndex.objects.filter(user_id=student.id).update(
+        student_name=student.name or '',
+        student_school_id=student.school_id or '',
+        college_id=student.college_id,
+        clazz_id=student.clazz_id
+    )
+
+
+def rebuild_application_index(batch_size=INDEX_BATCH_SIZE):
+    """全量重建索引，返回 {申请类型: 记录数}"""
+    counts = {}
+    with transaction.atomic():
+        ApplicationIndex.objects.all().delete()
+        for model in APPLICATION_MODELS:
+            entries = []
+            total = 0
+            for application in model.objects.select_related('user').iterator(chunk_size=batch_size):
+                entries.append(build_index_entry(application, application.user))
+                if len(entries) >= batch_size:
+                    ApplicationIndex.objects.bulk_create(entries, batch_size=batch_size)
+                    total += len(entries)
+                    entries = []
+            if entries:
+                ApplicationIndex.objects.bulk_create(entries, batch_size=batch_size)
+                total += len(entries)
+            counts[APPLICATION_MODEL_NAMES[model]] = total
+    return counts
+
+
+def get_application_model(application_id):
+    """
+    根据申请ID找到对应的申请模型，找不到时返回 None
+    依次查找：本进程缓存（配置了共享缓存时为共享缓存） -> 申请索引 -> 12张申请表的 UNION 查询（索引尚未重建的申请）
+    """
+    key = f'{APPLICATION_TYPE_CACHE_PREFIX}{application_id}'
+    model_name = cache.get(key)
+    if model_name is None:
+        model_name = ApplicationIndex.objects.filter(id=application_id).values_list('application_type', flat=True).first()
+        if model_name is None:
+            queries = [
+                model.objects.filter(id=application_id)
+                .annotate(application_type=models.Value(name, output_field=models.CharField()))
+                .values_list('application_type', flat=True)
+                for model, name in APPLICATION_MODEL_NAMES.items()
+            ]
+            model_name = next(iter(queries[0].union(*queries[1:], all=True)), None)
+        if model_name is None:
+            return None
+        cache.set(key, model_name, APPLICATION_TYPE_CACHE_TIMEOUT)
+    return INDEX_TYPE_MODELS.get(model_name)
+
+
+def get_application(application_id, **filters):
+    """
+    按ID加载任意类型的申请及其学生、班级、学院和审核人
+    返回 (申请, 模型)，不存在时返回 (None, None)
+    """
+    model = get_application_model(application_id)
+    if model is None:
+        return None, None
+    application = (
+        model.objects
+        .select_related(*APPLICATION_RELATED_FIELDS)
+        .filter(id=application_id, **filters)
+        .first()
+    )
+    return (application, model) if application else (None, None)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from material.index import INDEX_BATCH_SIZE, rebuild_application_index
+
+
+class Command(BaseCommand):
+    help = '根据12类申请全量重建申请索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=INDEX_BATCH_SIZE, help='每批写入的记录数')
+
+    def handle(self, *args, **options):
+        counts = rebuild_application_index(options['batch_size'])
+        for application_type, count in counts.items():
+            self.stdout.write(f"{application_type}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"申请索引重建完成，共{sum(counts.values())}条"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from material.attachments import MANIFEST_BATCH_SIZE, rebuild_attachment_manifests
+
+
+class Command(BaseCommand):
+    help = '重新生成全部申请的附件清单（存储位置或媒体URL变化后执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MANIFEST_BATCH_SIZE, help='每批处理的申请数')
+
+    def handle(self, *args, **options):
+        counts = rebuild_attachment_manifests(options['batch_size'])
+        for application_type, count in counts.items():
+            self.stdout.write(f"{application_type}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"附件清单生成完成，共{sum(counts.values())}条"))
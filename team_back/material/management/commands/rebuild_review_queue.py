@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from material.index import INDEX_BATCH_SIZE
+from material.review_queue import rebuild_review_queue
+
+
+class Command(BaseCommand):
+    help = '根据12类申请的审核状态全量重建审核队列'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=INDEX_BATCH_SIZE, help='每批写入的记录数')
+
+    def handle(self, *args, **options):
+        counts = rebuild_review_queue(options['batch_size'])
+        for stage, count in counts.items():
+            self.stdout.write(f"{stage}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"审核队列重建完成，共{sum(counts.values())}条"))
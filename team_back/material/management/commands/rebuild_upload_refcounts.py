@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from material.uploads import REFCOUNT_BATCH_SIZE, rebuild_blob_refcounts
+
+
+class Command(BaseCommand):
+    help = '按申请中的实际引用重算上传文件的引用次数，并删除无人引用的文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age-hours', type=int, default=24,
+                            help='只删除上传超过该小时数的无引用文件（给尚未提交申请的上传留出时间）')
+        parser.add_argument('--batch-size', type=int, default=REFCOUNT_BATCH_SIZE, help='每批读取的记录数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不修改引用次数、不删除文件')
+
+    def handle(self, *args, **options):
+        report = rebuild_blob_refcounts(
+            min_age=timedelta(hours=options['min_age_hours']),
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            f"上传文件{report['blobs']}个，更新引用次数{report['updated']}个，"
+            f"删除{report['deleted']}个，释放{report['freed_bytes']}字节，"
+            f"重算期间有变化而跳过{report['skipped']}个"
+        )
+        self.stdout.write(self.style.SUCCESS('预览完成' if report['dry_run'] else '引用次数重算完成'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from material.models import BonusRuleVersion
+from material.rules import RESCORE_BATCH_SIZE, get_active_rules, get_rules, rescore_applications
+
+
+class Command(BaseCommand):
+    help = '按加分规则重新计算待一审申请的加分'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', action='append', dest='application_types', help='只重算指定申请类型（可重复）')
+        parser.add_argument('--rule-version', type=int, help='使用的加分规则版本，默认为当前生效版本')
+        parser.add_argument('--batch-size', type=int, default=RESCORE_BATCH_SIZE, help='每批处理的申请数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计加分变化的申请数，不写入')
+
+    def handle(self, *args, **options):
+        try:
+            rules = get_rules(options['rule_version']) if options['rule_version'] is not None else get_active_rules()
+            report = rescore_applications(
+                application_types=options['application_types'],
+                rules=rules,
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run']
+            )
+        except BonusRuleVersion.DoesNotExist:
+            raise CommandError(f"加分规则版本 {options['rule_version']} 不存在")
+        except ValueError as e:
+            raise CommandError(str(e))
+        for application_type, item in report.items():
+            self.stdout.write(f"{application_type}: 扫描{item['scanned']}条，加分变化{item['updated']}条")
+        self.stdout.write(self.style.SUCCESS(f"加分规则版本 {rules.version} 重算完成"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from material.triage import TRIAGE_BATCH_SIZE, run_triage
+
+
+class Command(BaseCommand):
+    help = '按规则自动通过可由机器核验的申请的一审'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rule', action='append', dest='rules', help='只执行指定规则（可重复）')
+        parser.add_argument('--batch-size', type=int, default=TRIAGE_BATCH_SIZE, help='每批扫描的申请数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计命中情况，不写入')
+
+    def handle(self, *args, **options):
+        try:
+            report = run_triage(
+                rule_names=options['rules'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        for name, hits in report['rules'].items():
+            self.stdout.write(f"{name}: {hits}")
+        self.stdout.write(self.style.SUCCESS(
+            f"扫描{report['scanned']}条，通过{report['advanced']}条，留待人工审核{report['left_for_review']}条，"
+            f"耗时{report['elapsed_seconds']}秒"
+        ))
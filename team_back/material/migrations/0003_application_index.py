@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('material', '0002_initial'),
+        ('user', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationIndex',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('application_type', models.CharField(max_length=40, verbose_name='申请类型')),
+                ('title', models.CharField(blank=True, default='', max_length=255, verbose_name='项目名称')),
+                ('student_name', models.CharField(blank=True, default='', max_length=100, verbose_name='学生姓名')),
+                ('student_school_id', models.CharField(blank=True, default='', max_length=50, verbose_name='学号')),
+                ('review_status', models.CharField(max_length=20, verbose_name='审核状态')),
+                ('estimated_score', models.DecimalField(decimal_places=4, default=0, max_digits=7, verbose_name='预估分数')),
+                ('bonus_points', models.DecimalField(decimal_places=4, default=0, max_digits=7, verbose_name='加分')),
+                ('first_reviewer_id', models.UUIDField(blank=True, null=True, verbose_name='一审人')),
+                ('second_reviewer_id', models.UUIDField(blank=True, null=True, verbose_name='二审人')),
+                ('third_reviewer_id', models.UUIDField(blank=True, null=True, verbose_name='三审人')),
+                ('created_at', models.DateTimeField(verbose_name='申请时间')),
+                ('updated_at', models.DateTimeField(verbose_name='更新时间')),
+                ('clazz', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='user.class', verbose_name='班级')),
+                ('college', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='user.college', verbose_name='学院')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='application_index', to=settings.AUTH_USER_MODEL, verbose_name='学生')),
+            ],
+            options={
+                'verbose_name': '申请索引',
+                'verbose_name_plural': '申请索引',
+                'db_table': 'application_index',
+                'indexes': [models.Index(fields=['created_at'], name='application_created_0cde93_idx'), models.Index(fields=['review_status', 'created_at'], name='application_review__ca796a_idx'), models.Index(fields=['college', 'review_status', 'created_at'], name='application_college_349dfd_idx'), models.Index(fields=['application_type', 'created_at'], name='application_applica_e67bb5_idx'), models.Index(fields=['user', 'created_at'], name='application_user_id_1509c3_idx'), models.Index(fields=['first_reviewer_id'], name='application_first_r_cd2d22_idx'), models.Index(fields=['second_reviewer_id'], name='application_second__082ad9_idx'), models.Index(fields=['third_reviewer_id'], name='application_third_r_c69fb7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('material', '0003_application_index'),
+        ('user', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewQueueItem',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('application_type', models.CharField(max_length=40, verbose_name='申请类型')),
+                ('title', models.CharField(blank=True, default='', max_length=255, verbose_name='项目名称')),
+                ('stage', models.CharField(choices=[('first_review', '一审'), ('second_review', '二审'), ('third_review', '三审')], max_length=20, verbose_name='审核阶段')),
+                ('review_status', models.CharField(max_length=20, verbose_name='审核状态')),
+                ('student_name', models.CharField(blank=True, default='', max_length=100, verbose_name='学生姓名')),
+                ('student_school_id', models.CharField(blank=True, default='', max_length=50, verbose_name='学号')),
+                ('estimated_score', models.DecimalField(decimal_places=4, default=0, max_digits=7, verbose_name='预估分数')),
+                ('first_reviewer_id', models.UUIDField(blank=True, null=True, verbose_name='一审人')),
+                ('second_reviewer_id', models.UUIDField(blank=True, null=True, verbose_name='二审人')),
+                ('entered_at', models.DateTimeField(verbose_name='进入当前阶段时间')),
+                ('created_at', models.DateTimeField(verbose_name='申请时间')),
+                ('college', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='user.college', verbose_name='学院')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_queue_items', to=settings.AUTH_USER_MODEL, verbose_name='学生')),
+            ],
+            options={
+                'verbose_name': '审核队列',
+                'verbose_name_plural': '审核队列',
+                'db_table': 'review_queue',
+                'indexes': [models.Index(fields=['college', 'entered_at', 'id'], name='review_queue_college_idx'), models.Index(fields=['entered_at', 'id'], name='review_queue_entered_idx'), models.Index(condition=models.Q(('stage', 'first_review')), fields=['college', 'entered_at', 'id'], name='review_queue_first_idx'), models.Index(condition=models.Q(('stage', 'second_review')), fields=['college', 'entered_at', 'id'], name='review_queue_second_idx'), models.Index(condition=models.Q(('stage', 'third_review')), fields=['college', 'entered_at', 'id'], name='review_queue_third_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('material', '0004_review_queue'),
+        ('user', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewqueueitem',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='领取到期时间'),
+        ),
+        migrations.AddField(
+            model_name='reviewqueueitem',
+            name='leased_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='领取人'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewqueueitem',
+            index=models.Index(fields=['leased_by', 'lease_expires_at'], name='review_queue_lease_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('material', '0005_review_queue_lease'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BonusRuleVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(unique=True, verbose_name='版本号')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='说明')),
+                ('tables', models.JSONField(verbose_name='加分表')),
+                ('checksum', models.CharField(max_length=64, verbose_name='加分表校验和')),
+                ('is_active', models.BooleanField(default=False, verbose_name='是否生效')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True, verbose_name='生效时间')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bonus_rule_versions', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '加分规则版本',
+                'verbose_name_plural': '加分规则版本',
+                'db_table': 'bonus_rule_version',
+                'ordering': ['-version'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='single_active_bonus_rule_version')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('material', '0006_bonus_rule_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academiccompetition',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='academicpaper',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='applicationindex',
+            name='attachments',
+            field=models.JSONField(blank=True, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='ccfcspcertification',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='englishscore',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='honorarytitle',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='innovationproject',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='internationalinternship',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='militaryservice',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='patentwork',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='socialwork',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='sportscompetition',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+        migrations.AddField(
+            model_name='volunteerservice',
+            name='attachment_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='附件清单'),
+        ),
+    ]
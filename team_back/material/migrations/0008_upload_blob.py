@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:26
+
+import material.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('material', '0007_attachment_manifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='内容哈希')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='存储路径')),
+                ('size', models.BigIntegerField(verbose_name='文件大小')),
+                ('ref_count', models.PositiveIntegerField(default=1, verbose_name='引用次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': '上传文件',
+                'verbose_name_plural': '上传文件',
+                'db_table': 'upload_blob',
+            },
+        ),
+        migrations.AlterField(
+            model_name='academiccompetition',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='academic_expertise/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='academicpaper',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='academic_expertise/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='ccfcspcertification',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='academic_expertise/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='englishscore',
+            name='score_report',
+            field=models.FileField(storage=material.uploads.ContentAddressedStorage(), upload_to='english_scores/%Y/%m/%d/', verbose_name='成绩报告单'),
+        ),
+        migrations.AlterField(
+            model_name='honorarytitle',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='comprehensive_performance/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='innovationproject',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='academic_expertise/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='internationalinternship',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='comprehensive_performance/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='militaryservice',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='comprehensive_performance/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='patentwork',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='academic_expertise/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='socialwork',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='comprehensive_performance/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='sportscompetition',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='comprehensive_performance/%Y/%m/%d/', verbose_name='截图'),
+        ),
+        migrations.AlterField(
+            model_name='volunteerservice',
+            name='screenshot',
+            field=models.FileField(blank=True, null=True, storage=material.uploads.ContentAddressedStorage(), upload_to='comprehensive_performance/%Y/%m/%d/', verbose_name='截图'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 import uuid
 from django.db import models
+from django.db.models.signals import post_save
 from django.utils import timezone
 
-from user.models import User
+from user.models import Class, College, User
+from .uploads import upload_storage
 
 
 class ReviewMixin(models.Model):
@@ -88,130 +90,167 @@ class ReviewMixin(models.Model):
         verbose_name='加分'
     )
     college_opinion = models.TextField(blank=True, null=True, verbose_name='学院意见')
+    # 附件清单，保存时生成（见 material/attachments.py）
+    attachment_manifest = models.JSONField(blank=True, null=True, editable=False, verbose_name='附件清单')
 
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        """保存时生成附件清单"""
+        from .attachments import build_attachment_manifest, commit_pending_files
+        commit_pending_files(self)
+        self.attachment_manifest = build_attachment_manifest(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'attachment_manifest'}
+        super().save(*args, **kwargs)
+
+    # 各审核阶段可以进行审核的状态
+    FIRST_REVIEW_STATUSES = ['pending', 'first_reviewing']
+    SECOND_REVIEW_STATUSES = ['first_approved', 'second_reviewing']
+    THIRD_REVIEW_STATUSES = ['second_approved', 'third_reviewing']
+
     def get_current_review_stage(self):
         """获取当前审核阶段"""
-        if self.review_status in ['pending', 'first_reviewing']:
+        if self.review_status in self.FIRST_REVIEW_STATUSES:
             return 'first_review'
-        elif self.review_status in ['first_approved', 'second_reviewing']:
+        elif self.review_status in self.SECOND_REVIEW_STATUSES:
             return 'second_review'
-        elif self.review_status in ['second_approved', 'third_reviewing']:
+        elif self.review_status in self.THIRD_REVIEW_STATUSES:
             return 'third_review'
         else:
             return 'completed'
 
-    def can_first_review(self, reviewer):
-        """检查是否可以一审"""
-        if (reviewer.user_type in ['teacher', 'admin'] and
-                self.review_status in ['pending', 'first_reviewing']):
+    def _can_review(self, reviewer, statuses):
+        if reviewer.user_type in ['teacher', 'admin'] and self.review_status in statuses:
             # 管理员可以审核所有申请
             if reviewer.user_type == 'admin':
                 return True
             # 教师只能审核自己学院的学生申请
-            return reviewer.college == self.user.college
+            return reviewer.college_id == self.user.college_id
         return False
 
+    def can_first_review(self, reviewer):
+        """检查是否可以一审"""
+        return self._can_review(reviewer, self.FIRST_REVIEW_STATUSES)
+
     def can_second_review(self, reviewer):
         """检查是否可以二审"""
-        if (reviewer.user_type in ['teacher', 'admin'] and
-                self.review_status in ['first_approved', 'second_reviewing']):
-            # 管理员可以审核所有申请
-            if reviewer.user_type == 'admin':
-                return True
-            # 教师只能审核自己学院的学生申请
-            return reviewer.college == self.user.college
-        return False
+        return self._can_review(reviewer, self.SECOND_REVIEW_STATUSES)
 
     def can_third_review(self, reviewer):
         """检查是否可以三审"""
-        if (reviewer.user_type in ['teacher', 'admin'] and
-                self.review_status in ['second_approved', 'third_reviewing']):
-            # 管理员可以审核所有申请
-            if reviewer.user_type == 'admin':
-                return True
-            # 教师只能审核自己学院的学生申请
-            return reviewer.college == self.user.college
-        return False
+        return self._can_review(reviewer, self.THIRD_REVIEW_STATUSES)
+
+    def prepare_review_changes(self, changes):
+        """补充状态转换时一并写入的字段：没有加分时按申请内容计算（与 save() 一致），以及更新时间"""
+        if hasattr(self, 'calculate_bonus_points') and not changes.get('bonus_points', self.bonus_points):
+            changes['bonus_points'] = self.calculate_bonus_points()
+        if any(field.name == 'updated_at' for field in self._meta.concrete_fields):
+            changes['updated_at'] = timezone.now()
+        return changes
+
+    def compare_and_set(self, expected_statuses, **changes):
+        """
+        原子地执行审核状态转换：UPDATE ... WHERE id = ? AND review_status IN (expected_statuses)，只写入变化的字段
+        成功时更新当前对象并发送 post_save 信号（同步申请索引、审核队列，标记成绩重算），返回 True；
+        审核状态已被其他审核人改变时不写入，返回 False
+        """
+        model = type(self)
+        self.prepare_review_changes(changes)
+        updated = model.objects.filter(pk=self.pk, review_status__in=expected_statuses).update(**changes)
+        if not updated:
+            return False
+        for field, value in changes.items():
+            setattr(self, field, value)
+        post_save.send(
+            sender=model, instance=self, created=False, update_fields=frozenset(changes),
+            raw=False, using=self._state.db or 'default'
+        )
+        return True
+
+    @staticmethod
+    def _lowest_bonus_points(current, bonus_points):
+        """取最低分：如果已有分数，取两者中的最小值；否则使用当前分数"""
+        if bonus_points is None:
+            return current
+        return min(current, bonus_points) if current > 0 else bonus_points
+
+    def first_review_changes(self, reviewer, result, review_comment=""):
+        """一审需要写入的字段，返回 (字段, 提示信息)"""
+        changes = {
+            'first_reviewer': reviewer,
+            'first_review_comment': review_comment,
+            'first_reviewed_at': timezone.now(),
+        }
+        if result == 'passed':
+            changes['review_status'] = 'first_approved'
+            # 一审通过时，默认使用预估分数作为加分
+            # 如果后续有更低的分数，会在二审或三审时被覆盖
+            if self.estimated_score > 0 and self.bonus_points <= 0:
+                changes['bonus_points'] = self.estimated_score
+            return changes, "一审通过，等待二审"
+        changes['review_status'] = 'first_rejected'
+        changes['result'] = 'failed'
+        return changes, "一审不通过"
+
+    def second_review_changes(self, reviewer, result, review_comment="", bonus_points=None):
+        """二审需要写入的字段，返回 (字段, 提示信息)"""
+        changes = {
+            'second_reviewer': reviewer,
+            'second_review_comment': review_comment,
+            'second_reviewed_at': timezone.now(),
+        }
+        if result == 'passed':
+            changes['review_status'] = 'second_approved'
+            changes['bonus_points'] = self._lowest_bonus_points(self.bonus_points, bonus_points)
+            return changes, "二审通过，等待三审"
+        changes['review_status'] = 'second_rejected'
+        changes['result'] = 'failed'
+        return changes, "二审不通过"
+
+    def third_review_changes(self, reviewer, result, review_comment="", bonus_points=None):
+        """三审需要写入的字段，返回 (字段, 提示信息)"""
+        changes = {
+            'third_reviewer': reviewer,
+            'third_review_comment': review_comment,
+            'third_reviewed_at': timezone.now(),
+        }
+        if result == 'passed':
+            changes['review_status'] = 'approved'
+            changes['result'] = 'passed'
+            changes['bonus_points'] = self._lowest_bonus_points(self.bonus_points, bonus_points)
+            return changes, "三审通过"
+        changes['review_status'] = 'rejected'
+        changes['result'] = 'failed'
+        return changes, "三审不通过"
 
     def perform_first_review(self, reviewer, result, review_comment=""):
         """执行一审"""
         if not self.can_first_review(reviewer):
             return False, "当前状态无法进行一审"
-
-        self.first_reviewer = reviewer
-        self.first_review_comment = review_comment
-        self.first_reviewed_at = timezone.now()
-
-        if result == 'passed':
-            self.review_status = 'first_approved'
-            # 一审通过时，默认使用预估分数作为加分
-            # 如果后续有更低的分数，会在二审或三审时被覆盖
-            if hasattr(self, 'estimated_score') and self.estimated_score > 0:
-                if not hasattr(self, 'bonus_points') or self.bonus_points <= 0:
-                    self.bonus_points = self.estimated_score
-            message = "一审通过，等待二审"
-        else:
-            self.review_status = 'first_rejected'
-            self.result = 'failed'
-            message = "一审不通过"
-
-        self.save()
+        changes, message = self.first_review_changes(reviewer, result, review_comment)
+        if not self.compare_and_set(self.FIRST_REVIEW_STATUSES, **changes):
+            return False, "申请已被其他老师审核，请刷新后重试"
         return True, message
 
     def perform_second_review(self, reviewer, result, review_comment="", bonus_points=None):
         """执行二审"""
         if not self.can_second_review(reviewer):
             return False, "当前状态无法进行二审"
-
-        self.second_reviewer = reviewer
-        self.second_review_comment = review_comment
-        self.second_reviewed_at = timezone.now()
-
-        if result == 'passed':
-            self.review_status = 'second_approved'
-            if bonus_points is not None:
-                # 取最低分：如果已有分数，取两者中的最小值；否则使用当前分数
-                if self.bonus_points > 0:
-                    self.bonus_points = min(self.bonus_points, bonus_points)
-                else:
-                    self.bonus_points = bonus_points
-            message = "二审通过，等待三审"
-        else:
-            self.review_status = 'second_rejected'
-            self.result = 'failed'
-            message = "二审不通过"
-
-        self.save()
+        changes, message = self.second_review_changes(reviewer, result, review_comment, bonus_points)
+        if not self.compare_and_set(self.SECOND_REVIEW_STATUSES, **changes):
+            return False, "申请已被其他老师审核，请刷新后重试"
         return True, message
 
     def perform_third_review(self, reviewer, result, review_comment="", bonus_points=None):
         """执行三审"""
         if not self.can_third_review(reviewer):
             return False, "当前状态无法进行三审"
-
-        self.third_reviewer = reviewer
-        self.third_review_comment = review_comment
-        self.third_reviewed_at = timezone.now()
-
-        if result == 'passed':
-            self.review_status = 'approved'
-            self.result = 'passed'
-            if bonus_points is not None:
-                # 取最低分：如果已有分数，取两者中的最小值；否则使用当前分数
-                if self.bonus_points > 0:
-                    self.bonus_points = min(self.bonus_points, bonus_points)
-                else:
-                    self.bonus_points = bonus_points
-            message = "三审通过"
-        else:
-            self.review_status = 'rejected'
-            self.result = 'failed'
-            message = "三审不通过"
-
-        self.save()
+        changes, message = self.third_review_changes(reviewer, result, review_comment, bonus_points)
+        if not self.compare_and_set(self.THIRD_REVIEW_STATUSES, **changes):
+            return False, "申请已被其他老师审核，请刷新后重试"
         return True, message
 
 
@@ -244,6 +283,7 @@ class EnglishScore(ReviewMixin):
     # 成绩证明
     score_report = models.FileField(
         upload_to='english_scores/%Y/%m/%d/',
+        storage=upload_storage,
         verbose_name='成绩报告单'
     )
 
@@ -303,67 +343,61 @@ class EnglishScore(ReviewMixin):
     def get_application_type_display(self):
         return "英语成绩"
 
-    def perform_first_review(self, reviewer, result, review_comment=""):
-        """英语成绩一审"""
-        if not self.can_first_review(reviewer):
-            return False, "当前状态无法进行一审"
-
-        self.first_reviewer = reviewer
-        self.first_review_comment = review_comment
-        self.first_reviewed_at = timezone.now()
+    # 英语成绩只有两级审核：二审通过即审核通过
+    THIRD_REVIEW_STATUSES = []
 
+    def first_review_changes(self, reviewer, result, review_comment=""):
+        """英语成绩一审"""
+        changes = {
+            'first_reviewer': reviewer,
+            'first_review_comment': review_comment,
+            'first_reviewed_at': timezone.now(),
+        }
         if result == 'passed':
-            self.review_status = 'first_approved'
+            changes['review_status'] = 'first_approved'
             # 一审通过时设置是否达标
-            passing_score = 425
-            self.meets_standard = self.exam_score >= passing_score
+            changes['meets_standard'] = self.exam_score >= self.get_passing_score(self.exam_type)
             # 英语成绩不加分，设置为0
-            self.bonus_points = 0
-            message = "一审通过，等待二审"
-        else:
-            self.review_status = 'first_rejected'
-            self.meets_standard = False
-            self.result = 'failed'
-            message = "一审不通过"
-
-        self.save()
-        return True, message
-
-    def perform_second_review(self, reviewer, result, review_comment="", bonus_points=None):
+            changes['bonus_points'] = 0
+            return changes, "一审通过，等待二审"
+        changes['review_status'] = 'first_rejected'
+        changes['meets_standard'] = False
+        changes['result'] = 'failed'
+        return changes, "一审不通过"
+
+    def second_review_changes(self, reviewer, result, review_comment="", bonus_points=None):
         """英语成绩二审"""
-        if not self.can_second_review(reviewer):
-            return False, "当前状态无法进行二审"
+        changes = {
+            'second_reviewer': reviewer,
+            'second_review_comment': review_comment,
+            'second_reviewed_at': timezone.now(),
+        }
+        if result == 'passed':
+            changes['review_status'] = 'approved'
+            changes['result'] = 'passed'
+            changes['bonus_points'] = self._lowest_bonus_points(self.bonus_points, bonus_points)
+            return changes, "二审通过"
+        changes['review_status'] = 'rejected'
+        changes['result'] = 'failed'
+        return changes, "二审不通过"
 
-        self.second_reviewer = reviewer
-        self.second_review_comment = review_comment
-        self.second_reviewed_at = timezone.now()
 
-        if result == 'passed':
-            self.review_status = 'approved'
-            self.result = 'passed'
-            if bonus_points is not None:
-                # 取最低分：如果已有分数，取两者中的最小值；否则使用当前分数
-                if self.bonus_points > 0:
-                    self.bonus_points = min(self.bonus_points, bonus_points)
-                else:
-                    self.bonus_points = bonus_points
-            message = "二审通过"
-        else:
-            self.review_status = 'rejected'
-            self.result = 'failed'
-            message = "二审不通过"
+# 学术专长基本（移除重复的审核字段和方法）
+class BonusRuleMixin:
+    """按加分规则计算加分的申请，加分表和计算方法见 material/rules.py"""
 
-        self.save()
-        return True, message
+    def calculate_bonus_points(self, rules=None):
+        """按加分表（默认当前生效版本）计算加分"""
+        from .rules import get_active_rules
+        return (rules or get_active_rules()).evaluate(self)
 
 
-# 学术专长基本（移除重复的审核字段和方法）
-class AcademicExpertiseBase(ReviewMixin):
+class AcademicExpertiseBase(BonusRuleMixin, ReviewMixin):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户')
 
     # 通用字段
-    screenshot = models.FileField(upload_to='academic_expertise/%Y/%m/%d/', blank=True, null=True, verbose_name='截图')
+    screenshot = models.FileField(upload_to='academic_expertise/%Y/%m/%d/', storage=upload_storage, blank=True, null=True, verbose_name='截图')
     user_explanation = models.TextField(blank=True, null=True, verbose_name='用户说明')
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -400,74 +434,6 @@ class AcademicPaper(AcademicExpertiseBase):
     def __str__(self):
         return f"{self.user.name}的论文: {self.paper_title}"
     
-    def calculate_bonus_points(self):
-        """根据学术专长成绩加分细则计算学术论文的加分"""
-        bonus_points = 0
-        
-        # 1. 科研成果加分
-        # 期刊/会议分类加分基数
-        category_scores = {
-            'A': 10,
-            'B': 6,
-            'C': 1,
-            'Nature': 20,
-            'Science': 20,
-            'Cell': 20,
-            'Nature *': 20,
-            'Science *': 20,
-            'CELL *': 20
-        }
-        
-        # 获取期刊/会议分类
-        journal_category = self.journal_category or ''
-        
-        # 检查是否是Nature/Science/Cell主刊或子刊
-        is_high_impact = False
-        for high_impact_type in ['Nature', 'Science', 'Cell', 'Nature *', 'Science *', 'CELL *']:
-            if high_impact_type in journal_category:
-                is_high_impact = True
-                break
-        
-        # 根据分类获取加分基数
-        base_score = 0
-        if is_high_impact:
-            base_score = category_scores['Nature']  # 使用Nature的分数作为所有高影响因子期刊的分数
-        elif journal_category in category_scores:
-            base_score = category_scores[journal_category]
-        elif journal_category in ['A+', 'A++']:
-            base_score = category_scores['A']  # A+和A++也按照A类加分
-        
-        # 2. 作者排序加分比例
-        author_ratio = 0
-        if self.is_independent_author:
-            # 独立作者，加100%
-            author_ratio = 1.0
-        elif self.is_co_first_author:
-            # 共同第一作者，加50%
-            author_ratio = 0.5
-        else:
-            # 普通作者，根据排序加分
-            try:
-                rank = int(self.author_rank) if self.author_rank else 0
-                if rank == 1:
-                    # 排序第一的加80%
-                    author_ratio = 0.8
-                elif rank == 2:
-                    # 排序第二的加20%
-                    author_ratio = 0.2
-            except ValueError:
-                # 作者排序不是数字，默认加50%
-                author_ratio = 0.5
-        
-        # 3. 计算最终加分
-        bonus_points = base_score * author_ratio
-        
-        # 4. 确保厦门大学是第一单位
-        if not self.is_xmu_first_unit:
-            bonus_points *= 0  # 不是第一单位，不加分数
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存学术论文时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -507,34 +473,6 @@ class PatentWork(AcademicExpertiseBase):
     def __str__(self):
         return f"{self.user.name}的发明专利: {self.paper_title if hasattr(self, 'paper_title') else '未知'}"
     
-    def calculate_bonus_points(self):
-        """根据学术专长成绩加分细则计算专利著作的加分"""
-        bonus_points = 0
-        
-        # 1. 专利基础加分
-        base_score = 2.0  # 每项国家发明专利授权加2分
-        
-        # 2. 作者类型加分比例
-        author_ratio = 0
-        if self.author_type == 'independent_author':
-            # 独立作者，加100%
-            author_ratio = 1.0
-        elif self.author_type == 'first_author_except_teacher':
-            # 除老师外第一作者，加80%
-            author_ratio = 0.8
-        else:
-            # 其他作者类型，默认加50%
-            author_ratio = 0.5
-        
-        # 3. 计算最终加分
-        bonus_points = base_score * author_ratio
-        
-        # 4. 确保厦门大学是第一单位
-        if not self.is_xmu_first_unit:
-            bonus_points *= 0  # 不是第一单位，不加分数
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存专利著作时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -584,70 +522,6 @@ class AcademicCompetition(AcademicExpertiseBase):
     def __str__(self):
         return f"{self.user.name}的学业竞赛: {self.competition_specific_name or self.competition_name}"
     
-    def calculate_bonus_points(self):
-        """根据学术专长成绩加分细则计算学业竞赛的加分"""
-        bonus_points = 0
-        
-        # 1. 竞赛级别和获奖等级对应加分表
-        competition_scores = {
-            'A+': {
-                'national': {
-                    'first_plus': 30,  # 一等奖及以上
-                    'first': 30,
-                    'second': 15,
-                    'third': 10
-                },
-                'provincial': {
-                    'first_plus': 5,
-                    'first': 5,
-                    'second': 2,
-                    'third': 1
-                }
-            },
-            'A': {
-                'national': {
-                    'first_plus': 15,  # 一等奖及以上
-                    'first': 15,
-                    'second': 10,
-                    'third': 5
-                },
-                'provincial': {
-                    'first_plus': 2,
-                    'first': 2,
-                    'second': 1,
-                    'third': 0.5
-                }
-            },
-            'A-': {
-                'national': {
-                    'first_plus': 10,  # 一等奖及以上
-                    'first': 10,
-                    'second': 5,
-                    'third': 2
-                },
-                'provincial': {
-                    'first_plus': 1,
-                    'first': 1,
-                    'second': 0.5,
-                    'third': 0
-                }
-            }
-        }
-        
-        # 2. 获取竞赛级别和获奖等级
-        competition_level = self.competition_level or 'A'
-        award_level = self.award_level or 'third'
-        
-        # 3. 默认国家级
-        competition_scale = 'national'  # 默认国家级
-        
-        # 4. 根据竞赛级别和获奖等级计算加分
-        if competition_level in competition_scores:
-            scale_scores = competition_scores[competition_level].get(competition_scale, {})
-            bonus_points = scale_scores.get(award_level, 0)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存学业竞赛时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -686,41 +560,6 @@ class InnovationProject(AcademicExpertiseBase):
     def __str__(self):
         return f"{self.user.name}的大创项目: {self.project_name}"
     
-    def calculate_bonus_points(self):
-        """根据学术专长成绩加分细则计算大创项目的加分"""
-        bonus_points = 0
-        
-        # 1. 项目级别加分表
-        project_scores = {
-            'national': {
-                'leader': 1.0,
-                'member': 0.3
-            },
-            'provincial': {
-                'leader': 0.5,
-                'member': 0.2
-            },
-            'university': {
-                'leader': 0.1,
-                'member': 0.05
-            }
-        }
-        
-        # 2. 获取项目级别
-        project_level = self.project_level or 'university'
-        
-        # 3. 判断是否为组长
-        role = 'leader' if self.is_team_leader else 'member'
-        
-        # 4. 计算加分
-        if project_level in project_scores:
-            bonus_points = project_scores[project_level].get(role, 0)
-        
-        # 5. 限制最大加分2分
-        bonus_points = min(bonus_points, 2.0)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存大创项目时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -751,25 +590,6 @@ class CCFCSPCertification(AcademicExpertiseBase):
     def __str__(self):
         return f"{self.user.name}的CCF CSP认证: {self.score}分"
     
-    def calculate_bonus_points(self):
-        """根据学术专长成绩加分细则计算CCF CSP认证的加分"""
-        bonus_points = 0
-        
-        # 1. CSP排名加分表（A-类竞赛标准）
-        csp_scores = {
-            '0.2': 10,  # 排名前0.2%，等同全国一等奖
-            '1.5': 5,   # 排名前1.5%，等同全国二等奖
-            '3': 2      # 排名前3%，等同全国三等奖
-        }
-        
-        # 2. 获取排名百分比
-        rank_percentage = self.csp_rank_percentage or '3'
-        
-        # 3. 计算加分
-        bonus_points = csp_scores.get(rank_percentage, 0)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存CCF CSP认证时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -781,7 +601,7 @@ class CCFCSPCertification(AcademicExpertiseBase):
 
 
 # 综合表现加分基本（移除重复的审核字段和方法）
-class ComprehensivePerformanceBase(ReviewMixin):
+class ComprehensivePerformanceBase(BonusRuleMixin, ReviewMixin):
     LEVELS = [
         ('national', '国家级'),
         ('provincial', '省级'),
@@ -797,7 +617,7 @@ class ComprehensivePerformanceBase(ReviewMixin):
     level = models.CharField(max_length=20, choices=LEVELS, blank=True, null=True, verbose_name='级别')
     working_hours = models.DecimalField(max_digits=7, decimal_places=2, blank=True, null=True, verbose_name='工时数')
     position = models.CharField(max_length=100, blank=True, null=True, verbose_name='工作职位')
-    screenshot = models.FileField(upload_to='comprehensive_performance/%Y/%m/%d/', blank=True, null=True, verbose_name='截图')
+    screenshot = models.FileField(upload_to='comprehensive_performance/%Y/%m/%d/', storage=upload_storage, blank=True, null=True, verbose_name='截图')
     user_explanation = models.TextField(blank=True, null=True, verbose_name='用户说明')
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -831,36 +651,6 @@ class InternationalInternship(ComprehensivePerformanceBase):
     def __str__(self):
         return f"{self.user.name}的国际组织实习: {self.organization_name}"
     
-    def calculate_bonus_points(self):
-        """根据综合表现加分细则计算国际组织实习的加分"""
-        bonus_points = 0
-        
-        # 1. 实习时长加分规则
-        # 假设实习时长以月为单位，或者我们尝试从字符串中提取时长
-        duration_str = self.internship_duration or ''
-        
-        # 简化处理：如果包含"一年"或"12个月"等关键词，加1分
-        if '一年' in duration_str or '12个月' in duration_str:
-            bonus_points = 1.0
-        # 如果包含"半年"或"6个月"等关键词，加0.5分
-        elif '半年' in duration_str or '6个月' in duration_str:
-            bonus_points = 0.5
-        # 其他情况，检查是否包含"月"关键字并尝试提取数字
-        else:
-            import re
-            match = re.search(r'(\d+)个月?', duration_str)
-            if match:
-                months = int(match.group(1))
-                if months >= 12:
-                    bonus_points = 1.0
-                elif months >= 6:
-                    bonus_points = 0.5
-        
-        # 2. 限制最大加分1分
-        bonus_points = min(bonus_points, 1.0)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存国际组织实习时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -891,28 +681,6 @@ class MilitaryService(ComprehensivePerformanceBase):
     def __str__(self):
         return f"{self.user.name}的参军入伍: {self.military_unit}"
     
-    def calculate_bonus_points(self):
-        """根据综合表现加分细则计算参军入伍的加分"""
-        bonus_points = 0
-        
-        try:
-            # 1. 计算服役时长（天）
-            service_duration = self.service_end_date - self.service_start_date
-            days_served = service_duration.days
-            
-            # 2. 根据服役时长计算加分
-            if days_served >= 730:  # 2年以上（含2年）
-                bonus_points = 2.0
-            elif days_served >= 365:  # 1年以上（含1年），2年以内
-                bonus_points = 1.0
-        except Exception as e:
-            print(f"计算服役时长出错: {e}")
-        
-        # 3. 限制最大加分2分
-        bonus_points = min(bonus_points, 2.0)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存参军入伍时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -951,69 +719,6 @@ class VolunteerService(ComprehensivePerformanceBase):
     def __str__(self):
         return f"{self.user.name}的志愿服务: {self.service_type}"
     
-    def calculate_bonus_points(self):
-        """根据综合表现加分细则计算志愿服务的加分"""
-        bonus_points = 0
-        
-        if self.service_type == 'hours':
-            # 1. 志愿工时加分
-            working_hours = self.working_hours or 0.0
-            
-            # 工时阈值：200小时
-            threshold_hours = 200.0
-            
-            if working_hours >= threshold_hours:
-                # 超过阈值的工时
-                extra_hours = working_hours - threshold_hours
-                # 每2小时加0.05分，大型赛会和支教工时减半
-                bonus_points = (extra_hours / 2.0) * 0.05
-        elif self.service_type == 'recognition':
-            # 2. 志愿表彰加分
-            award_scores = {
-                'national': {
-                    'team': {
-                        'leader': 1.0,
-                        'member': 0.5
-                    },
-                    'individual': 1.0
-                },
-                'provincial': {
-                    'team': {
-                        'leader': 0.5,
-                        'member': 0.25
-                    },
-                    'individual': 0.5
-                },
-                'university': {
-                    'team': {
-                        'leader': 0.25,
-                        'member': 0.1
-                    },
-                    'individual': 0.25
-                }
-            }
-            
-            # 获取表彰级别
-            award_level = self.level or 'university'
-            
-            # 判断是团队还是个人
-            entity_type = 'team' if self.is_team else 'individual'
-            
-            # 团队角色
-            team_role = self.team_role or 'member'
-            
-            # 计算加分
-            if award_level in award_scores:
-                if entity_type == 'team':
-                    bonus_points = award_scores[award_level][entity_type].get(team_role, 0)
-                else:
-                    bonus_points = award_scores[award_level][entity_type]
-        
-        # 3. 限制最大加分1分
-        bonus_points = min(bonus_points, 1.0)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存志愿服务时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -1045,33 +750,6 @@ class HonoraryTitle(ComprehensivePerformanceBase):
     def __str__(self):
         return f"{self.user.name}的荣誉称号: {self.title_name}"
     
-    def calculate_bonus_points(self):
-        """根据综合表现加分细则计算荣誉称号的加分"""
-        bonus_points = 0
-        
-        # 1. 荣誉级别加分表
-        honor_scores = {
-            'national': 2.0,
-            'provincial': 1.0,
-            'university': 0.2,
-            'college': 0.1
-        }
-        
-        # 2. 获取荣誉级别
-        level = self.level or 'university'
-        
-        # 3. 计算基础加分
-        bonus_points = honor_scores.get(level, 0)
-        
-        # 4. 集体荣誉加分减半
-        if self.is_collective:
-            bonus_points *= 0.5
-        
-        # 5. 限制最大加分2分
-        bonus_points = min(bonus_points, 2.0)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存荣誉称号时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -1107,63 +785,6 @@ class SocialWork(ComprehensivePerformanceBase):
     def __str__(self):
         return f"{self.user.name}的社会工作: {self.position}"
     
-    def calculate_bonus_points(self):
-        """根据综合表现加分细则计算社会工作的加分"""
-        bonus_points = 0
-        
-        # 1. 职位系数映射
-        position_coefficients = {
-            '院学生会执行主席': 2.0,
-            '团总支书记': 2.0,
-            '院学生会主席团成员': 1.5,
-            '团总支副书记': 1.5,
-            '院学生会、团总支各部部长': 1.0,
-            '党支部书记': 1.0,
-            '班长': 1.0,
-            '团支部书记': 1.0,
-            '系团总支书记': 0.75,
-            '院学生会、团总支各部门副部长': 0.75,
-            '社团社长': 0.75,
-            '党支部委员': 0.5,
-            '系团总支各部部长': 0.5,
-            '各班班委': 0.5,
-            '团支部委员': 0.5,
-            '院学生会、团总支长期志愿者': 0.5,
-            '社团副社长': 0.5,
-            '社团主要干部': 0.5,
-            '辩论队队长': 0.5,
-            '球队队长': 0.5
-        }
-        
-        # 2. 获取职位系数
-        coefficient = self.position_coefficient
-        if not coefficient or coefficient == 1.0:
-            # 从职位名称获取系数
-            for pos, coeff in position_coefficients.items():
-                if pos in self.position:
-                    coefficient = coeff
-                    break
-        
-        # 3. 获取工作表现评分
-        performance_score = self.performance_score or 0.0
-        
-        # 4. 计算加分：最终得分 = 系数 * 任职学年辅导员或指导老师打分 / 100
-        bonus_points = coefficient * (performance_score / 100.0)
-        
-        # 5. 检查任职时长
-        duration_str = self.work_duration or ''
-        if '半年' in duration_str or '6个月' in duration_str:
-            # 超过一学期但不满一年，按一学年标准减半
-            bonus_points *= 0.5
-        elif '一学期' in duration_str or '3个月' in duration_str:
-            # 不满一个学期，不加分
-            bonus_points = 0
-        
-        # 6. 限制最大加分2分
-        bonus_points = min(bonus_points, 2.0)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存社会工作时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -1209,49 +830,6 @@ class SportsCompetition(ComprehensivePerformanceBase):
     def __str__(self):
         return f"{self.user.name}的体育竞赛: {self.competition_name}"
     
-    def calculate_bonus_points(self):
-        """根据综合表现加分细则计算体育竞赛的加分"""
-        bonus_points = 0
-        
-        # 1. 体育竞赛加分表
-        sports_scores = {
-            'international': {
-                'champion': 8.0,
-                'runner_up': 6.5,
-                'third_place': 5.0,
-                'fourth_to_eighth': 3.5
-            },
-            'national': {
-                'champion': 5.0,
-                'runner_up': 3.5,
-                'third_place': 2.0,
-                'fourth_to_eighth': 1.0
-            }
-        }
-        
-        # 2. 获取竞赛级别和获奖等级
-        competition_level = self.competition_level or 'national'
-        achievement = self.achievement or 'fourth_to_eighth'
-        
-        # 3. 计算基础加分
-        if competition_level in sports_scores:
-            bonus_points = sports_scores[competition_level].get(achievement, 0)
-        
-        # 4. 团队项目加分调整
-        if self.is_team_project:
-            team_size = self.team_size or 1
-            if team_size == 1:
-                # 单人项目按团队项目加分值的1/3计算
-                bonus_points *= (1/3)
-            elif team_size > 1:
-                # 多人团队按参赛人数平均计算
-                bonus_points /= team_size
-        else:
-            # 个人项目按团队项目加分值的1/3计算
-            bonus_points *= (1/3)
-        
-        return round(bonus_points, 4)
-    
     def save(self, *args, **kwargs):
         """保存体育竞赛时，自动计算加分"""
         # 如果还没有设置bonus_points，使用calculate_bonus_points计算
@@ -1274,4 +852,207 @@ class SportsCompetition(ComprehensivePerformanceBase):
             models.Index(fields=['is_team_project']),
             models.Index(fields=['competition_date']),
             models.Index(fields=['created_at'])
-        ]
\ No newline at end of file
+        ]
+
+# 学术专长类申请（计入学术专长成绩，满分15分）
+EXPERTISE_MODELS = [
+    EnglishScore, AcademicPaper, PatentWork, AcademicCompetition,
+    InnovationProject, CCFCSPCertification
+]
+
+# 综合表现类申请（计入综合表现成绩，满分5分）
+COMPREHENSIVE_MODELS = [
+    InternationalInternship, MilitaryService, VolunteerService,
+    HonoraryTitle, SocialWork, SportsCompetition
+]
+
+# 全部12类申请模型
+APPLICATION_MODELS = EXPERTISE_MODELS + COMPREHENSIVE_MODELS
+
+# 申请类型标识与模型的对应关系（与创建申请接口的 application_type 一致）
+APPLICATION_TYPES = {
+    'english_score': EnglishScore,
+    'academic_paper': AcademicPaper,
+    'patent_work': PatentWork,
+    'academic_competition': AcademicCompetition,
+    'innovation_project': InnovationProject,
+    'ccf_csp_certification': CCFCSPCertification,
+    'international_internship': InternationalInternship,
+    'military_service': MilitaryService,
+    'volunteer_service': VolunteerService,
+    'honorary_title': HonoraryTitle,
+    'social_work': SocialWork,
+    'sports_competition': SportsCompetition,
+}
+
+# 申请模型与前端使用的申请类型标识（列表接口的 application_type）的对应关系
+APPLICATION_MODEL_NAMES = {
+    EnglishScore: 'english_scores',
+    AcademicPaper: 'academic_papers',
+    PatentWork: 'patent_works',
+    AcademicCompetition: 'academic_competitions',
+    InnovationProject: 'innovation_projects',
+    CCFCSPCertification: 'ccf_csp_certifications',
+    InternationalInternship: 'international_internships',
+    MilitaryService: 'military_services',
+    VolunteerService: 'volunteer_services',
+    HonoraryTitle: 'honorary_titles',
+    SocialWork: 'social_works',
+    SportsCompetition: 'sports_competitions',
+}
+
+
+# 申请索引：12类申请的统一只读视图，由信号保持同步，供申请列表分页查询
+class ApplicationIndex(models.Model):
+    id = models.UUIDField(primary_key=True, editable=False)  # 与申请ID相同
+    application_type = models.CharField(max_length=40, verbose_name='申请类型')  # 如：english_scores
+    title = models.CharField(max_length=255, blank=True, default='', verbose_name='项目名称')
+
+    # 学生信息
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='application_index', verbose_name='学生')
+    student_name = models.CharField(max_length=100, blank=True, default='', verbose_name='学生姓名')
+    student_school_id = models.CharField(max_length=50, blank=True, default='', verbose_name='学号')
+    college = models.ForeignKey(College, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                                verbose_name='学院')
+    clazz = models.ForeignKey(Class, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                              verbose_name='班级')
+
+    # 审核信息
+    review_status = models.CharField(max_length=20, verbose_name='审核状态')
+    estimated_score = models.DecimalField(max_digits=7, decimal_places=4, default=0, verbose_name='预估分数')
+    bonus_points = models.DecimalField(max_digits=7, decimal_places=4, default=0, verbose_name='加分')
+    first_reviewer_id = models.UUIDField(null=True, blank=True, verbose_name='一审人')
+    second_reviewer_id = models.UUIDField(null=True, blank=True, verbose_name='二审人')
+    third_reviewer_id = models.UUIDField(null=True, blank=True, verbose_name='三审人')
+
+    attachments = models.JSONField(blank=True, null=True, verbose_name='附件清单')  # 与申请的附件清单相同
+
+    created_at = models.DateTimeField(verbose_name='申请时间')
+    updated_at = models.DateTimeField(verbose_name='更新时间')
+
+    class Meta:
+        db_table = 'application_index'
+        verbose_name = '申请索引'
+        verbose_name_plural = '申请索引'
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['review_status', 'created_at']),
+            models.Index(fields=['college', 'review_status', 'created_at']),
+            models.Index(fields=['application_type', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['first_reviewer_id']),
+            models.Index(fields=['second_reviewer_id']),
+            models.Index(fields=['third_reviewer_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.application_type}: {self.title}"
+
+
+
+# 审核阶段
+REVIEW_STAGES = [
+    ('first_review', '一审'),
+    ('second_review', '二审'),
+    ('third_review', '三审'),
+]
+
+
+# 审核队列：每个待审核的申请一条记录，按学院和审核阶段组织，审核结束后删除
+class ReviewQueueItem(models.Model):
+    id = models.UUIDField(primary_key=True, editable=False)  # 与申请ID相同
+    application_type = models.CharField(max_length=40, verbose_name='申请类型')
+    title = models.CharField(max_length=255, blank=True, default='', verbose_name='项目名称')
+    stage = models.CharField(max_length=20, choices=REVIEW_STAGES, verbose_name='审核阶段')
+    review_status = models.CharField(max_length=20, verbose_name='审核状态')
+
+    # 学生信息
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_queue_items', verbose_name='学生')
+    student_name = models.CharField(max_length=100, blank=True, default='', verbose_name='学生姓名')
+    student_school_id = models.CharField(max_length=50, blank=True, default='', verbose_name='学号')
+    college = models.ForeignKey(College, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                                verbose_name='学院')
+
+    estimated_score = models.DecimalField(max_digits=7, decimal_places=4, default=0, verbose_name='预估分数')
+    first_reviewer_id = models.UUIDField(null=True, blank=True, verbose_name='一审人')
+    second_reviewer_id = models.UUIDField(null=True, blank=True, verbose_name='二审人')
+
+    entered_at = models.DateTimeField(verbose_name='进入当前阶段时间')
+    created_at = models.DateTimeField(verbose_name='申请时间')
+
+    # 领取（租约）：到期前只有领取人可以审核，到期后自动释放
+    leased_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                                  verbose_name='领取人')
+    lease_expires_at = models.DateTimeField(null=True, blank=True, verbose_name='领取到期时间')
+
+    class Meta:
+        db_table = 'review_queue'
+        verbose_name = '审核队列'
+        verbose_name_plural = '审核队列'
+        indexes = [
+            models.Index(fields=['college', 'entered_at', 'id'], name='review_queue_college_idx'),
+            models.Index(fields=['entered_at', 'id'], name='review_queue_entered_idx'),
+            models.Index(fields=['leased_by', 'lease_expires_at'], name='review_queue_lease_idx'),
+        ] + [
+            models.Index(
+                fields=['college', 'entered_at', 'id'],
+                name=f'review_queue_{stage.split("_")[0]}_idx',
+                condition=models.Q(stage=stage)
+            )
+            for stage, _ in REVIEW_STAGES
+        ]
+
+    def __str__(self):
+        return f"{self.get_stage_display()}: {self.title}"
+
+
+# 加分规则版本：各类申请的加分表（格式见 material/rules.py），创建后不可修改，同一时间最多一个版本生效
+# 没有生效版本时使用内置的默认加分表（版本 0）
+class BonusRuleVersion(models.Model):
+    version = models.PositiveIntegerField(unique=True, verbose_name='版本号')
+    description = models.TextField(blank=True, null=True, verbose_name='说明')
+    tables = models.JSONField(verbose_name='加分表')
+    checksum = models.CharField(max_length=64, verbose_name='加分表校验和')
+    is_active = models.BooleanField(default=False, verbose_name='是否生效')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='bonus_rule_versions', verbose_name='创建人')
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True, verbose_name='生效时间')
+
+    class Meta:
+        db_table = 'bonus_rule_version'
+        verbose_name = '加分规则版本'
+        verbose_name_plural = '加分规则版本'
+        ordering = ['-version']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'],
+                name='single_active_bonus_rule_version',
+                condition=models.Q(is_active=True)
+            )
+        ]
+
+    def __str__(self):
+        return f"加分规则版本 {self.version}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('加分规则版本创建后不可修改')
+        super().save(*args, **kwargs)
+
+
+class UploadBlob(models.Model):
+    """内容寻址存储中的一份上传内容（相同内容只保存一次）"""
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='内容哈希')
+    name = models.CharField(max_length=100, unique=True, verbose_name='存储路径')
+    size = models.BigIntegerField(verbose_name='文件大小')
+    ref_count = models.PositiveIntegerField(default=1, verbose_name='引用次数')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'upload_blob'
+        verbose_name = '上传文件'
+        verbose_name_plural = '上传文件'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,457 @@
+"""
+审核队列（review_queue）：教师的待审核收件箱
+申请每次审核状态变化时由信号同步：进入新的审核阶段时重新入队，审核结束（通过、不通过、撤回）时出队
+收件箱分页、待审核数量和下一条待审核申请都只需要一次按索引的查询
+
+领取：教师一次领取若干条待审核申请（SELECT ... FOR UPDATE SKIP LOCKED），租约期内其他教师不会领到、
+也不能审核这些申请；租约到期自动释放，申请进入下一审核阶段时租约清除
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from user.models import User
+from xmuhelper.pagination import InvalidCursor, paginate_keyset
+from .index import CATEGORY_MAP, INDEX_BATCH_SIZE, INDEX_TYPE_MODELS, get_application_title
+from .models import APPLICATION_MODEL_NAMES, APPLICATION_MODELS, REVIEW_STAGES, ReviewQueueItem
+
+
+OPEN_STAGES = [stage for stage, _ in REVIEW_STAGES]
+
+# 需要审核的状态（与 ReviewMixin.get_current_review_stage 一致）
+OPEN_STATUSES = ['pending', 'first_reviewing', 'first_approved', 'second_reviewing', 'second_approved', 'third_reviewing']
+
+# 同一阶段内重新同步时更新的字段（进入阶段的时间保持不变）
+QUEUE_FIELDS = [
+    'application_type', 'title', 'review_status', 'user_id', 'student_name', 'student_school_id', 'college_id',
+    'estimated_score', 'first_reviewer_id', 'second_reviewer_id', 'created_at'
+]
+
+# 收件箱按进入阶段的先后顺序处理
+INBOX_ORDERING = 'entered_at'
+
+# 每次最多领取的申请数、租约时长范围（秒）
+MAX_CLAIM_COUNT = 50
+MIN_LEASE_SECONDS = 60
+MAX_LEASE_SECONDS = 4 * 3600
+
+# 审核阶段 -> ReviewMixin 中的审核权限检查方法
+STAGE_PERMISSION_CHECKS = {
+    'first_review': 'can_first_review',
+    'second_review': 'can_second_review',
+    'third_review': 'can_third_review',
+}
+
+
+def build_queue_item(application, student=None, entered_at=None):
+    """由申请对象生成审核队列记录，申请不需要审核时返回 None"""
+    stage = application.get_current_review_stage()
+    if stage not in OPEN_STAGES:
+        return None
+    model_name = APPLICATION_MODEL_NAMES[type(application)]
+    student = student or application.user
+    return ReviewQueueItem(
+        id=application.id,
+        application_type=model_name,
+        title=(get_application_title(application, model_name) or '')[:255],
+        stage=stage,
+        review_status=application.review_status,
+        user_id=application.user_id,
+        student_name=student.name or '',
+        student_school_id=student.school_id or '',
+        college_id=student.college_id,
+        estimated_score=application.estimated_score or 0,
+        first_reviewer_id=application.first_reviewer_id,
+        second_reviewer_id=application.second_reviewer_id,
+        entered_at=entered_at or timezone.now(),
+        created_at=application.created_at
+    )
+
+
+def sync_review_item(application):
+    """
+    同步单个申请：仍在同一审核阶段时只更新内容；进入新阶段时重新入队；审核结束时出队
+    """
+    item = build_queue_item(application)
+    if item is None:
+        ReviewQueueItem.objects.filter(id=application.id).delete()
+        return
+    with transaction.atomic():
+        updated = ReviewQueueItem.objects.filter(id=item.id, stage=item.stage).update(
+            **{field: getattr(item, field) for field in QUEUE_FIELDS}
+        )
+        if not updated:
+            ReviewQueueItem.objects.filter(id=item.id).delete()
+            item.save(force_insert=True)
+
+
+def requeue_review_items(applications):
+    """审核阶段已变化的一批申请：删除原队列记录，仍需审核的重新入队（申请需已加载 user）"""
+    items = [item for item in (build_queue_item(application) for application in applications) if item]
+    with transaction.atomic():
+        ReviewQueueItem.objects.filter(id__in=[application.id for application in applications]).delete()
+        ReviewQueueItem.objects.bulk_create(items, batch_size=INDEX_BATCH_SIZE)
+
+
+def remove_review_item(application_id):
+    ReviewQueueItem.objects.filter(id=application_id).delete()
+
+
+def sync_student_review_items(student):
+    """学生姓名、学号、学院变化时同步其待审核申请"""
+    ReviewQueueItem.objects.filter(user_id=student.id).update(
+        student_name=student.name or '',
+        student_school_id=student.school_id or '',
+        college_id=student.college_id
+    )
+
+
+def rebuild_review_queue(batch_size=INDEX_BATCH_SIZE):
+    """全量重建审核队列（进入阶段时间取申请的更新时间），返回 {审核阶段: 记录数}"""
+    counts = {stage: 0 for stage in OPEN_STAGES}
+    with transaction.atomic():
+        ReviewQueueItem.objects.all().delete()
+        for model in APPLICATION_MODELS:
+            items = []
+            applications = (
+                model.objects
+                .filter(review_status__in=OPEN_STATUSES)
+                .select_related('user')
+                .iterator(chunk_size=batch_size)
+            )
+            for application in applications:
+                item = build_queue_item(application, application.user, entered_at=application.updated_at)
+                if item is None:
+                    continue
+                items.append(item)
+                counts[item.stage] += 1
+            ReviewQueueItem.objects.bulk_create(items, batch_size=batch_size)
+    return counts
+
+
+def get_inbox_queryset(user, stage=None, college=None):
+    """教师只能看到本学院的待审核申请，管理员可以按学院筛选"""
+    queryset = ReviewQueueItem.objects.all()
+    if user.user_type == 'teacher':
+        queryset = queryset.filter(college_id=user.college_id)
+    elif college:
+        queryset = queryset.filter(college_id=college)
+    if stage:
+        queryset = queryset.filter(stage=stage)
+    return queryset
+
+
+def get_lease_seconds(value=None):
+    """租约时长：未指定时使用 REVIEW_LEASE_SECONDS 配置，限制在允许范围内"""
+    if value in (None, ''):
+        value = getattr(settings, 'REVIEW_LEASE_SECONDS', 600)
+    return max(MIN_LEASE_SECONDS, min(int(value), MAX_LEASE_SECONDS))
+
+
+def claimable_filter(reviewer, now):
+    """未被领取、租约已到期或已由本人领取的申请"""
+    return (
+        Q(leased_by__isnull=True) |
+        Q(lease_expires_at__lte=now) |
+        Q(leased_by_id=reviewer.id)
+    )
+
+
+def claim_review_items(reviewer, count=10, lease_seconds=None, stage=None, college=None):
+    """
+    为审核人领取最多 count 条可审核的申请，返回领取到的队列记录
+    被其他事务锁定的记录直接跳过，并发领取的教师不会拿到同一条申请；
+    领取后再用 ReviewMixin 的审核权限检查确认，不能审核的申请释放并重新同步
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=get_lease_seconds(lease_seconds))
+    with transaction.atomic():
+        ids = list(
+            get_inbox_queryset(reviewer, stage=stage, college=college)
+            .filter(claimable_filter(reviewer, now))
+            .order_by(INBOX_ORDERING, 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:count]
+        )
+        ReviewQueueItem.objects.filter(id__in=ids).update(leased_by=reviewer, lease_expires_at=expires_at)
+        items = list(ReviewQueueItem.objects.filter(id__in=ids).order_by(INBOX_ORDERING, 'id'))
+
+    ids_by_type = defaultdict(list)
+    for item in items:
+        ids_by_type[item.application_type].append(item.id)
+    applications = {}
+    for application_type, type_ids in ids_by_type.items():
+        applications.update(
+            INDEX_TYPE_MODELS[application_type].objects.select_related('user').in_bulk(type_ids)
+        )
+
+    claimed = []
+    for item in items:
+        application = applications.get(item.id)
+        if application is None:
+            remove_review_item(item.id)
+        elif not getattr(application, STAGE_PERMISSION_CHECKS[item.stage])(reviewer):
+            ReviewQueueItem.objects.filter(id=item.id).update(leased_by=None, lease_expires_at=None)
+            sync_review_item(application)
+        else:
+            claimed.append(item)
+    return claimed
+
+
+def release_review_items(reviewer, ids=None):
+    """释放审核人领取的申请（不指定 ids 时释放全部），返回释放数量"""
+    queryset = ReviewQueueItem.objects.filter(leased_by_id=reviewer.id)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    return queryset.update(leased_by=None, lease_expires_at=None)
+
+
+def get_lease_holder(application_id, reviewer):
+    """申请被其他人领取且租约未到期时返回领取人，否则返回 None"""
+    item = (
+        ReviewQueueItem.objects
+        .filter(id=application_id, lease_expires_at__gt=timezone.now())
+        .exclude(leased_by_id=reviewer.id)
+        .select_related('leased_by')
+        .first()
+    )
+    return item.leased_by if item else None
+
+
+def get_reviewer_throughput(since, college=None):
+    """
+    各审核人自 since 起完成的审核数（按审核时间统计，一次 UNION ALL 查询）以及当前持有的租约数
+    返回按完成数从多到少排序的列表
+    """
+    queries = []
+    for model in APPLICATION_MODELS:
+        for prefix in ('first', 'second', 'third'):
+            queryset = model.objects.filter(**{
+                f'{prefix}_reviewed_at__gte': since,
+                f'{prefix}_reviewer__isnull': False
+            })
+            if college:
+                queryset = queryset.filter(user__college_id=college)
+            queries.append(
+                queryset.order_by().values_list(f'{prefix}_reviewer_id').annotate(total=Count('id'))
+            )
+    reviewed = defaultdict(int)
+    for reviewer_id, total in queries[0].union(*queries[1:], all=True):
+        reviewed[reviewer_id] += total
+
+    leases = ReviewQueueItem.objects.filter(lease_expires_at__gt=timezone.now())
+    if college:
+        leases = leases.filter(college_id=college)
+    active = dict(leases.order_by().values_list('leased_by_id').annotate(total=Count('id')))
+
+    reviewer_ids = set(reviewed) | set(active)
+    names = dict(User.objects.filter(id__in=reviewer_ids).values_list('id', 'name'))
+    hours = max((timezone.now() - since).total_seconds() / 3600, 1 / 60)
+    report = [
+        {
+            'reviewer_id': str(reviewer_id),
+            'reviewer_name': names.get(reviewer_id, ''),
+            'reviewed': reviewed.get(reviewer_id, 0),
+            'per_hour': round(reviewed.get(reviewer_id, 0) / hours, 2),
+            'active_leases': active.get(reviewer_id, 0),
+        }
+        for reviewer_id in reviewer_ids
+    ]
+    report.sort(key=lambda row: (-row['reviewed'], row['reviewer_name']))
+    return report
+
+
+def serialize_queue_item(item, user):
+    category = CATEGORY_MAP[item.application_type]
+    return {
+        "id": str(item.id),
+        "category": category,
+        "type": category,
+        "application_type": item.application_type,
+        "title": item.title,
+        "stage": item.stage,
+        "review_status": item.review_status,
+        "score": item.estimated_score or 0,
+        "student_name": item.student_name,
+        "student_id": item.student_school_id,
+        "entered_at": item.entered_at.isoformat(),
+        "created_at": item.created_at.isoformat(),
+        "lease_expires_at": item.lease_expires_at.isoformat() if item.lease_expires_at else None,
+        # 当前教师是否已审核过该申请的前一阶段
+        "reviewedByCurrentTeacher": user.id in (item.first_reviewer_id, item.second_reviewer_id)
+    }
+
+
+class ReviewInboxViewSet(ViewSet):
+    """教师待审核收件箱"""
+    permission_classes = [IsAuthenticated]
+
+    def _check_request(self, request):
+        user = request.user
+        if not hasattr(user, 'user_type') or user.user_type not in ['teacher', 'admin']:
+            return Response({
+                "error": "只有教师和管理员可以查看待审核申请"
+            }, status=status.HTTP_403_FORBIDDEN)
+        stage = request.query_params.get('stage')
+        if stage and stage not in OPEN_STAGES:
+            return Response({
+                "error": "无效的审核阶段"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return None
+
+    def _get_queryset(self, request):
+        return get_inbox_queryset(
+            request.user,
+            stage=request.query_params.get('stage'),
+            college=request.query_params.get('college')
+        )
+
+    def list(self, request):
+        """
+        待审核申请（按进入审核阶段的先后顺序）
+        参数：stage 审核阶段，college 学院（管理员），cursor 分页游标，page_size 每页数量
+        """
+        denied = self._check_request(request)
+        if denied:
+            return denied
+        try:
+            items, next_cursor = paginate_keyset(
+                self._get_queryset(request),
+                INBOX_ORDERING,
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size', 20)
+            )
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"error": "分页参数必须是整数"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "success": True,
+            "next_cursor": next_cursor,
+            "results": [serialize_queue_item(item, request.user) for item in items]
+        })
+
+    @action(detail=False, methods=['get'])
+    def count(self, request):
+        """待审核数量（角标），按审核阶段分别统计"""
+        denied = self._check_request(request)
+        if denied:
+            return denied
+        by_stage = dict(
+            self._get_queryset(request).order_by().values_list('stage').annotate(total=Count('id'))
+        )
+        return Response({
+            "success": True,
+            "data": {
+                "total": sum(by_stage.values()),
+                "by_stage": {stage: by_stage.get(stage, 0) for stage in OPEN_STAGES}
+            }
+        })
+
+    @action(detail=False, methods=['get'])
+    def next(self, request):
+        """下一条待审核申请（最早进入当前阶段的申请），没有时 data 为 null"""
+        denied = self._check_request(request)
+        if denied:
+            return denied
+        item = self._get_queryset(request).order_by(INBOX_ORDERING, 'id').first()
+        return Response({
+            "success": True,
+            "data": serialize_queue_item(item, request.user) if item else None
+        })
+
+
+class ReviewClaimViewSet(ViewSet):
+    """领取待审核申请"""
+    permission_classes = [IsAuthenticated]
+
+    def _check_reviewer(self, request):
+        user = request.user
+        if not hasattr(user, 'user_type') or user.user_type not in ['teacher', 'admin']:
+            return Response({
+                "error": "只有教师和管理员可以领取待审核申请"
+            }, status=status.HTTP_403_FORBIDDEN)
+        return None
+
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        """
+        领取接下来最多 count 条可审核的申请
+        请求体：{"count": 10, "lease_seconds": 600, "stage": "first_review", "college": null}
+        """
+        denied = self._check_reviewer(request)
+        if denied:
+            return denied
+        stage = request.data.get('stage')
+        if stage and stage not in OPEN_STAGES:
+            return Response({
+                "error": "无效的审核阶段"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            count = max(1, min(int(request.data.get('count', 10)), MAX_CLAIM_COUNT))
+            lease_seconds = get_lease_seconds(request.data.get('lease_seconds'))
+        except (TypeError, ValueError):
+            return Response({
+                "error": "count 和 lease_seconds 必须是整数"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        items = claim_review_items(
+            request.user, count, lease_seconds, stage=stage, college=request.data.get('college')
+        )
+        return Response({
+            "success": True,
+            "message": f"已领取{len(items)}条待审核申请",
+            "data": {
+                "lease_seconds": lease_seconds,
+                "results": [serialize_queue_item(item, request.user) for item in items]
+            }
+        })
+
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        """释放领取的申请，请求体 {"ids": [...]}，不提供 ids 时释放全部"""
+        denied = self._check_reviewer(request)
+        if denied:
+            return denied
+        ids = request.data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            return Response({
+                "error": "ids 必须是列表"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        released = release_review_items(request.user, ids)
+        return Response({
+            "success": True,
+            "message": f"已释放{released}条申请",
+            "data": {"released": released}
+        })
+
+    @action(detail=False, methods=['get'])
+    def throughput(self, request):
+        """各审核人的审核量（参数 hours 统计最近多少小时，默认24；教师只统计本学院）"""
+        denied = self._check_reviewer(request)
+        if denied:
+            return denied
+        try:
+            hours = max(1, min(int(request.query_params.get('hours', 24)), 24 * 90))
+        except ValueError:
+            return Response({
+                "error": "hours 必须是整数"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        college = request.user.college_id if request.user.user_type == 'teacher' else request.query_params.get('college')
+        return Response({
+            "success": True,
+            "data": {
+                "hours": hours,
+                "results": get_reviewer_throughput(timezone.now() - timedelta(hours=hours), college=college)
+            }
+        })
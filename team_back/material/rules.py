@@ -0,0 +1,795 @@
+"""
+加分规则引擎：各类申请的加分表以数据形式保存（加分规则版本），由统一的引擎计算加分
+版本 0 为内置的默认加分表；管理员可以创建新版本并设为生效版本，版本创建后不可修改
+加分表在每个进程中按版本编译一次（正则、排序后的阈值表、作者排序等预先处理），计算加分时只做查表
+
+批量重算：按申请类型分批读取待一审申请的规则相关字段，用同一份编译后的加分表计算，
+加分变化的申请每批一次 bulk_update，并同步申请索引中的加分
+
+加分规则文档：当前生效版本的加分表以紧凑JSON公开发布（带强 ETag），供客户端在本地估算加分
+"""
+import copy
+import hashlib
+import json
+import re
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from .index import INDEX_TYPE_MODELS
+from .models import APPLICATION_MODEL_NAMES, EXPERTISE_MODELS, ApplicationIndex, BonusRuleVersion, ReviewMixin
+from .serializers import RescoreSerializer, RuleActivateSerializer, RuleVersionCreateSerializer
+
+
+# 内置默认加分表的版本号
+DEFAULT_RULE_VERSION = 0
+
+RESCORE_BATCH_SIZE = 1000
+
+# 加分规则文档的缓存时间：当前版本短时间缓存后用 ETag 重新验证，指定版本号的文档不会改变
+SCORING_RULES_MAX_AGE = 60
+SCORING_RULES_VERSIONED_MAX_AGE = 365 * 24 * 3600
+SCORING_RULES_VERSION_HEADER = 'X-Scoring-Rules-Version'
+
+# 各类申请的默认加分表（学术专长、综合表现加分细则）
+DEFAULT_RULE_TABLES = {
+    'academic_papers': {
+        # 期刊/会议分类加分基数；分类名称包含高影响因子期刊关键字时按高影响因子期刊加分
+        'category_scores': {'A': 10, 'B': 6, 'C': 1},
+        'category_aliases': {'A+': 'A', 'A++': 'A'},
+        'high_impact_keywords': ['Nature', 'Science', 'Cell', 'CELL *'],
+        'high_impact_score': 20,
+        # 作者加分比例：独立作者、共同一作、按作者排序；作者排序不是数字时使用 invalid_rank_ratio
+        'independent_author_ratio': 1.0,
+        'co_first_author_ratio': 0.5,
+        'author_rank_ratios': {'1': 0.8, '2': 0.2},
+        'invalid_rank_ratio': 0.5,
+        'require_xmu_first_unit': True,
+    },
+    'patent_works': {
+        'base_score': 2.0,
+        'author_type_ratios': {'independent_author': 1.0, 'first_author_except_teacher': 0.8},
+        'default_author_ratio': 0.5,
+        'require_xmu_first_unit': True,
+    },
+    'academic_competitions': {
+        # 竞赛级别 -> 获奖范围 -> 获奖等级 -> 加分
+        'scores': {
+            'A+': {
+                'national': {'first_plus': 30, 'first': 30, 'second': 15, 'third': 10},
+                'provincial': {'first_plus': 5, 'first': 5, 'second': 2, 'third': 1},
+            },
+            'A': {
+                'national': {'first_plus': 15, 'first': 15, 'second': 10, 'third': 5},
+                'provincial': {'first_plus': 2, 'first': 2, 'second': 1, 'third': 0.5},
+            },
+            'A-': {
+                'national': {'first_plus': 10, 'first': 10, 'second': 5, 'third': 2},
+                'provincial': {'first_plus': 1, 'first': 1, 'second': 0.5, 'third': 0},
+            },
+        },
+        'scale': 'national',
+        'default_level': 'A',
+        'default_award': 'third',
+    },
+    'innovation_projects': {
+        'scores': {
+            'national': {'leader': 1.0, 'member': 0.3},
+            'provincial': {'leader': 0.5, 'member': 0.2},
+            'university': {'leader': 0.1, 'member': 0.05},
+        },
+        'default_level': 'university',
+        'max_points': 2.0,
+    },
+    'ccf_csp_certifications': {
+        # 排名百分比 -> 加分（A-类竞赛标准）
+        'scores': {'0.2': 10, '1.5': 5, '3': 2},
+        'default_rank_percentage': '3',
+    },
+    'international_internships': {
+        # 实习时长包含关键字时直接加分，否则从时长中提取月数按阈值加分
+        'duration_keywords': [
+            {'keywords': ['一年', '12个月'], 'points': 1.0},
+            {'keywords': ['半年', '6个月'], 'points': 0.5},
+        ],
+        'month_pattern': r'(\d+)个月?',
+        'month_tiers': [{'min': 12, 'points': 1.0}, {'min': 6, 'points': 0.5}],
+        'max_points': 1.0,
+    },
+    'military_services': {
+        'day_tiers': [{'min': 730, 'points': 2.0}, {'min': 365, 'points': 1.0}],
+        'max_points': 2.0,
+    },
+    'volunteer_services': {
+        # 志愿工时：超过阈值的部分每 hours_step 小时加 points_per_step 分
+        'hours_threshold': 200.0,
+        'hours_step': 2.0,
+        'points_per_step': 0.05,
+        # 志愿表彰：级别 -> 团队（按团队角色）/个人 -> 加分
+        'recognition_scores': {
+            'national': {'team': {'leader': 1.0, 'member': 0.5}, 'individual': 1.0},
+            'provincial': {'team': {'leader': 0.5, 'member': 0.25}, 'individual': 0.5},
+            'university': {'team': {'leader': 0.25, 'member': 0.1}, 'individual': 0.25},
+        },
+        'default_level': 'university',
+        'default_team_role': 'member',
+        'max_points': 1.0,
+    },
+    'honorary_titles': {
+        'level_scores': {'national': 2.0, 'provincial': 1.0, 'university': 0.2, 'college': 0.1},
+        'default_level': 'university',
+        'collective_ratio': 0.5,
+        'max_points': 2.0,
+    },
+    'social_works': {
+        # 按顺序匹配职位名称中包含的职位，得到职位系数（申请中未填写系数时使用）
+        'position_coefficients': [
+            ['院学生会执行主席', 2.0],
+            ['团总支书记', 2.0],
+            ['院学生会主席团成员', 1.5],
+            ['团总支副书记', 1.5],
+            ['院学生会、团总支各部部长', 1.0],
+            ['党支部书记', 1.0],
+            ['班长', 1.0],
+            ['团支部书记', 1.0],
+            ['系团总支书记', 0.75],
+            ['院学生会、团总支各部门副部长', 0.75],
+            ['社团社长', 0.75],
+            ['党支部委员', 0.5],
+            ['系团总支各部部长', 0.5],
+            ['各班班委', 0.5],
+            ['团支部委员', 0.5],
+            ['院学生会、团总支长期志愿者', 0.5],
+            ['社团副社长', 0.5],
+            ['社团主要干部', 0.5],
+            ['辩论队队长', 0.5],
+            ['球队队长', 0.5],
+        ],
+        # 任职时长包含关键字时的加分比例
+        'duration_ratios': [
+            {'keywords': ['半年', '6个月'], 'ratio': 0.5},
+            {'keywords': ['一学期', '3个月'], 'ratio': 0},
+        ],
+        'max_points': 2.0,
+    },
+    'sports_competitions': {
+        'scores': {
+            'international': {'champion': 8.0, 'runner_up': 6.5, 'third_place': 5.0, 'fourth_to_eighth': 3.5},
+            'national': {'champion': 5.0, 'runner_up': 3.5, 'third_place': 2.0, 'fourth_to_eighth': 1.0},
+        },
+        'default_level': 'national',
+        'default_achievement': 'fourth_to_eighth',
+        # 个人项目（以及只有一人的团队）按团队项目加分值的比例计算，多人团队按人数平均
+        'individual_ratio': 1 / 3,
+    },
+}
+
+
+# ---- 各类申请的加分计算：compile_* 预处理加分表，score_* 计算单个申请的加分 ----
+
+def compile_academic_paper(table):
+    compiled = dict(table)
+    compiled['category_scores'] = {
+        **table['category_scores'],
+        **{alias: table['category_scores'][target] for alias, target in table['category_aliases'].items()},
+    }
+    compiled['author_rank_ratios'] = {int(rank): ratio for rank, ratio in table['author_rank_ratios'].items()}
+    compiled['high_impact_keywords'] = tuple(table['high_impact_keywords'])
+    return compiled
+
+
+def score_academic_paper(table, application):
+    journal_category = application.journal_category or ''
+    if any(keyword in journal_category for keyword in table['high_impact_keywords']):
+        base_score = table['high_impact_score']
+    else:
+        base_score = table['category_scores'].get(journal_category, 0)
+
+    if application.is_independent_author:
+        author_ratio = table['independent_author_ratio']
+    elif application.is_co_first_author:
+        author_ratio = table['co_first_author_ratio']
+    else:
+        try:
+            rank = int(application.author_rank) if application.author_rank else 0
+            author_ratio = table['author_rank_ratios'].get(rank, 0)
+        except ValueError:
+            author_ratio = table['invalid_rank_ratio']
+
+    if table['require_xmu_first_unit'] and not application.is_xmu_first_unit:
+        return 0
+    return base_score * author_ratio
+
+
+def score_patent_work(table, application):
+    author_ratio = table['author_type_ratios'].get(application.author_type, table['default_author_ratio'])
+    if table['require_xmu_first_unit'] and not application.is_xmu_first_unit:
+        return 0
+    return table['base_score'] * author_ratio
+
+
+def score_academic_competition(table, application):
+    competition_level = application.competition_level or table['default_level']
+    award_level = application.award_level or table['default_award']
+    scale_scores = table['scores'].get(competition_level, {}).get(table['scale'], {})
+    return scale_scores.get(award_level, 0)
+
+
+def score_innovation_project(table, application):
+    project_level = application.project_level or table['default_level']
+    role = 'leader' if application.is_team_leader else 'member'
+    return min(table['scores'].get(project_level, {}).get(role, 0), table['max_points'])
+
+
+def score_ccf_csp_certification(table, application):
+    rank_percentage = application.csp_rank_percentage or table['default_rank_percentage']
+    return table['scores'].get(rank_percentage, 0)
+
+
+def compile_tiers(tiers):
+    """阈值表按阈值从高到低排列"""
+    return tuple(sorted(((tier['min'], tier['points']) for tier in tiers), reverse=True))
+
+
+def match_tiers(tiers, value):
+    for minimum, points in tiers:
+        if value >= minimum:
+            return points
+    return 0
+
+
+def compile_keywords(rules, value_key):
+    return tuple((tuple(rule['keywords']), rule[value_key]) for rule in rules)
+
+
+def match_keywords(rules, text):
+    """返回第一条包含关键字的规则的值，没有匹配时返回 None"""
+    for keywords, value in rules:
+        if any(keyword in text for keyword in keywords):
+            return value
+    return None
+
+
+def compile_international_internship(table):
+    compiled = dict(table)
+    compiled['duration_keywords'] = compile_keywords(table['duration_keywords'], 'points')
+    compiled['month_pattern'] = re.compile(table['month_pattern'])
+    compiled['month_tiers'] = compile_tiers(table['month_tiers'])
+    return compiled
+
+
+def score_international_internship(table, application):
+    duration_str = application.internship_duration or ''
+    bonus_points = match_keywords(table['duration_keywords'], duration_str)
+    if bonus_points is None:
+        match = table['month_pattern'].search(duration_str)
+        bonus_points = match_tiers(table['month_tiers'], int(match.group(1))) if match else 0
+    return min(bonus_points, table['max_points'])
+
+
+def compile_military_service(table):
+    compiled = dict(table)
+    compiled['day_tiers'] = compile_tiers(table['day_tiers'])
+    return compiled
+
+
+def score_military_service(table, application):
+    try:
+        days_served = (application.service_end_date - application.service_start_date).days
+    except TypeError:
+        return 0
+    return min(match_tiers(table['day_tiers'], days_served), table['max_points'])
+
+
+def score_volunteer_service(table, application):
+    bonus_points = 0
+    if application.service_type == 'hours':
+        working_hours = float(application.working_hours or 0)
+        if working_hours >= table['hours_threshold']:
+            bonus_points = (working_hours - table['hours_threshold']) / table['hours_step'] * table['points_per_step']
+    elif application.service_type == 'recognition':
+        level_scores = table['recognition_scores'].get(application.level or table['default_level'])
+        if level_scores is not None:
+            if application.is_team:
+                bonus_points = level_scores['team'].get(application.team_role or table['default_team_role'], 0)
+            else:
+                bonus_points = level_scores['individual']
+    return min(bonus_points, table['max_points'])
+
+
+def score_honorary_title(table, application):
+    bonus_points = table['level_scores'].get(application.level or table['default_level'], 0)
+    if application.is_collective:
+        bonus_points *= table['collective_ratio']
+    return min(bonus_points, table['max_points'])
+
+
+def compile_social_work(table):
+    compiled = dict(table)
+    compiled['position_coefficients'] = tuple((position, coefficient)
+                                              for position, coefficient in table['position_coefficients'])
+    compiled['duration_ratios'] = compile_keywords(table['duration_ratios'], 'ratio')
+    return compiled
+
+
+def score_social_work(table, application):
+    # 申请中填写了职位系数（不为默认值1）时直接使用，否则按职位名称匹配
+    coefficient = application.position_coefficient
+    if not coefficient or coefficient == 1:
+        position = application.position or ''
+        for name, value in table['position_coefficients']:
+            if name in position:
+                coefficient = value
+                break
+    # 最终得分 = 系数 * 任职学年辅导员或指导老师打分 / 100
+    bonus_points = float(coefficient or 0) * (float(application.performance_score or 0) / 100.0)
+    ratio = match_keywords(table['duration_ratios'], application.work_duration or '')
+    if ratio is not None:
+        bonus_points *= ratio
+    return min(bonus_points, table['max_points'])
+
+
+def score_sports_competition(table, application):
+    competition_level = application.competition_level or table['default_level']
+    achievement = application.achievement or table['default_achievement']
+    bonus_points = table['scores'].get(competition_level, {}).get(achievement, 0)
+    team_size = application.team_size or 1
+    if not application.is_team_project or team_size == 1:
+        bonus_points *= table['individual_ratio']
+    elif team_size > 1:
+        bonus_points /= team_size
+    return bonus_points
+
+
+# 申请类型 -> (加分表预处理, 加分计算, 计算用到的字段)
+RULE_EVALUATORS = {
+    'academic_papers': (compile_academic_paper, score_academic_paper, [
+        'journal_category', 'is_independent_author', 'is_co_first_author', 'author_rank', 'is_xmu_first_unit']),
+    'patent_works': (dict, score_patent_work, ['author_type', 'is_xmu_first_unit']),
+    'academic_competitions': (dict, score_academic_competition, ['competition_level', 'award_level']),
+    'innovation_projects': (dict, score_innovation_project, ['project_level', 'is_team_leader']),
+    'ccf_csp_certifications': (dict, score_ccf_csp_certification, ['csp_rank_percentage']),
+    'international_internships': (compile_international_internship, score_international_internship, [
+        'internship_duration']),
+    'military_services': (compile_military_service, score_military_service, [
+        'service_start_date', 'service_end_date']),
+    'volunteer_services': (dict, score_volunteer_service, [
+        'service_type', 'working_hours', 'level', 'is_team', 'team_role']),
+    'honorary_titles': (dict, score_honorary_title, ['level', 'is_collective']),
+    'social_works': (compile_social_work, score_social_work, [
+        'position', 'position_coefficient', 'performance_score', 'work_duration']),
+    'sports_competitions': (dict, score_sports_competition, [
+        'competition_level', 'achievement', 'is_team_project', 'team_size']),
+}
+
+
+def tables_checksum(tables):
+    """加分表的校验和（规范化JSON的SHA-256）"""
+    raw = json.dumps(tables, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class BonusRules:
+    """某一版本编译后的加分表"""
+
+    def __init__(self, version, tables):
+        self.version = version
+        self.tables = tables
+        self.checksum = tables_checksum(tables)
+        self._evaluators = {}
+        for application_type, (compile_table, score, _) in RULE_EVALUATORS.items():
+            table = tables.get(application_type)
+            if not isinstance(table, dict):
+                raise ValueError(f'缺少加分表: {application_type}')
+            missing = [key for key in DEFAULT_RULE_TABLES[application_type] if key not in table]
+            if missing:
+                raise ValueError(f"加分表 {application_type} 缺少: {', '.join(missing)}")
+            try:
+                compiled = compile_table(table)
+                # 用空申请试算一次，提前发现取值类型错误
+                score(compiled, INDEX_TYPE_MODELS[application_type]())
+            except (KeyError, TypeError, ValueError, AttributeError, re.error) as e:
+                raise ValueError(f'加分表 {application_type} 无效: {e!r}')
+            self._evaluators[application_type] = (score, compiled)
+
+    def evaluate(self, application, application_type=None):
+        """计算申请的加分（保留4位小数）"""
+        application_type = application_type or APPLICATION_MODEL_NAMES[type(application)]
+        score, table = self._evaluators[application_type]
+        return round(score(table, application), 4)
+
+    @cached_property
+    def document(self):
+        """
+        发布给客户端的加分规则文档，返回 (JSON字节, 强ETag)
+        同一版本的文档逐字节不变，客户端可按版本号长期缓存，在本地估算加分
+        """
+        from score.calculation import ACADEMIC_SCORE_MAX, COMPREHENSIVE_SCORE_MAX, EXPERTISE_SCORE_MAX, TOTAL_SCORE_MAX
+        expertise_types = {APPLICATION_MODEL_NAMES[model] for model in EXPERTISE_MODELS}
+        document = {
+            'version': self.version,
+            'checksum': self.checksum,
+            # 学业成绩 = 绩点 / gpa_full_mark * academic，各项成绩按上限封顶
+            'gpa_full_mark': 4.0,
+            'score_caps': {
+                'academic': ACADEMIC_SCORE_MAX,
+                'academic_expertise': EXPERTISE_SCORE_MAX,
+                'comprehensive_performance': COMPREHENSIVE_SCORE_MAX,
+                'total': TOTAL_SCORE_MAX,
+            },
+            'categories': {
+                application_type: 'academic_expertise' if application_type in expertise_types else 'comprehensive_performance'
+                for application_type in RULE_EVALUATORS
+            },
+            'tables': self.tables,
+        }
+        content = json.dumps(
+            {'success': True, 'data': document}, ensure_ascii=False, sort_keys=True, separators=(',', ':')
+        ).encode('utf-8')
+        return content, f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+# 进程内按版本号缓存编译后的加分表（版本不可修改，无需失效）
+_compiled_rules = {}
+
+
+def get_rules(version):
+    """按版本号获取编译后的加分表，版本不存在时抛出 BonusRuleVersion.DoesNotExist"""
+    rules = _compiled_rules.get(version)
+    if rules is None:
+        if version == DEFAULT_RULE_VERSION:
+            tables = DEFAULT_RULE_TABLES
+        else:
+            tables = BonusRuleVersion.objects.values_list('tables', flat=True).get(version=version)
+        rules = _compiled_rules[version] = BonusRules(version, tables)
+    return rules
+
+
+# 进程内记录已发布的版本号（生效时间写入后不会清除，无需失效）
+_published_versions = {DEFAULT_RULE_VERSION}
+
+
+def is_published_version(version):
+    """是否为已发布的版本：内置默认版本或生效过的版本，从未生效的草稿版本不公开"""
+    if version not in _published_versions:
+        if not BonusRuleVersion.objects.filter(version=version, activated_at__isnull=False).exists():
+            return False
+        _published_versions.add(version)
+    return True
+
+
+def get_active_version():
+    """
+    当前生效的版本号，每次从数据库读取（生效版本唯一约束对应的索引上的一行），
+    版本切换后所有进程立即使用新版本
+    """
+    return (
+        BonusRuleVersion.objects.filter(is_active=True).values_list('version', flat=True).first()
+        or DEFAULT_RULE_VERSION
+    )
+
+
+def get_active_rules():
+    """当前生效的加分表"""
+    return get_rules(get_active_version())
+
+
+def build_candidate_rules(tables):
+    """
+    由要修改的加分表生成候选加分表（未保存，版本号为 None），其余申请类型沿用当前生效版本
+    加分表无效时抛出 ValueError
+    """
+    unknown = [application_type for application_type in tables if application_type not in RULE_EVALUATORS]
+    if unknown:
+        raise ValueError(f"未知的申请类型: {', '.join(unknown)}")
+    merged = copy.deepcopy(get_active_rules().tables)
+    merged.update(tables)
+    return BonusRules(None, merged)
+
+
+def create_rule_version(tables, description=None, created_by=None, activate=False):
+    """
+    创建加分规则版本：tables 只需包含要修改的申请类型，其余类型沿用当前生效版本
+    加分表无效时抛出 ValueError
+    """
+    rules = build_candidate_rules(tables)
+
+    with transaction.atomic():
+        latest = BonusRuleVersion.objects.aggregate(latest=models.Max('version'))['latest'] or DEFAULT_RULE_VERSION
+        try:
+            rule_version = BonusRuleVersion.objects.create(
+                version=latest + 1,
+                description=description,
+                tables=rules.tables,
+                checksum=rules.checksum,
+                created_by=created_by
+            )
+        except IntegrityError:
+            raise ValueError('加分规则版本号冲突，请重试')
+    if activate:
+        activate_rule_version(rule_version.version)
+        rule_version.refresh_from_db()
+    return rule_version
+
+
+def activate_rule_version(version):
+    """将某一版本设为生效版本；version 为 0 时恢复内置默认加分表"""
+    with transaction.atomic():
+        if version != DEFAULT_RULE_VERSION and not BonusRuleVersion.objects.filter(version=version).exists():
+            raise BonusRuleVersion.DoesNotExist(f'加分规则版本 {version} 不存在')
+        BonusRuleVersion.objects.filter(is_active=True).exclude(version=version).update(is_active=False)
+        BonusRuleVersion.objects.filter(version=version).update(is_active=True, activated_at=timezone.now())
+
+
+def rescore_applications(application_types=None, rules=None, batch_size=RESCORE_BATCH_SIZE, dry_run=False):
+    """
+    按加分表（默认当前生效版本）重新计算待一审申请的加分，返回 {申请类型: {'scanned', 'updated'}}
+    只读取计算用到的字段；加分变化的申请每批一次 bulk_update，并同步申请索引
+    待一审申请的加分尚未计入成绩，不需要重新计算成绩
+    """
+    rules = rules or get_active_rules()
+    application_types = application_types or list(RULE_EVALUATORS)
+    report = {}
+    for application_type in application_types:
+        if application_type not in RULE_EVALUATORS:
+            raise ValueError(f'无法按规则计算加分的申请类型: {application_type}')
+        model = INDEX_TYPE_MODELS[application_type]
+        fields = RULE_EVALUATORS[application_type][2]
+        pending = (
+            model.objects
+            .filter(review_status__in=ReviewMixin.FIRST_REVIEW_STATUSES)
+            .only('id', 'bonus_points', *fields)
+            .order_by('id')
+        )
+        type_report = {'scanned': 0, 'updated': 0}
+        last_id = None
+        while True:
+            batch = list((pending.filter(id__gt=last_id) if last_id is not None else pending)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            type_report['scanned'] += len(batch)
+
+            now = timezone.now()
+            changed = []
+            for application in batch:
+                bonus_points = Decimal(str(rules.evaluate(application, application_type))).quantize(Decimal('0.0001'))
+                if bonus_points != application.bonus_points:
+                    application.bonus_points = bonus_points
+                    application.updated_at = now
+                    changed.append(application)
+            type_report['updated'] += len(changed)
+            if changed and not dry_run:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, ['bonus_points', 'updated_at'], batch_size=batch_size)
+                    ApplicationIndex.objects.bulk_update(
+                        [ApplicationIndex(id=application.id, bonus_points=application.bonus_points, updated_at=now)
+                         for application in changed],
+                        ['bonus_points', 'updated_at'],
+                        batch_size=batch_size
+                    )
+        report[application_type] = type_report
+    return report
+
+
+def etag_matches(request, etag):
+    """请求的 If-None-Match 是否包含该 ETag"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+
+@require_GET
+def scoring_rules(request, version=None):
+    """
+    加分规则文档（公开）：不指定版本时返回当前生效版本，响应头中带版本号，客户端据此发现本地缓存已过期
+    指定版本时只返回已发布（生效过）的版本；
+    支持 If-None-Match 条件请求，未变化时返回 304；进程内已编译该版本时只查询生效版本号
+    """
+    if version is not None and not is_published_version(version):
+        return JsonResponse({"error": "加分规则版本不存在"}, status=404)
+    try:
+        rules = get_rules(version) if version is not None else get_active_rules()
+    except BonusRuleVersion.DoesNotExist:
+        return JsonResponse({"error": "加分规则版本不存在"}, status=404)
+    content, etag = rules.document
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='application/json; charset=utf-8')
+    response['ETag'] = etag
+    response[SCORING_RULES_VERSION_HEADER] = str(rules.version)
+    if version is None:
+        response['Cache-Control'] = f'public, max-age={SCORING_RULES_MAX_AGE}'
+    else:
+        response['Cache-Control'] = f'public, max-age={SCORING_RULES_VERSIONED_MAX_AGE}, immutable'
+    return response
+
+
+def serialize_rule_version(rule_version):
+    return {
+        'version': rule_version.version,
+        'description': rule_version.description,
+        'checksum': rule_version.checksum,
+        'is_active': rule_version.is_active,
+        'created_by': rule_version.created_by.name if rule_version.created_by else None,
+        'created_at': rule_version.created_at,
+        'activated_at': rule_version.activated_at,
+    }
+
+
+class BonusRuleViewSet(ViewSet):
+    """加分规则版本管理接口（管理员）"""
+    permission_classes = [IsAuthenticated]
+
+    def _check_admin(self, request):
+        user = request.user
+        if not hasattr(user, 'user_type') or user.user_type != 'admin':
+            return Response({
+                "error": "只有管理员可以管理加分规则"
+            }, status=status.HTTP_403_FORBIDDEN)
+        return None
+
+    def list(self, request):
+        """全部加分规则版本及当前生效的版本号"""
+        denied = self._check_admin(request)
+        if denied:
+            return denied
+        versions = BonusRuleVersion.objects.select_related('created_by')
+        return Response({
+            "success": True,
+            "data": {
+                'active_version': get_active_version(),
+                'versions': [serialize_rule_version(rule_version) for rule_version in versions]
+            }
+        })
+
+    def retrieve(self, request, pk=None):
+        """某一版本的加分表"""
+        denied = self._check_admin(request)
+        if denied:
+            return denied
+        try:
+            rules = get_rules(int(pk))
+        except (ValueError, BonusRuleVersion.DoesNotExist):
+            return Response({
+                "error": "加分规则版本不存在"
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            "success": True,
+            "data": {'version': rules.version, 'checksum': rules.checksum, 'tables': rules.tables}
+        })
+
+    def create(self, request):
+        """创建加分规则版本，请求体：{"tables": {...}, "description": "...", "activate": false}"""
+        denied = self._check_admin(request)
+        if denied:
+            return denied
+        serializer = RuleVersionCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            if 'tables' in serializer.errors:
+                return Response({
+                    "error": "请提供要修改的加分表"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                "error": "参数错误",
+                "details": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            rule_version = create_rule_version(
+                data['tables'],
+                description=data.get('description'),
+                created_by=request.user,
+                activate=data['activate']
+            )
+        except ValueError as e:
+            return Response({
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "success": True,
+            "message": f"加分规则版本 {rule_version.version} 创建成功",
+            "data": serialize_rule_version(rule_version)
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def activate(self, request, pk=None):
+        """设为生效版本；请求体 {"rescore": true} 时同时按新版本重算待一审申请的加分"""
+        denied = self._check_admin(request)
+        if denied:
+            return denied
+        serializer = RuleActivateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "error": "参数错误",
+                "details": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            version = int(pk)
+            activate_rule_version(version)
+        except (ValueError, BonusRuleVersion.DoesNotExist):
+            return Response({
+                "error": "加分规则版本不存在"
+            }, status=status.HTTP_404_NOT_FOUND)
+        data = {'active_version': version}
+        if serializer.validated_data['rescore']:
+            data['rescore'] = rescore_applications(rules=get_rules(version))
+        return Response({
+            "success": True,
+            "message": f"加分规则版本 {version} 已生效",
+            "data": data
+        })
+
+    @action(detail=False, methods=['post'])
+    def rescore(self, request):
+        """按当前生效版本重算待一审申请的加分，请求体：{"application_types": [...], "dry_run": true}"""
+        denied = self._check_admin(request)
+        if denied:
+            return denied
+        serializer = RescoreSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "error": "参数错误",
+                "details": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = rescore_applications(
+                application_types=serializer.validated_data.get('application_types'),
+                dry_run=serializer.validated_data['dry_run']
+            )
+        except ValueError as e:
+            return Response({
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "success": True,
+            "data": report
+        })
+
+    @action(detail=False, methods=['post'])
+    def shadow(self, request):
+        """
+        影子评估候选加分表对学生总分和名次的影响（不写入任何数据）
+        请求体：{"version": 2} 评估已保存的版本，或 {"tables": {...}} 评估未保存的修改；可选 "limit" 限制返回的学生数
+        """
+        denied = self._check_admin(request)
+        if denied:
+            return denied
+        from score.shadow import shadow_evaluate
+        try:
+            if request.data.get('version') is not None:
+                rules = get_rules(int(request.data['version']))
+            elif isinstance(request.data.get('tables'), dict) and request.data['tables']:
+                rules = build_candidate_rules(request.data['tables'])
+            else:
+                return Response({
+                    "error": "请提供要评估的加分规则版本或加分表"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            limit = int(request.data['limit']) if request.data.get('limit') else None
+        except BonusRuleVersion.DoesNotExist:
+            return Response({
+                "error": "加分规则版本不存在"
+            }, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        report = shadow_evaluate(rules, limit=limit)
+        return Response({
+            "success": True,
+            "message": f"共{report['summary']['students']}名学生，总分变化{report['summary']['total_changed']}人，"
+                       f"名次变化{report['summary']['rank_changed']}人",
+            "data": report
+        })
@@ -424,6 +424,8 @@ class SecondReviewActionSerializer(serializers.Serializer):
 
 # 批量一审序列化器
 class BatchFirstReviewSerializer(serializers.Serializer):
+    max_applications = 100
+
     application_ids = serializers.ListField(
         child=serializers.UUIDField(),
         help_text="申请ID列表"
@@ -434,10 +436,48 @@ class BatchFirstReviewSerializer(serializers.Serializer):
     def validate_application_ids(self, value):
         if not value:
             raise serializers.ValidationError("申请ID列表不能为空")
-        if len(value) > 100:
-            raise serializers.ValidationError("一次最多审核100个申请")
+        if len(value) > self.max_applications:
+            raise serializers.ValidationError(f"一次最多审核{self.max_applications}个申请")
         return value
 
+# 批量审核序列化器（可包含不同类型的申请）
+class BatchReviewSerializer(BatchFirstReviewSerializer):
+    max_applications = 300
+
+    stage = serializers.ChoiceField(
+        choices=[('first_review', '一审'), ('second_review', '二审'), ('third_review', '三审')],
+        default='first_review'
+    )
+    bonus_points = serializers.DecimalField(
+        max_digits=7,
+        decimal_places=4,
+        required=False,
+        allow_null=True,
+        min_value=0,
+        help_text="加分分数（审核通过时有效）"
+    )
+
+# 自动初审序列化器
+class TriageRunSerializer(serializers.Serializer):
+    rules = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True,
+                                  help_text="要执行的规则，不指定时执行全部规则")
+    dry_run = serializers.BooleanField(required=False, default=False)
+
+# 创建加分规则版本序列化器
+class RuleVersionCreateSerializer(serializers.Serializer):
+    tables = serializers.DictField(allow_empty=False, help_text="要修改的加分表")
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    activate = serializers.BooleanField(required=False, default=False)
+
+# 加分规则版本生效序列化器
+class RuleActivateSerializer(serializers.Serializer):
+    rescore = serializers.BooleanField(required=False, default=False, help_text="是否同时重算待一审申请的加分")
+
+# 重算待一审申请加分序列化器
+class RescoreSerializer(serializers.Serializer):
+    application_types = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
+    dry_run = serializers.BooleanField(required=False, default=False)
+
 # 三审操作序列化器
 class ThirdReviewActionSerializer(serializers.Serializer):
     result = serializers.ChoiceField(choices=[('passed', '通过'), ('failed', '不通过')], required=True)
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+
+from user.models import User
+from .index import remove_application, sync_application, sync_student
+from .models import APPLICATION_MODELS
+from .review_queue import remove_review_item, sync_review_item, sync_student_review_items
+from .uploads import release_application_files
+
+
+# 学生的这些字段变化时需要同步申请索引
+STUDENT_INDEX_FIELDS = {'name', 'school_id', 'college', 'clazz'}
+
+
+def application_saved(sender, instance, **kwargs):
+    """申请保存后同步申请索引和审核队列"""
+    sync_application(instance)
+    sync_review_item(instance)
+
+
+def application_deleted(sender, instance, **kwargs):
+    """申请删除后移除索引记录和审核队列记录，并释放申请引用的上传文件"""
+    remove_application(instance.id)
+    remove_review_item(instance.id)
+    release_application_files(instance)
+
+
+def student_saved(sender, instance, created, update_fields=None, **kwargs):
+    """学生信息变化后同步其申请的索引记录（只更新登录时间等无关字段时跳过）"""
+    if created or instance.user_type != 'student':
+        return
+    if update_fields is not None and not STUDENT_INDEX_FIELDS.intersection(update_fields):
+        return
+    sync_student(instance)
+    sync_student_review_items(instance)
+
+
+def connect_signals():
+    for model in APPLICATION_MODELS:
+        uid = f'material_index_{model._meta.model_name}'
+        post_save.connect(application_saved, sender=model, dispatch_uid=f'{uid}_save')
+        post_delete.connect(application_deleted, sender=model, dispatch_uid=f'{uid}_delete')
+    post_save.connect(student_saved, sender=User, dispatch_uid='material_index_student_save')
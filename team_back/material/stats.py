@@ -0,0 +1,63 @@
+"""
+申请统计：一次 UNION ALL 查询得到12类申请按审核状态分组的数量，以及其中由某位老师审核过的数量
+学生、教师、管理员的统计接口都在此基础上按各自口径汇总
+"""
+from django.db import models
+
+from .models import APPLICATION_MODEL_NAMES
+
+
+# 统计口径中的审核状态分组
+APPROVED_STATUSES = ['approved', 'first_approved', 'second_approved']
+REJECTED_STATUSES = ['rejected', 'first_rejected', 'second_rejected', 'third_rejected']
+
+
+def reviewed_by_q(reviewer_id):
+    """某位老师参与过任一审核阶段的条件（比较审核人ID，不加载审核人）"""
+    return (
+        models.Q(first_reviewer_id=reviewer_id) |
+        models.Q(second_reviewer_id=reviewer_id) |
+        models.Q(third_reviewer_id=reviewer_id)
+    )
+
+
+def get_status_counts(reviewer_id=None, **filters):
+    """
+    按申请类型和审核状态统计申请数量，filters 为各申请表通用的查询条件（如 user_id、user__college_id）
+    返回 {申请类型: {审核状态: {'total': 数量, 'reviewed': 其中 reviewer_id 审核过的数量}}}，
+    没有申请的类型对应空字典；不指定 reviewer_id 时 reviewed 为 0
+    """
+    if reviewer_id is not None:
+        reviewed = models.Count('id', filter=reviewed_by_q(reviewer_id))
+    else:
+        reviewed = models.Value(0, output_field=models.IntegerField())
+    queries = [
+        model.objects.filter(**filters)
+        .values('review_status')
+        .annotate(
+            application_type=models.Value(model_name, output_field=models.CharField()),
+            total=models.Count('id'),
+            reviewed=reviewed
+        )
+        .values_list('application_type', 'review_status', 'total', 'reviewed')
+        .order_by()
+        for model, model_name in APPLICATION_MODEL_NAMES.items()
+    ]
+
+    counts = {model_name: {} for model_name in APPLICATION_MODEL_NAMES.values()}
+    for model_name, review_status, total, reviewed_count in queries[0].union(*queries[1:], all=True):
+        counts[model_name][review_status] = {'total': total, 'reviewed': reviewed_count}
+    return counts
+
+
+def count_statuses(status_counts, statuses=None, key='total'):
+    """汇总一类申请中指定审核状态（默认全部状态）的数量"""
+    return sum(
+        item[key] for review_status, item in status_counts.items()
+        if statuses is None or review_status in statuses
+    )
+
+
+def count_all_types(counts, statuses=None, key='total'):
+    """汇总所有申请类型中指定审核状态的数量"""
+    return sum(count_statuses(status_counts, statuses, key) for status_counts in counts.values())
@@ -1,3 +1,385 @@
-from django.test import TestCase
+import datetime
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from score.models import ScoreRecalcTask
+from user.models import College, User
+from .batch_review import batch_review
+from .models import (
+    APPLICATION_MODEL_NAMES, AcademicCompetition, AcademicPaper, ApplicationIndex, CCFCSPCertification,
+    HonoraryTitle, InnovationProject, InternationalInternship, MilitaryService, PatentWork, ReviewQueueItem,
+    SocialWork, SportsCompetition, UploadBlob, VolunteerService
+)
+from .rules import DEFAULT_RULE_TABLES, DEFAULT_RULE_VERSION, RULE_EVALUATORS, BonusRules
+from .uploads import rebuild_blob_refcounts, release_blob, store_blob, upload_storage
+
+
+# 改造前各模型 calculate_bonus_points 的计算结果：(申请模型, 字段, 加分)
+BASELINE_BONUS_CASES = [
+    (AcademicPaper, {'journal_category': 'A', 'is_independent_author': True}, 10.0),
+    (AcademicPaper, {'journal_category': 'A', 'is_independent_author': True, 'is_xmu_first_unit': False}, 0.0),
+    (AcademicPaper, {'journal_category': 'A', 'is_co_first_author': True}, 5.0),
+    (AcademicPaper, {'journal_category': 'A', 'author_rank': '1'}, 8.0),
+    (AcademicPaper, {'journal_category': 'A', 'author_rank': '2'}, 2.0),
+    (AcademicPaper, {'journal_category': 'A++', 'is_independent_author': True}, 10.0),
+    (AcademicPaper, {'journal_category': 'B', 'author_rank': '1'}, 4.8),
+    (AcademicPaper, {'journal_category': 'B', 'author_rank': '3'}, 0.0),
+    (AcademicPaper, {'journal_category': 'B', 'author_rank': 'x'}, 3.0),
+    (AcademicPaper, {'journal_category': 'C', 'author_rank': '2'}, 0.2),
+    (AcademicPaper, {'journal_category': 'Nature', 'is_independent_author': True}, 20.0),
+    (AcademicPaper, {'journal_category': 'Science Advances', 'is_co_first_author': True}, 10.0),
+    (AcademicPaper, {'journal_category': 'CELL *', 'author_rank': '1'}, 16.0),
+    (AcademicPaper, {'journal_category': 'D', 'is_independent_author': True}, 0.0),
+    (AcademicPaper, {'journal_category': None, 'is_independent_author': True}, 0.0),
+    (PatentWork, {'author_type': 'independent_author'}, 2.0),
+    (PatentWork, {'author_type': 'independent_author', 'is_xmu_first_unit': False}, 0.0),
+    (PatentWork, {'author_type': 'first_author_except_teacher'}, 1.6),
+    (PatentWork, {'author_type': 'other'}, 1.0),
+    (AcademicCompetition, {'competition_level': 'A+', 'award_level': 'first_plus'}, 30.0),
+    (AcademicCompetition, {'competition_level': 'A+', 'award_level': 'second'}, 15.0),
+    (AcademicCompetition, {'competition_level': 'A+', 'award_level': 'honorable'}, 0.0),
+    (AcademicCompetition, {'competition_level': 'A', 'award_level': 'first'}, 15.0),
+    (AcademicCompetition, {'competition_level': 'A-', 'award_level': 'second'}, 5.0),
+    (AcademicCompetition, {'competition_level': 'A-', 'award_level': 'third'}, 2.0),
+    (AcademicCompetition, {'competition_level': 'B+', 'award_level': 'first'}, 0.0),
+    (AcademicCompetition, {'competition_level': None, 'award_level': None}, 5.0),
+    (InnovationProject, {'project_level': 'national', 'is_team_leader': True}, 1.0),
+    (InnovationProject, {'project_level': 'national', 'is_team_leader': False}, 0.3),
+    (InnovationProject, {'project_level': 'provincial', 'is_team_leader': False}, 0.2),
+    (InnovationProject, {'project_level': 'university', 'is_team_leader': False}, 0.05),
+    (InnovationProject, {'project_level': 'college', 'is_team_leader': True}, 0.0),
+    (InnovationProject, {'project_level': None, 'is_team_leader': True}, 0.1),
+    (CCFCSPCertification, {'csp_rank_percentage': '0.2'}, 10.0),
+    (CCFCSPCertification, {'csp_rank_percentage': '1.5'}, 5.0),
+    (CCFCSPCertification, {'csp_rank_percentage': '5'}, 0.0),
+    (CCFCSPCertification, {'csp_rank_percentage': None}, 2.0),
+    (InternationalInternship, {'internship_duration': '一年'}, 1.0),
+    (InternationalInternship, {'internship_duration': '半年'}, 0.5),
+    (InternationalInternship, {'internship_duration': '8个月'}, 0.5),
+    (InternationalInternship, {'internship_duration': '15个月'}, 1.0),
+    (InternationalInternship, {'internship_duration': '3个月'}, 0.0),
+    (InternationalInternship, {'internship_duration': '两周'}, 0.0),
+    (MilitaryService, {'service_start_date': datetime.date(2020, 9, 1), 'service_end_date': datetime.date(2021, 8, 31)}, 0.0),
+    (MilitaryService, {'service_start_date': datetime.date(2020, 9, 1), 'service_end_date': datetime.date(2021, 9, 1)}, 1.0),
+    (MilitaryService, {'service_start_date': datetime.date(2020, 9, 1), 'service_end_date': datetime.date(2025, 1, 1)}, 2.0),
+    (VolunteerService, {'service_type': 'hours', 'working_hours': None}, 0.0),
+    (VolunteerService, {'service_type': 'hours', 'working_hours': Decimal('200')}, 0.0),
+    (VolunteerService, {'service_type': 'hours', 'working_hours': Decimal('230')}, 0.75),
+    (VolunteerService, {'service_type': 'hours', 'working_hours': Decimal('260.5')}, 1.0),
+    (VolunteerService, {'service_type': 'recognition', 'level': 'national', 'is_team': True, 'team_role': 'leader'}, 1.0),
+    (VolunteerService, {'service_type': 'recognition', 'level': 'provincial', 'is_team': True, 'team_role': 'member'}, 0.25),
+    (VolunteerService, {'service_type': 'recognition', 'level': 'provincial'}, 0.5),
+    (VolunteerService, {'service_type': 'recognition', 'level': 'university', 'is_team': True}, 0.1),
+    (VolunteerService, {'service_type': 'recognition', 'level': 'college', 'is_team': True, 'team_role': 'leader'}, 0.0),
+    (VolunteerService, {'service_type': 'recognition', 'level': None}, 0.25),
+    (HonoraryTitle, {'level': 'national'}, 2.0),
+    (HonoraryTitle, {'level': 'national', 'is_collective': True}, 1.0),
+    (HonoraryTitle, {'level': 'provincial', 'is_collective': True}, 0.5),
+    (HonoraryTitle, {'level': 'college', 'is_collective': True}, 0.05),
+    (HonoraryTitle, {'level': 'school'}, 0.0),
+    (HonoraryTitle, {'level': None}, 0.2),
+    (SocialWork, {'position': '院学生会执行主席', 'performance_score': Decimal('90'), 'work_duration': '一学年'}, 1.8),
+    (SocialWork, {'position': '院学生会执行主席', 'performance_score': Decimal('90'), 'work_duration': '半年'}, 0.9),
+    (SocialWork, {'position': '院学生会执行主席', 'performance_score': Decimal('90'), 'work_duration': '一学期'}, 0.0),
+    (SocialWork, {'position': '院学生会执行主席', 'position_coefficient': Decimal('1.5'), 'performance_score': Decimal('90'), 'work_duration': '半年'}, 0.675),
+    (SocialWork, {'position': '院学生会、团总支各部部长', 'performance_score': Decimal('90'), 'work_duration': '一学年'}, 0.9),
+    (SocialWork, {'position': '社团副社长', 'performance_score': Decimal('90'), 'work_duration': '半年'}, 0.225),
+    (SocialWork, {'position': '普通干事', 'performance_score': Decimal('90')}, 0.9),
+    (SocialWork, {'position': '班长', 'performance_score': Decimal('0')}, 0.0),
+    (SportsCompetition, {'competition_level': 'international', 'achievement': 'champion', 'is_team_project': True, 'team_size': 1}, 2.6667),
+    (SportsCompetition, {'competition_level': 'international', 'achievement': 'runner_up', 'is_team_project': True, 'team_size': 4}, 1.625),
+    (SportsCompetition, {'competition_level': 'national', 'achievement': 'champion', 'is_team_project': False}, 1.6667),
+    (SportsCompetition, {'competition_level': 'national', 'achievement': 'fourth_to_eighth', 'is_team_project': True, 'team_size': 1}, 0.3333),
+    (SportsCompetition, {'competition_level': None, 'achievement': None, 'is_team_project': True, 'team_size': 4}, 0.25),
+    (SportsCompetition, {'competition_level': 'provincial', 'achievement': 'champion', 'is_team_project': True}, 0.0),
+]
+
+
+class DefaultRuleTablesTest(TestCase):
+    """内置默认加分表（版本 0）与改造前的加分计算结果一致"""
+
+    def test_default_tables_match_baseline(self):
+        rules = BonusRules(DEFAULT_RULE_VERSION, DEFAULT_RULE_TABLES)
+        for model, fields, expected in BASELINE_BONUS_CASES:
+            with self.subTest(model=model.__name__, **fields):
+                self.assertAlmostEqual(float(rules.evaluate(model(**fields))), expected, places=4)
+
+    def test_every_application_type_is_covered(self):
+        covered = {APPLICATION_MODEL_NAMES[model] for model, _, _ in BASELINE_BONUS_CASES}
+        self.assertEqual(covered, set(RULE_EVALUATORS))
+
+
+class ReviewTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = College.objects.create(name='信息学院')
+        cls.admin = User.objects.create_user(
+            school_id='a1', name='管理员', college=cls.college, user_type='admin', password='x'
+        )
+        cls.teacher = User.objects.create_user(
+            school_id='t1', name='老师', college=cls.college, user_type='teacher', password='x'
+        )
+        cls.other_teacher = User.objects.create_user(
+            school_id='t2', name='另一位老师', college=cls.college, user_type='teacher', password='x'
+        )
+        cls.student = User.objects.create_user(
+            school_id='s1', name='学生', college=cls.college, user_type='student', password='x'
+        )
+
+    def create_title(self, **fields):
+        return HonoraryTitle.objects.create(user=self.student, title_name='三好学生', level='university', **fields)
+
+
+class ReviewCompareAndSetTest(ReviewTestMixin, TestCase):
+    """审核状态转换的条件更新：审核状态已被其他审核人改变时不写入"""
+
+    def test_stale_instance_does_not_overwrite(self):
+        application = self.create_title()
+        stale = HonoraryTitle.objects.get(pk=application.pk)
+        fresh = HonoraryTitle.objects.get(pk=application.pk)
+        changes, _ = fresh.first_review_changes(self.teacher, 'passed')
+        self.assertTrue(fresh.compare_and_set(fresh.FIRST_REVIEW_STATUSES, **changes))
+
+        changes, _ = stale.first_review_changes(self.other_teacher, 'failed')
+        self.assertFalse(stale.compare_and_set(stale.FIRST_REVIEW_STATUSES, **changes))
+        application.refresh_from_db()
+        self.assertEqual(application.review_status, 'first_approved')
+        self.assertEqual(application.first_reviewer_id, self.teacher.id)
+
+    def test_approve_with_stale_status_returns_409(self):
+        application = self.create_title()
+        stale = HonoraryTitle.objects.select_related('user').get(pk=application.pk)
+        changes, _ = application.first_review_changes(self.teacher, 'passed')
+        self.assertTrue(application.compare_and_set(application.FIRST_REVIEW_STATUSES, **changes))
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with mock.patch('material.views.get_application', return_value=(stale, HonoraryTitle)):
+            response = client.post(
+                f'/api/material/admin/applications/{application.pk}/approve/', {'score': '0.1'}, format='json'
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['error'], '申请已被其他老师审核，请刷新后重试')
+        application.refresh_from_db()
+        self.assertEqual(application.review_status, 'first_approved')
+        self.assertEqual(application.first_reviewer_id, self.teacher.id)
+
+
+class BatchReviewTest(ReviewTestMixin, TestCase):
+    """批量审核接口"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def batch_review(self, application_ids, **data):
+        data.setdefault('result', 'passed')
+        return self.client.post(
+            '/api/material/admin/applications/batch-review/',
+            {'application_ids': [str(application_id) for application_id in application_ids], **data},
+            format='json'
+        )
+
+    def test_first_review_across_types(self):
+        titles = [self.create_title(), self.create_title()]
+        certification = CCFCSPCertification.objects.create(
+            user=self.student, score=300, certification_date=datetime.date(2024, 3, 1), csp_rank_percentage='1.5'
+        )
+        reviewed = self.create_title(review_status='first_approved')
+        missing = uuid.uuid4()
+
+        response = self.batch_review([*[title.id for title in titles], certification.id, reviewed.id, missing])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['succeeded'], data['failed']), (3, 2))
+        results = {item['id']: item for item in data['results']}
+        self.assertEqual(results[str(reviewed.id)]['error'], '当前状态无法进行一审')
+        self.assertEqual(results[str(missing)]['error'], '申请不存在')
+
+        ids = [titles[0].id, titles[1].id, certification.id]
+        for model, application_id in [(HonoraryTitle, ids[0]), (HonoraryTitle, ids[1]), (CCFCSPCertification, ids[2])]:
+            application = model.objects.get(pk=application_id)
+            self.assertEqual(application.review_status, 'first_approved')
+            self.assertEqual(application.first_reviewer_id, self.admin.id)
+        self.assertEqual(
+            set(ApplicationIndex.objects.filter(id__in=ids).values_list('review_status', flat=True)), {'first_approved'}
+        )
+        self.assertEqual(
+            set(ReviewQueueItem.objects.filter(id__in=ids).values_list('stage', flat=True)), {'second_review'}
+        )
+
+    def test_leased_application_is_skipped(self):
+        application = self.create_title()
+        ReviewQueueItem.objects.filter(id=application.id).update(
+            leased_by=self.other_teacher, lease_expires_at=timezone.now() + timedelta(minutes=10)
+        )
+        response = self.batch_review([application.id])
+        self.assertEqual(response.json()['data']['results'][0]['error'], '该申请已被其他老师领取')
+        application.refresh_from_db()
+        self.assertEqual(application.review_status, 'pending')
+
+    def test_sync_failure_rolls_back_reviews(self):
+        application = self.create_title()
+        with mock.patch('material.batch_review.requeue_review_items', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                batch_review(self.admin, [application.id], 'first_review', 'passed')
+        application.refresh_from_db()
+        self.assertEqual(application.review_status, 'pending')
+        self.assertEqual(ApplicationIndex.objects.get(id=application.id).review_status, 'pending')
+        self.assertEqual(ReviewQueueItem.objects.get(id=application.id).stage, 'first_review')
+
+    def test_final_approval_marks_student_dirty_after_commit(self):
+        application = self.create_title(review_status='second_approved', bonus_points=Decimal('0.2'))
+        ScoreRecalcTask.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.batch_review([application.id], stage='third_review', bonus_points='0.1')
+            self.assertFalse(ScoreRecalcTask.objects.filter(user=self.student).exists())
+        self.assertEqual(response.json()['data']['succeeded'], 1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(ScoreRecalcTask.objects.filter(user=self.student).exists())
+        application.refresh_from_db()
+        self.assertEqual(application.review_status, 'approved')
+        self.assertEqual(application.bonus_points, Decimal('0.1'))
+
+    def test_invalid_request(self):
+        self.assertEqual(self.batch_review([]).status_code, 400)
+        self.assertEqual(self.batch_review([uuid.uuid4()], stage='fourth_review').status_code, 400)
+
+
+class UploadStorageTestMixin(ReviewTestMixin):
+    """上传文件写入临时 MEDIA_ROOT，测试结束后删除"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def exists(self, name):
+        return os.path.exists(upload_storage.path(name))
+
+    def create_title_with_screenshot(self, content):
+        return self.create_title(screenshot=ContentFile(content, name='screenshot.PNG'))
+
+
+class UploadDedupTest(UploadStorageTestMixin, TestCase):
+    """内容寻址存储：相同内容只保存一次，引用次数归零后删除文件"""
+
+    def test_second_upload_reuses_blob(self):
+        blob, created = store_blob(ContentFile(b'cet report', name='report.PDF'))
+        self.assertTrue(created)
+        self.assertTrue(blob.name.startswith(f'uploads/{blob.sha256[:2]}/{blob.sha256[2:4]}/'))
+        self.assertTrue(blob.name.endswith('.pdf'))
+
+        again, created = store_blob(ContentFile(b'cet report', name='copy.txt'))
+        self.assertFalse(created)
+        self.assertEqual(again.name, blob.name)
+        self.assertEqual(UploadBlob.objects.get(pk=blob.pk).ref_count, 2)
+        self.assertTrue(self.exists(blob.name))
+        self.assertEqual(os.listdir(upload_storage.path('uploads/.tmp')), [])
+
+    def test_rollback_keeps_file(self):
+        blob, _ = store_blob(ContentFile(b'cet report', name='report.pdf'))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.assertTrue(release_blob(blob.name))
+                    raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(UploadBlob.objects.get(pk=blob.pk).ref_count, 1)
+        self.assertTrue(self.exists(blob.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(release_blob(blob.name))
+        self.assertFalse(UploadBlob.objects.filter(pk=blob.pk).exists())
+        self.assertFalse(self.exists(blob.name))
+
+    def test_deleting_application_releases_one_reference(self):
+        first = self.create_title_with_screenshot(b'screenshot')
+        second = self.create_title_with_screenshot(b'screenshot')
+        name = first.screenshot.name
+        self.assertEqual(second.screenshot.name, name)
+        self.assertEqual(UploadBlob.objects.get(name=name).ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(UploadBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(self.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(UploadBlob.objects.filter(name=name).exists())
+        self.assertFalse(self.exists(name))
+
+
+class RebuildUploadRefcountsTest(UploadStorageTestMixin, TestCase):
+    """按申请中的实际引用重算引用次数，删除过期的无引用文件"""
+
+    def setUp(self):
+        super().setUp()
+        self.referenced = UploadBlob.objects.get(name=self.create_title_with_screenshot(b'referenced').screenshot.name)
+        # 申请修改时换下的文件不会自动释放，引用次数偏大
+        UploadBlob.objects.filter(pk=self.referenced.pk).update(ref_count=3)
+        self.stale, _ = store_blob(ContentFile(b'stale', name='stale.pdf'))
+        UploadBlob.objects.filter(pk=self.stale.pk).update(created_at=timezone.now() - timedelta(days=2))
+        self.recent, _ = store_blob(ContentFile(b'recent', name='recent.pdf'))
+
+    def test_command_keeps_referenced_and_recent_blobs(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_upload_refcounts', '--min-age-hours', '24', stdout=out)
+        self.assertIn('上传文件3个，更新引用次数1个，删除1个，释放5字节', out.getvalue())
+        self.assertEqual(UploadBlob.objects.get(pk=self.referenced.pk).ref_count, 1)
+        self.assertTrue(self.exists(self.referenced.name))
+        self.assertEqual(UploadBlob.objects.get(pk=self.recent.pk).ref_count, 1)
+        self.assertTrue(self.exists(self.recent.name))
+        self.assertFalse(UploadBlob.objects.filter(pk=self.stale.pk).exists())
+        self.assertFalse(self.exists(self.stale.name))
+
+    def test_without_min_age_deletes_recent_blobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = rebuild_blob_refcounts()
+        self.assertEqual((report['updated'], report['deleted'], report['skipped']), (1, 2, 0))
+        self.assertEqual(list(UploadBlob.objects.values_list('pk', flat=True)), [self.referenced.pk])
+        self.assertFalse(self.exists(self.recent.name))
+
+    def test_dry_run_changes_nothing(self):
+        report = rebuild_blob_refcounts(min_age=timedelta(days=1), dry_run=True)
+        self.assertEqual((report['updated'], report['deleted'], report['freed_bytes']), (1, 1, 5))
+        self.assertEqual(UploadBlob.objects.get(pk=self.referenced.pk).ref_count, 3)
+        self.assertTrue(UploadBlob.objects.filter(pk=self.stale.pk).exists())
+        self.assertTrue(self.exists(self.stale.name))
+
+    def test_blobs_changed_during_scan_are_skipped(self):
+        scan = QuerySet.iterator
+
+        def iterator_with_concurrent_uploads(queryset, *args, **kwargs):
+            for item in scan(queryset, *args, **kwargs):
+                if isinstance(item, UploadBlob):
+                    # 扫描读到记录后，同一内容又被上传了一次
+                    UploadBlob.objects.filter(pk=item.pk).update(ref_count=F('ref_count') + 1)
+                yield item
+
+        with mock.patch.object(QuerySet, 'iterator', iterator_with_concurrent_uploads):
+            with self.captureOnCommitCallbacks(execute=True):
+                report = rebuild_blob_refcounts(min_age=timedelta(days=1))
+        self.assertEqual((report['updated'], report['deleted'], report['skipped']), (0, 0, 2))
+        self.assertEqual(UploadBlob.objects.get(pk=self.referenced.pk).ref_count, 4)
+        self.assertEqual(UploadBlob.objects.get(pk=self.stale.pk).ref_count, 2)
+        self.assertTrue(self.exists(self.stale.name))
@@ -0,0 +1,176 @@
+"""
+规则自动初审：可由机器核验的申请（英语成绩、CCF CSP认证、志愿工时等）按规则批量通过一审，
+其余申请仍留给教师审核；规则不会自动驳回申请
+规则可在 settings.MATERIAL_TRIAGE_RULES 中配置，每条规则是一组数据库查询条件
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import FieldError
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from .batch_review import batch_review
+from .index import INDEX_TYPE_MODELS
+from .models import ReviewMixin
+from .serializers import TriageRunSerializer
+
+
+# 默认规则：name 规则名，application_type 申请类型，filters 满足即可通过一审的查询条件
+DEFAULT_TRIAGE_RULES = [
+    {
+        'name': 'english_passing_score',
+        'description': '英语四六级成绩达到425分',
+        'application_type': 'english_scores',
+        'filters': {'exam_score__gte': 425},
+    },
+    {
+        'name': 'csp_top_rank',
+        'description': 'CCF CSP认证排名在前3%以内',
+        'application_type': 'ccf_csp_certifications',
+        'filters': {'csp_rank_percentage__in': ['0.2', '1.5', '3']},
+    },
+    {
+        'name': 'volunteer_hours',
+        'description': '志愿工时达到200小时',
+        'application_type': 'volunteer_services',
+        'filters': {'service_type': 'hours', 'working_hours__gte': 200},
+    },
+]
+
+TRIAGE_BATCH_SIZE = 500
+
+
+def get_triage_rules(names=None):
+    """当前生效的规则；指定 names 时只返回这些规则，未知规则名或申请类型抛出 ValueError"""
+    rules = getattr(settings, 'MATERIAL_TRIAGE_RULES', DEFAULT_TRIAGE_RULES)
+    for rule in rules:
+        if rule['application_type'] not in INDEX_TYPE_MODELS:
+            raise ValueError(f"规则 {rule['name']} 的申请类型无效: {rule['application_type']}")
+    if names:
+        known = {rule['name'] for rule in rules}
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(f"未知的规则: {', '.join(unknown)}")
+        rules = [rule for rule in rules if rule['name'] in names]
+    return rules
+
+
+def run_triage(rule_names=None, reviewer=None, batch_size=TRIAGE_BATCH_SIZE, dry_run=False):
+    """
+    按申请ID分批扫描待一审的申请，每批对每条规则执行一次查询，命中的申请批量通过一审
+    同一申请命中多条规则时只计入第一条；dry_run 为 True 时只统计不写入
+    返回运行报告：扫描数、通过数、留给人工审核数、耗时、每秒处理数、各规则命中数
+    """
+    started = time.monotonic()
+    rules_by_type = defaultdict(list)
+    for rule in get_triage_rules(rule_names):
+        rules_by_type[rule['application_type']].append(rule)
+
+    report = {
+        'scanned': 0,
+        'advanced': 0,
+        'rules': {rule['name']: 0 for rules in rules_by_type.values() for rule in rules},
+        'by_type': {},
+    }
+    for application_type, rules in rules_by_type.items():
+        model = INDEX_TYPE_MODELS[application_type]
+        pending = model.objects.filter(review_status__in=ReviewMixin.FIRST_REVIEW_STATUSES).order_by('id')
+        type_report = {'scanned': 0, 'advanced': 0}
+        last_id = None
+        while True:
+            batch = pending.filter(id__gt=last_id) if last_id is not None else pending
+            batch_ids = list(batch.values_list('id', flat=True)[:batch_size])
+            if not batch_ids:
+                break
+            last_id = batch_ids[-1]
+            type_report['scanned'] += len(batch_ids)
+
+            remaining = set(batch_ids)
+            for rule in rules:
+                try:
+                    hits = list(
+                        model.objects.filter(id__in=remaining, **rule['filters']).values_list('id', flat=True)
+                    )
+                except FieldError as e:
+                    raise ValueError(f"规则 {rule['name']} 的查询条件无效: {e}")
+                if not hits:
+                    continue
+                remaining.difference_update(hits)
+                if dry_run:
+                    advanced = len(hits)
+                else:
+                    results = batch_review(
+                        reviewer, hits, 'first_review', 'passed',
+                        review_comment=f"自动初审通过：{rule.get('description') or rule['name']}",
+                        check_permission=False
+                    )
+                    advanced = sum(1 for item in results if item['success'])
+                report['rules'][rule['name']] += advanced
+                type_report['advanced'] += advanced
+        report['by_type'][application_type] = type_report
+        report['scanned'] += type_report['scanned']
+        report['advanced'] += type_report['advanced']
+
+    elapsed = time.monotonic() - started
+    report['left_for_review'] = report['scanned'] - report['advanced']
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['per_second'] = round(report['scanned'] / elapsed, 1) if elapsed > 0 else None
+    report['dry_run'] = dry_run
+    return report
+
+
+class TriageViewSet(ViewSet):
+    """规则自动初审接口（管理员）"""
+    permission_classes = [IsAuthenticated]
+
+    def _check_admin(self, request):
+        user = request.user
+        if not hasattr(user, 'user_type') or user.user_type != 'admin':
+            return Response({
+                "error": "只有管理员可以执行自动初审"
+            }, status=status.HTTP_403_FORBIDDEN)
+        return None
+
+    def list(self, request):
+        """当前生效的规则"""
+        denied = self._check_admin(request)
+        if denied:
+            return denied
+        return Response({
+            "success": True,
+            "data": get_triage_rules()
+        })
+
+    @action(detail=False, methods=['post'])
+    def run(self, request):
+        """执行自动初审，请求体：{"rules": ["english_passing_score"], "dry_run": true}，不指定 rules 时执行全部规则"""
+        denied = self._check_admin(request)
+        if denied:
+            return denied
+        serializer = TriageRunSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "error": "参数错误",
+                "details": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = run_triage(
+                rule_names=serializer.validated_data.get('rules'),
+                reviewer=request.user,
+                dry_run=serializer.validated_data['dry_run']
+            )
+        except ValueError as e:
+            return Response({
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "success": True,
+            "message": f"{'预览' if report['dry_run'] else '自动初审'}完成，通过{report['advanced']}条，"
+                       f"留待人工审核{report['left_for_review']}条",
+            "data": report
+        })
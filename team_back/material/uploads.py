@@ -0,0 +1,217 @@
+"""
+内容寻址的上传存储：上传文件边写入临时文件边计算SHA-256，每份内容只在
+uploads/<哈希前2位>/<哈希3-4位>/<哈希>.<扩展名> 保存一次，UploadBlob 记录引用次数；
+同一内容再次上传时直接返回已有文件，不再写入新文件
+申请模型的文件字段和 upload_file 接口共用此存储
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+UPLOAD_DIR = 'uploads'
+# 扩展名最多保留的字符数（存储路径需放得下文件字段默认的100个字符）
+MAX_EXTENSION_LENGTH = 10
+REFCOUNT_BATCH_SIZE = 2000
+
+
+def blob_name(sha256, extension):
+    """内容哈希对应的存储路径（相对 MEDIA_ROOT）"""
+    name = f"{UPLOAD_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+    return f"{name}.{extension}" if extension else name
+
+
+def get_extension(filename):
+    """文件扩展名（小写，只保留字母和数字）"""
+    extension = os.path.splitext(filename or '')[1].lstrip('.').lower()
+    return ''.join(c for c in extension if c.isalnum())[:MAX_EXTENSION_LENGTH]
+
+
+def _stream_to_temp_file(storage, content):
+    """将上传内容分块写入 MEDIA_ROOT 下的临时文件并同时计算哈希，返回 (临时文件路径, SHA-256, 大小)"""
+    temp_dir = storage.path(f"{UPLOAD_DIR}/.tmp")
+    os.makedirs(temp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                destination.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+
+def store_blob(content, filename=None, storage=None):
+    """
+    保存上传内容，返回 (UploadBlob, 是否新保存)
+    内容已存在时引用次数加1并丢弃临时文件；已有记录但文件丢失时用本次上传的内容补回
+    """
+    from .models import UploadBlob
+
+    storage = storage or upload_storage
+    temp_path, sha256, size = _stream_to_temp_file(storage, content)
+    try:
+        while True:
+            try:
+                with transaction.atomic():
+                    blob, created = UploadBlob.objects.get_or_create(
+                        sha256=sha256,
+                        defaults={'name': blob_name(sha256, get_extension(filename or content.name)), 'size': size}
+                    )
+                    if not created:
+                        # 记录可能刚被释放删除，此时重新创建
+                        if not UploadBlob.objects.filter(pk=blob.pk).update(ref_count=models.F('ref_count') + 1):
+                            continue
+                        blob.ref_count += 1
+                    path = storage.path(blob.name)
+                    if created or not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        os.replace(temp_path, path)
+                        if storage.file_permissions_mode is not None:
+                            os.chmod(path, storage.file_permissions_mode)
+                    return blob, created
+            except IntegrityError:
+                # 并发上传了相同内容，重新读取对方创建的记录
+                continue
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _delete_blob_file(name, storage):
+    """
+    记录删除的事务提交后再删除文件，事务回滚时文件保持原样
+    提交后如有并发上传重新创建了同一内容的记录，则保留文件
+    """
+    from .models import UploadBlob
+
+    def delete():
+        if not UploadBlob.objects.filter(name=name).exists():
+            storage.delete_file(name)
+
+    transaction.on_commit(delete)
+
+
+def release_blob(name, storage=None):
+    """
+    释放一次引用；引用次数降为0时删除记录，事务提交后删除文件
+    返回 None 表示不是内容寻址存储的文件（如改造前上传的文件），否则返回是否删除了文件
+    """
+    from .models import UploadBlob
+
+    storage = storage or upload_storage
+    with transaction.atomic():
+        blobs = UploadBlob.objects.filter(name=name)
+        if not blobs.filter(ref_count__gt=0).update(ref_count=models.F('ref_count') - 1):
+            return None if not blobs.exists() else False
+        deleted, _ = blobs.filter(ref_count=0).delete()
+        if deleted:
+            _delete_blob_file(name, storage)
+        return bool(deleted)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    申请文件字段使用的存储：保存时按内容哈希决定存储路径（upload_to 只提供扩展名），
+    相同内容共用一个文件；删除时只释放一次引用
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # 存储路径由内容决定，同名即同一内容，不需要另取文件名
+        return name
+
+    def _save(self, name, content):
+        blob, _ = store_blob(content, filename=name, storage=self)
+        return blob.name
+
+    def delete(self, name):
+        if name and release_blob(name, storage=self) is None:
+            super().delete(name)
+
+    def delete_file(self, name):
+        """直接删除文件，不检查引用"""
+        super().delete(name)
+
+
+upload_storage = ContentAddressedStorage()
+
+
+def release_application_files(application):
+    """申请删除后释放其文件字段引用的上传文件（改造前上传的文件保持原样）"""
+    from .attachments import get_attachment_descriptors
+
+    for field_name, is_file in get_attachment_descriptors(type(application)):
+        file = getattr(application, field_name) if is_file else None
+        if file and file._committed:
+            release_blob(file.name)
+
+
+def count_blob_references(batch_size=REFCOUNT_BATCH_SIZE):
+    """统计各存储路径被申请引用的次数：文件字段的文件名，以及附件字段中指向媒体目录的URL"""
+    from .attachments import get_attachment_descriptors
+    from .models import APPLICATION_MODELS
+
+    prefix = f"{settings.MEDIA_URL}{UPLOAD_DIR}/"
+    references = {}
+
+    def add(name):
+        if name and name.startswith(f"{UPLOAD_DIR}/"):
+            references[name] = references.get(name, 0) + 1
+
+    for model in APPLICATION_MODELS:
+        field_names = [field_name for field_name, _ in get_attachment_descriptors(model)]
+        is_file = dict(get_attachment_descriptors(model))
+        for values in model.objects.values_list(*field_names).order_by().iterator(chunk_size=batch_size):
+            for field_name, value in zip(field_names, values):
+                if is_file[field_name]:
+                    add(value)
+                    continue
+                for url in value if isinstance(value, list) else [value]:
+                    if isinstance(url, str) and url.startswith(prefix):
+                        add(url[len(settings.MEDIA_URL):])
+    return references
+
+
+def rebuild_blob_refcounts(min_age=None, dry_run=False, batch_size=REFCOUNT_BATCH_SIZE):
+    """
+    按申请中的实际引用重算引用次数（申请修改时换下的文件不会自动释放），
+    并删除没有引用且创建时间早于 min_age（timedelta，给刚上传、尚未提交申请的文件留出时间）的文件
+    更新和删除都以扫描时读到的引用次数为条件，期间被并发上传或释放过的记录跳过，留待下次重算
+    返回 {'blobs', 'updated', 'deleted', 'skipped', 'freed_bytes'}
+    """
+    from .models import UploadBlob
+
+    references = count_blob_references(batch_size)
+    cutoff = timezone.now() - min_age if min_age else None
+    report = {'blobs': 0, 'updated': 0, 'deleted': 0, 'skipped': 0, 'freed_bytes': 0, 'dry_run': dry_run}
+    for blob in UploadBlob.objects.order_by('id').iterator(chunk_size=batch_size):
+        report['blobs'] += 1
+        ref_count = references.get(blob.name, 0)
+        unchanged = UploadBlob.objects.filter(pk=blob.pk, ref_count=blob.ref_count)
+        if ref_count == 0 and (cutoff is None or blob.created_at < cutoff):
+            if not dry_run:
+                with transaction.atomic():
+                    if not unchanged.delete()[0]:
+                        report['skipped'] += 1
+                        continue
+                    _delete_blob_file(blob.name, upload_storage)
+            report['deleted'] += 1
+            report['freed_bytes'] += blob.size
+        elif ref_count and ref_count != blob.ref_count:
+            if not dry_run and not unchanged.update(ref_count=ref_count):
+                report['skipped'] += 1
+                continue
+            report['updated'] += 1
+    return report
@@ -7,14 +7,22 @@ from abc import ABC, abstractmethod
 from django.http import JsonResponse
 from django.conf import settings
 from django.db.models import Q
-import os
-from uuid import uuid4
+from collections import defaultdict
+
+from xmuhelper.pagination import InvalidCursor, get_count, paginate_keyset, use_cursor
 
 from .models import (
     EnglishScore, AcademicPaper, PatentWork, AcademicCompetition,
     InnovationProject, CCFCSPCertification, InternationalInternship,
-    MilitaryService, VolunteerService, HonoraryTitle, SocialWork, SportsCompetition
+    MilitaryService, VolunteerService, HonoraryTitle, SocialWork, SportsCompetition,
+    APPLICATION_MODEL_NAMES, ApplicationIndex
 )
+from .index import CATEGORY_MAP, INDEX_TYPE_MODELS, get_application, get_application_title
+from .attachments import get_attachments
+from .batch_review import batch_review
+from .review_queue import get_lease_holder
+from .stats import APPROVED_STATUSES, REJECTED_STATUSES, count_statuses, get_status_counts
+from .uploads import store_blob, upload_storage
 from .serializers import (
     EnglishScoreSerializer, EnglishScoreCreateSerializer,
     AcademicPaperSerializer, AcademicPaperCreateSerializer,
@@ -28,86 +36,46 @@ from .serializers import (
     HonoraryTitleSerializer, HonoraryTitleCreateSerializer,
     SocialWorkSerializer, SocialWorkCreateSerializer,
     SportsCompetitionSerializer, SportsCompetitionCreateSerializer,
-    ApplicationSummarySerializer
+    ApplicationSummarySerializer,
+    BatchReviewSerializer
 )
 
-
-def collect_attachments(application, model):
-    attachments = []
-    
-    # 获取所有可能的附件字段
-    attachment_fields = [
-        'attachments', 'score_report', 'screenshot', 'file_url', 'path',
-        'proof_materials', 'materials', 'documents', 'paper_attachments',
-        'academic_paper_attachments', 'document_urls', 'file_urls', 'file_paths',
-        'attachment_urls', 'file', 'proof_file', 'evidence_file',
-        'supporting_document', 'report', 'certificate', 'diploma',
-        'award_certificate', 'competition_certificate', 'volunteer_certificate'
-    ]
-    
-    # 首先遍历模型的所有字段，查找FileField和ImageField类型的字段
-    for field in model._meta.get_fields():
-        field_name = field.name
-        
-        # 处理FileField和ImageField类型的字段
-        if hasattr(field, '__class__') and field.__class__.__name__ in ['FileField', 'ImageField']:
-            file = getattr(application, field_name, None)
-            if file and hasattr(file, 'name') and file.name:
-                try:
-                    file_url = file.url if hasattr(file, 'url') else str(file)
-                    attachments.append({
-                        'name': field_name,
-                        'url': file_url,
-                        'original_name': file.name
-                    })
-                except Exception as e:
-                    print(f"Error processing attachment {field_name}: {str(e)}")
-    
-    # 然后处理所有可能的附件字段，无论类型
-    for field_name in attachment_fields:
-        if hasattr(application, field_name):
-            value = getattr(application, field_name)
-            if value:
-                # 处理单个文件对象
-                if hasattr(value, 'name') and value.name:
-                    try:
-                        file_url = value.url if hasattr(value, 'url') else str(value)
-                        attachments.append({
-                            'name': field_name,
-                            'url': file_url,
-                            'original_name': value.name
-                        })
-                    except Exception as e:
-                        print(f"Error processing attachment {field_name}: {str(e)}")
-                # 处理字符串URL
-                elif isinstance(value, str) and (value.startswith('http://') or value.startswith('https://') or value.startswith('/')):
-                    attachments.append({
-                        'name': field_name,
-                        'url': value,
-                        'original_name': value.split('/')[-1] if '/' in value else value
-                    })
-                # 处理文件URL列表
-                elif isinstance(value, list):
-                    for i, item in enumerate(value):
-                        if isinstance(item, str) and (item.startswith('http://') or item.startswith('https://') or item.startswith('/')):
-                            attachments.append({
-                                'name': f"{field_name}_{i+1}",
-                                'url': item,
-                                'original_name': item.split('/')[-1] if '/' in item else item
-                            })
-                        # 处理列表中的文件对象
-                        elif hasattr(item, 'name') and item.name:
-                            try:
-                                file_url = item.url if hasattr(item, 'url') else str(item)
-                                attachments.append({
-                                    'name': f"{field_name}_{i+1}",
-                                    'url': file_url,
-                                    'original_name': item.name
-                                })
-                            except Exception as e:
-                                print(f"Error processing attachment {field_name}_{i+1}: {str(e)}")
-    
-    return attachments
+# 项目类型映射：前端项目类型 -> 后端申请类型（支持中英文）
+PROJECT_TYPE_MAPPING = {
+    # 英文项目类型
+    'english': 'english_scores',
+    'english_cet4': 'english_scores',
+    'english_cet6': 'english_scores',
+    'academic_paper': 'academic_papers',
+    'patent_work': 'patent_works',
+    'academic_competition': 'academic_competitions',
+    'innovation_project': 'innovation_projects',
+    'ccf_csp': 'ccf_csp_certifications',
+    'international_internship': 'international_internships',
+    'military_service': 'military_services',
+    'volunteer_service': 'volunteer_services',
+    'honorary_title': 'honorary_titles',
+    'social_work': 'social_works',
+    'sports_competition': 'sports_competitions',
+    # 中文项目类型
+    '英语成绩': 'english_scores',
+    '大学英语四级': 'english_scores',
+    '大学英语六级': 'english_scores',
+    '学术论文': 'academic_papers',
+    '专利著作': 'patent_works',
+    '学业竞赛': 'academic_competitions',
+    '大创项目': 'innovation_projects',
+    'CCF CSP认证': 'ccf_csp_certifications',
+    '国际组织实习': 'international_internships',
+    '参军入伍': 'military_services',
+    '志愿服务': 'volunteer_services',
+    '荣誉称号': 'honorary_titles',
+    '社会工作': 'social_works',
+    '体育比赛': 'sports_competitions'
+}
+
+# 申请列表允许的排序字段
+ADMIN_LIST_ORDERING_FIELDS = {'created_at', 'updated_at', 'estimated_score', 'review_status', 'student_school_id'}
 
 
 class BaseApplicationViewSet(viewsets.ViewSet, ABC):
@@ -299,7 +267,7 @@ class StudentApplicationViewSet(viewsets.ViewSet):
                 elif model_name == 'sports_competitions':
                     project_name = application.competition_name or "体育竞赛加分申请"
 
-                attachments = collect_attachments(application, model)
+                attachments = get_attachments(application)
 
                 # Map category to correct type names for front-end display
                 category_map = {
@@ -352,23 +320,9 @@ class StudentApplicationViewSet(viewsets.ViewSet):
         application = None
         model = None
 
-        # 支持的申请模型列表
-        application_models = [
-            EnglishScore, AcademicPaper, PatentWork, AcademicCompetition,
-            InnovationProject, CCFCSPCertification, InternationalInternship,
-            MilitaryService, VolunteerService, HonoraryTitle, SocialWork,
-            SportsCompetition
-        ]
-
-        # 如果没有提供type参数，自动尝试通过id查找申请
+        # 如果没有提供type参数，通过申请ID查找申请类型
         if not application_type:
-            for model_candidate in application_models:
-                try:
-                    application = model_candidate.objects.get(id=application_id, user=user)
-                    model = model_candidate
-                    break
-                except model_candidate.DoesNotExist:
-                    continue
+            application, model = get_application(application_id, user=user)
         else:
             # 根据type参数获取对应的模型
             model_mapping = {
@@ -429,7 +383,7 @@ class StudentApplicationViewSet(viewsets.ViewSet):
 
         serializer = serializer_class(application, context={'request': request})
 
-        attachments = collect_attachments(application, model)
+        attachments = get_attachments(application)
 
         # 获取application_type用于返回
         if not application_type:
@@ -470,22 +424,9 @@ class StudentApplicationViewSet(viewsets.ViewSet):
         application_type = request.query_params.get('type')
         application = None
 
-        # 支持的申请模型列表
-        application_models = [
-            EnglishScore, AcademicPaper, PatentWork, AcademicCompetition,
-            InnovationProject, CCFCSPCertification, InternationalInternship,
-            MilitaryService, VolunteerService, HonoraryTitle, SocialWork,
-            SportsCompetition
-        ]
-
-        # 如果没有提供type参数，自动尝试通过id查找申请
+        # 如果没有提供type参数，通过申请ID查找申请类型
         if not application_type:
-            for model in application_models:
-                try:
-                    application = model.objects.get(id=application_id, user=user)
-                    break
-                except model.DoesNotExist:
-                    continue
+            application, _ = get_application(application_id, user=user)
         else:
             # 根据type参数获取对应的模型
             model_mapping = {
@@ -645,43 +586,22 @@ class StudentApplicationViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # 统计各类申请的数量和状态
-        models = {
-            'english_scores': EnglishScore,
-            'academic_papers': AcademicPaper,
-            'patent_works': PatentWork,
-            'academic_competitions': AcademicCompetition,
-            'innovation_projects': InnovationProject,
-            'ccf_csp_certifications': CCFCSPCertification,
-            'international_internships': InternationalInternship,
-            'military_services': MilitaryService,
-            'volunteer_services': VolunteerService,
-            'honorary_titles': HonoraryTitle,
-            'social_works': SocialWork,
-            'sports_competitions': SportsCompetition,
-        }
-
+        # 统计各类申请的数量和状态（一次查询）
+        counts = get_status_counts(user_id=user.id)
         stats = {}
-        total_applications = 0
-        pending_applications = 0
-        approved_applications = 0
-        rejected_applications = 0
-
-        for model_name, model in models.items():
-            queryset = model.objects.filter(user=user)
+        for model_name, status_counts in counts.items():
             stats[model_name] = {
-                'total': queryset.count(),
-                'pending': queryset.filter(review_status='pending').count(),
-                'approved': queryset.filter(review_status='approved').count(),
-                'rejected': queryset.filter(review_status='rejected').count(),
-                'withdrawn': queryset.filter(review_status='withdrawn').count()
+                'total': count_statuses(status_counts),
+                'pending': count_statuses(status_counts, ['pending']),
+                'approved': count_statuses(status_counts, ['approved']),
+                'rejected': count_statuses(status_counts, ['rejected']),
+                'withdrawn': count_statuses(status_counts, ['withdrawn'])
             }
-            
-            # 更新总统计
-            total_applications += stats[model_name]['total']
-            pending_applications += stats[model_name]['pending']
-            approved_applications += stats[model_name]['approved']
-            rejected_applications += stats[model_name]['rejected']
+
+        total_applications = sum(item['total'] for item in stats.values())
+        pending_applications = sum(item['pending'] for item in stats.values())
+        approved_applications = sum(item['approved'] for item in stats.values())
+        rejected_applications = sum(item['rejected'] for item in stats.values())
 
         return Response({
             "success": True,
@@ -1049,30 +969,8 @@ class ApplicationViewSet(viewsets.ViewSet):
             application_id = pk
             user = request.user
             
-            # 定义所有申请模型
-            application_models = [
-                EnglishScore,
-                AcademicPaper,
-                PatentWork,
-                AcademicCompetition,
-                InnovationProject,
-                CCFCSPCertification,
-                InternationalInternship,
-                MilitaryService,
-                VolunteerService,
-                HonoraryTitle,
-                SocialWork,
-                SportsCompetition,
-            ]
-            
-            # 遍历所有模型查找对应的申请
-            application = None
-            for model in application_models:
-                try:
-                    application = model.objects.get(id=application_id, user=user)
-                    break
-                except model.DoesNotExist:
-                    continue
+            # 通过申请ID查找申请类型
+            application, _ = get_application(application_id, user=user)
             
             if not application:
                 return Response({'error': '申请不存在'}, status=status.HTTP_404_NOT_FOUND)
@@ -1133,118 +1031,48 @@ class ApplicationViewSet(viewsets.ViewSet):
                 
                 # 教师权限过滤：只能看到所属学院的学生申请统计
                 if user.user_type == 'teacher':
-                    query_filter['user__college'] = user.college
+                    query_filter['user__college_id'] = user.college_id
             else:
                 return Response(
                     {"error": "只有学生、教师和管理员可以查看申请统计"},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
+            # 一次查询得到各类申请按审核状态的数量；教师同时统计其中由本人审核过的数量
+            is_reviewer = user.user_type == 'teacher'
+            counts = get_status_counts(reviewer_id=user.id if is_reviewer else None, **query_filter)
+
             stats = {}
-            models = [
-                ('english_scores', EnglishScore),
-                ('academic_papers', AcademicPaper),
-                ('patent_works', PatentWork),
-                ('academic_competitions', AcademicCompetition),
-                ('innovation_projects', InnovationProject),
-                ('ccf_csp_certifications', CCFCSPCertification),
-                ('international_internships', InternationalInternship),
-                ('military_services', MilitaryService),
-                ('volunteer_services', VolunteerService),
-                ('honorary_titles', HonoraryTitle),
-                ('social_works', SocialWork),
-                ('sports_competitions', SportsCompetition),
-            ]
-            
-            total_applications = 0
-            pending_applications = 0
-            approved_applications = 0
-            rejected_applications = 0
-            withdrawn_applications = 0
-            
-            # 为教师用户重新初始化统计变量，因为需要特殊计算
-            if is_teacher and user.user_type == 'teacher':
-                pending_applications = 0
-                approved_applications = 0
-                rejected_applications = 0
-                total_applications = 0
-                withdrawn_applications = 0
-            
-            for model_name, model in models:
-                queryset = model.objects.filter(**query_filter)
-                
-                # 基础统计
-                base_stats = {
-                    'total': queryset.count(),
-                    'pending': queryset.filter(review_status='pending').count(),
-                    'approved': queryset.filter(review_status__in=['approved', 'first_approved', 'second_approved']).count(),
-                    'rejected': queryset.filter(review_status__in=['rejected', 'first_rejected', 'second_rejected', 'third_rejected']).count(),
-                    'withdrawn': queryset.filter(review_status='withdrawn').count()
-                }
-                
-                # 对于教师用户，需要重新计算待审批和已通过的数量
-                if is_teacher and user.user_type == 'teacher':
-                    # 待审批申请数量：所有该教师没有审批过的申请
-                    # 这里的逻辑是：所有本学院的申请中，排除掉该教师已经审批过的申请
-                    # 即该教师没有参与过任何审核阶段的申请
-                    pending_count = 0
-                    approved_count = 0
-                    rejected_count = 0
-                    total_count = 0
-                    withdrawn_count = 0
-                    
-                    # 遍历所有申请，逐个检查
-                    for application in queryset.all():
-                        # 统计总数量和已撤回数量
-                        total_count += 1
-                        if application.review_status == 'withdrawn':
-                            withdrawn_count += 1
-                            continue
-                        
-                        # 检查该教师是否已经审批过该申请
-                        is_reviewed_by_teacher = False
-                        if hasattr(application, 'first_reviewer') and application.first_reviewer == user:
-                            is_reviewed_by_teacher = True
-                        elif hasattr(application, 'second_reviewer') and application.second_reviewer == user:
-                            is_reviewed_by_teacher = True
-                        elif hasattr(application, 'third_reviewer') and application.third_reviewer == user:
-                            is_reviewed_by_teacher = True
-                        
-                        # 如果该教师没有审批过，计入待审批数量
-                        if not is_reviewed_by_teacher:
-                            pending_count += 1
-                        else:
-                            # 如果该教师审批过，根据状态计入已通过或已拒绝数量
-                            if application.review_status in ['approved', 'first_approved', 'second_approved']:
-                                approved_count += 1
-                            elif application.review_status in ['rejected', 'first_rejected', 'second_rejected', 'third_rejected']:
-                                rejected_count += 1
-                    
-                    # 更新统计数据
-                    pending_applications += pending_count
-                    approved_applications += approved_count
-                    rejected_applications += rejected_count
-                    total_applications += total_count
-                    withdrawn_applications += withdrawn_count
-                    
-                    # 更新模型的统计数据
+            for model_name, status_counts in counts.items():
+                total = count_statuses(status_counts)
+                withdrawn = count_statuses(status_counts, ['withdrawn'])
+                if is_reviewer:
+                    # 待审批：该教师没有参与过任何审核阶段的申请（已撤回的除外）；
+                    # 已通过、已拒绝：该教师审核过的申请按当前状态计入
+                    reviewed = (count_statuses(status_counts, key='reviewed')
+                                - count_statuses(status_counts, ['withdrawn'], key='reviewed'))
                     stats[model_name] = {
-                        'total': total_count,
-                        'pending': pending_count,
-                        'approved': approved_count,
-                        'rejected': rejected_count,
-                        'withdrawn': withdrawn_count
+                        'total': total,
+                        'pending': total - withdrawn - reviewed,
+                        'approved': count_statuses(status_counts, APPROVED_STATUSES, key='reviewed'),
+                        'rejected': count_statuses(status_counts, REJECTED_STATUSES, key='reviewed'),
+                        'withdrawn': withdrawn
                     }
                 else:
-                    # 对于学生和管理员，使用基础统计
-                    total_applications += base_stats['total']
-                    pending_applications += base_stats['pending']
-                    approved_applications += base_stats['approved']
-                    rejected_applications += base_stats['rejected']
-                    withdrawn_applications += base_stats['withdrawn']
-                    
-                    stats[model_name] = base_stats
-            
+                    stats[model_name] = {
+                        'total': total,
+                        'pending': count_statuses(status_counts, ['pending']),
+                        'approved': count_statuses(status_counts, APPROVED_STATUSES),
+                        'rejected': count_statuses(status_counts, REJECTED_STATUSES),
+                        'withdrawn': withdrawn
+                    }
+
+            total_applications = sum(item['total'] for item in stats.values())
+            pending_applications = sum(item['pending'] for item in stats.values())
+            approved_applications = sum(item['approved'] for item in stats.values())
+            rejected_applications = sum(item['rejected'] for item in stats.values())
+            withdrawn_applications = sum(item['withdrawn'] for item in stats.values())
+
             # 准备返回数据
             response_data = {
                 'success': True,
@@ -1299,258 +1127,142 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
                 "error": "只有教师和管理员可以查看所有申请"
             }, status=status.HTTP_403_FORBIDDEN)
         
-        applications = []
-        
-        application_models = [
-            (EnglishScore, 'english_scores'),
-            (AcademicPaper, 'academic_papers'),
-            (PatentWork, 'patent_works'),
-            (AcademicCompetition, 'academic_competitions'),
-            (InnovationProject, 'innovation_projects'),
-            (CCFCSPCertification, 'ccf_csp_certifications'),
-            (InternationalInternship, 'international_internships'),
-            (MilitaryService, 'military_services'),
-            (VolunteerService, 'volunteer_services'),
-            (HonoraryTitle, 'honorary_titles'),
-            (SocialWork, 'social_works'),
-            (SportsCompetition, 'sports_competitions'),
-        ]
-        
         # 获取查询参数
         status_filter = request.query_params.get('status')
         search = request.query_params.get('search')
         project_types = request.query_params.getlist('project_types')
-        
-        # 项目类型映射：前端项目类型 -> 后端模型名称（支持中英文）
-        project_type_mapping = {
-            # 英文项目类型
-            'english': 'english_scores',
-            'english_cet4': 'english_scores',
-            'english_cet6': 'english_scores',
-            'academic_paper': 'academic_papers',
-            'patent_work': 'patent_works',
-            'academic_competition': 'academic_competitions',
-            'innovation_project': 'innovation_projects',
-            'ccf_csp': 'ccf_csp_certifications',
-            'international_internship': 'international_internships',
-            'military_service': 'military_services',
-            'volunteer_service': 'volunteer_services',
-            'honorary_title': 'honorary_titles',
-            'social_work': 'social_works',
-            'sports_competition': 'sports_competitions',
-            # 中文项目类型
-            '英语成绩': 'english_scores',
-            '大学英语四级': 'english_scores',
-            '大学英语六级': 'english_scores',
-            '学术论文': 'academic_papers',
-            '专利著作': 'patent_works',
-            '学业竞赛': 'academic_competitions',
-            '大创项目': 'innovation_projects',
-            'CCF CSP认证': 'ccf_csp_certifications',
-            '国际组织实习': 'international_internships',
-            '参军入伍': 'military_services',
-            '志愿服务': 'volunteer_services',
-            '荣誉称号': 'honorary_titles',
-            '社会工作': 'social_works',
-            '体育比赛': 'sports_competitions'
-        }
-        
-        # 应用项目类型过滤
-        filtered_application_models = []
+        ordering = request.query_params.get('ordering', '-created_at')
+        if ordering.lstrip('-') not in ADMIN_LIST_ORDERING_FIELDS:
+            ordering = '-created_at'
+
+        # 所有类型的申请都从申请索引中一次查询
+        queryset = ApplicationIndex.objects.select_related('clazz')
+
+        # 应用项目类型过滤：前端项目类型 -> 后端申请类型（支持中英文）
         if project_types and project_types != ['']:
-            # 如果提供了项目类型参数，只保留匹配的模型
-            for model, model_name in application_models:
-                # 将模型名称映射到前端项目类型
-                for project_type in project_types:
-                    if project_type_mapping.get(project_type) == model_name:
-                        filtered_application_models.append((model, model_name))
-                        break
-        else:
-            # 否则使用所有模型
-            filtered_application_models = application_models
-        
-        for model, model_name in filtered_application_models:
-            # 基础查询
-            queryset = model.objects.all().order_by('-created_at')
-            
-            # 教师权限过滤：只能看到所属学院的学生申请
-            if user.user_type == 'teacher':
-                # 只能看到自己学院的学生申请
-                queryset = queryset.filter(user__college=user.college)
-                
-                # 根据不同状态应用不同的过滤逻辑
-                if status_filter and status_filter != 'all':
-                    # 已通过状态：只显示当前教师通过的申请
-                    if status_filter == 'approved':
-                        # 只显示当前教师审批通过的申请
-                        queryset = queryset.filter(
-                            # 一审通过且是当前教师审核
-                            (models.Q(review_status='first_approved') & models.Q(first_reviewer=user)) |
-                            # 二审通过且是当前教师审核
-                            (models.Q(review_status='second_approved') & models.Q(second_reviewer=user)) |
-                            # 最终通过且是当前教师审核
-                            (models.Q(review_status='approved') & (
-                                models.Q(first_reviewer=user) | 
-                                models.Q(second_reviewer=user) |
-                                models.Q(third_reviewer=user)
-                            ))
-                        )
-                    # 已拒绝状态：显示所有已拒绝的申请（不需要是当前教师审核的）
-                    elif status_filter == 'rejected':
-                        queryset = queryset.filter(
-                            review_status__in=['rejected', 'first_rejected', 'second_rejected', 'third_rejected']
-                        )
-                    # 待审核状态：显示需要当前教师审核的申请（不需要已经是审核人）
-                    # 对于待审核状态，只需要是本学院的学生申请即可
-                    elif status_filter == 'pending':
-                        queryset = queryset.filter(
-                            review_status__in=['pending', 'first_reviewing', 'second_reviewing', 'third_reviewing']
-                        )
-                    # 其他具体状态：显示匹配状态的申请
-                    else:
-                        queryset = queryset.filter(review_status=status_filter)
-                # 当没有状态筛选或状态为'all'时，显示所有本学院的申请
-                else:
-                    # 不需要额外的审核人过滤，已经有学院过滤
-                    pass
-            # 管理员不需要额外的状态过滤，已经在上面处理了
-            elif user.user_type == 'admin' and status_filter and status_filter != 'all':
-                queryset = queryset.filter(review_status=status_filter)
-            
-            # 搜索筛选
-            if search:
-                # 尝试根据不同模型的字段进行搜索
-                if model_name == 'english_scores':
-                    queryset = queryset.filter(
-                        Q(user__name__icontains=search) |
-                        Q(user__school_id__icontains=search) |
-                        Q(level__icontains=search)
-                    )
-                elif model_name == 'academic_papers':
+            queryset = queryset.filter(application_type__in={
+                PROJECT_TYPE_MAPPING[project_type] for project_type in project_types
+                if project_type in PROJECT_TYPE_MAPPING
+            })
+
+        # 教师权限过滤：只能看到所属学院的学生申请
+        if user.user_type == 'teacher':
+            queryset = queryset.filter(college_id=user.college_id)
+
+            # 根据不同状态应用不同的过滤逻辑
+            if status_filter and status_filter != 'all':
+                # 已通过状态：只显示当前教师审批通过的申请
+                if status_filter == 'approved':
                     queryset = queryset.filter(
-                        Q(user__name__icontains=search) |
-                        Q(user__school_id__icontains=search) |
-                        Q(paper_title__icontains=search) |
-                        Q(paper_doi__icontains=search)
+                        # 一审通过且是当前教师审核
+                        (Q(review_status='first_approved') & Q(first_reviewer_id=user.id)) |
+                        # 二审通过且是当前教师审核
+                        (Q(review_status='second_approved') & Q(second_reviewer_id=user.id)) |
+                        # 最终通过且是当前教师审核
+                        (Q(review_status='approved') & (
+                            Q(first_reviewer_id=user.id) |
+                            Q(second_reviewer_id=user.id) |
+                            Q(third_reviewer_id=user.id)
+                        ))
                     )
-                elif model_name == 'patent_works':
+                # 已拒绝状态：显示所有已拒绝的申请（不需要是当前教师审核的）
+                elif status_filter == 'rejected':
                     queryset = queryset.filter(
-                        Q(user__name__icontains=search) |
-                        Q(user__school_id__icontains=search) |
-                        Q(patent_number__icontains=search)
+                        review_status__in=['rejected', 'first_rejected', 'second_rejected', 'third_rejected']
                     )
-                elif model_name == 'academic_competitions':
+                # 待审核状态：显示需要当前教师审核的申请，只需要是本学院的学生申请即可
+                elif status_filter == 'pending':
                     queryset = queryset.filter(
-                        Q(user__name__icontains=search) |
-                        Q(user__school_id__icontains=search) |
-                        Q(competition_name__icontains=search) |
-                        Q(competition_specific_name__icontains=search)
+                        review_status__in=['pending', 'first_reviewing', 'second_reviewing', 'third_reviewing']
                     )
+                # 其他具体状态：显示匹配状态的申请
                 else:
-                    # 通用搜索字段
-                    queryset = queryset.filter(
-                        Q(user__name__icontains=search) |
-                        Q(user__school_id__icontains=search)
-                    )
-            
-            for application in queryset:
-                project_name = ""
-                if model_name == 'english_scores':
-                    project_name = f"{application.get_exam_type_display()}"
-                elif model_name == 'academic_papers':
-                    project_name = application.paper_title or "学术论文加分申请"
-                elif model_name == 'patent_works':
-                    project_name = application.paper_title or "专利著作加分申请"
-                elif model_name == 'academic_competitions':
-                    project_name = application.competition_specific_name or application.competition_name or "学业竞赛加分申请"
-                elif model_name == 'innovation_projects':
-                    project_name = application.project_name or "创新项目加分申请"
-                elif model_name == 'ccf_csp_certifications':
-                    project_name = f"CCF CSP认证_{application.score}"
-                elif model_name == 'international_internships':
-                    project_name = application.organization_name or "国际实习加分申请"
-                elif model_name == 'military_services':
-                    project_name = f"参军入伍服兵役加分申请_一年以上两年以内"
-                elif model_name == 'volunteer_services':
-                    project_name = application.activity_name or "志愿服务加分申请"
-                elif model_name == 'honorary_titles':
-                    project_name = application.title_name or "荣誉称号加分申请"
-                elif model_name == 'social_works':
-                    project_name = application.organization or "社会工作加分申请"
-                elif model_name == 'sports_competitions':
-                    project_name = application.competition_name or "体育竞赛加分申请"
-                
-                attachments = collect_attachments(application, model)
-                
-                # Map category to correct type names for front-end display
-                category_map = {
-                    'english_scores': 'english',
-                    'academic_papers': 'academic_paper',
-                    'patent_works': 'patent_work',
-                    'academic_competitions': 'academic_competition',
-                    'innovation_projects': 'innovation',
-                    'ccf_csp_certifications': 'ccf_csp',
-                    'international_internships': 'internship',
-                    'military_services': 'military',
-                    'volunteer_services': 'volunteer_service',
-                    'honorary_titles': 'honor',
-                    'social_works': 'social',
-                    'sports_competitions': 'sports_competition'
-                }
-                category = category_map[model_name]
-                
-                # 获取学生班级信息
-                class_name = "未知"
-                if hasattr(application.user, 'class_name') and application.user.class_name:
-                    class_name = application.user.class_name
-                elif hasattr(application.user, 'clazz') and application.user.clazz:
-                    class_name = application.user.clazz.name
-                elif hasattr(application.user, 'class_field') and application.user.class_field:
-                    class_name = application.user.class_field
-                
-                # 获取项目类型的中文显示名称
-                project_type_display = category_map[model_name]
-                
-                # 检查当前教师是否已审核该申请
-                reviewedByCurrentTeacher = False
-                if hasattr(application, 'first_reviewer') and application.first_reviewer == user:
-                    reviewedByCurrentTeacher = True
-                elif hasattr(application, 'second_reviewer') and application.second_reviewer == user:
-                    reviewedByCurrentTeacher = True
-                elif hasattr(application, 'third_reviewer') and application.third_reviewer == user:
-                    reviewedByCurrentTeacher = True
-                
-                applications.append({
-                    "id": str(application.id),
-                    "category": category,
-                    "title": project_name,
-                    "score": getattr(application, 'estimated_score', 0) or 0,
-                    "created_at": application.created_at.isoformat(),  # 申请时间，ISO格式便于前端处理
-                    "applyTime": application.created_at.strftime("%Y-%m-%d %H:%M:%S"),  # 前端期望的申请时间格式
-                    "review_status": application.review_status,
-                    "attachments": attachments,
-                    "student_name": application.user.name,
-                    "student_id": application.user.school_id,
-                    "application_type": model_name,
-                    "class_name": class_name,  # 班级名称
-                    "project_type": project_type_display,  # 项目类型
-                    "type": project_type_display,  # 另一个可能的项目类型字段名
-                    "className": class_name,  # 前端期望的班级名称字段名
-                    "reviewedByCurrentTeacher": reviewedByCurrentTeacher  # 当前教师是否已审核该申请
-                })
-        
+                    queryset = queryset.filter(review_status=status_filter)
+        elif user.user_type == 'admin' and status_filter and status_filter != 'all':
+            queryset = queryset.filter(review_status=status_filter)
+
+        # 搜索筛选：学生姓名、学号、项目名称
+        if search:
+            queryset = queryset.filter(
+                Q(student_name__icontains=search) |
+                Q(student_school_id__icontains=search) |
+                Q(title__icontains=search)
+            )
+
         # 分页
         page_size = int(request.query_params.get('page_size', 10))
         page = int(request.query_params.get('page', 1))
-        
-        start = (page - 1) * page_size
-        end = start + page_size
-        paginated_applications = applications[start:end]
-        
+
+        cursor_mode = use_cursor(request)
+        if cursor_mode:
+            # 游标分页：按 (排序字段, id) 翻页，不统计总数
+            try:
+                entries, next_cursor = paginate_keyset(
+                    queryset, ordering, cursor=request.query_params.get('cursor'), page_size=page_size
+                )
+            except InvalidCursor as e:
+                return Response({
+                    "error": str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            start = (page - 1) * page_size
+            end = start + page_size
+            # 总数按查询条件缓存，未搜索且范围很大时使用估算值
+            total, count_exact = get_count(queryset, allow_estimate=not search)
+            entries = list(queryset.order_by(ordering, 'id')[start:end])
+
+        # 附件清单直接从索引读取；只有尚未生成清单的申请才加载申请本身（每种类型一次查询）
+        page_applications = {}
+        page_ids = defaultdict(list)
+        for entry in entries:
+            if entry.attachments is None:
+                page_ids[entry.application_type].append(entry.id)
+        for application_type, ids in page_ids.items():
+            page_applications.update(INDEX_TYPE_MODELS[application_type].objects.in_bulk(ids))
+
+        applications = []
+        for entry in entries:
+            if entry.attachments is not None:
+                attachments = entry.attachments
+            else:
+                application = page_applications.get(entry.id)
+                attachments = get_attachments(application) if application else []
+            category = CATEGORY_MAP[entry.application_type]
+            class_name = entry.clazz.name if entry.clazz else "未知"
+
+            applications.append({
+                "id": str(entry.id),
+                "category": category,
+                "title": entry.title,
+                "score": entry.estimated_score or 0,
+                "created_at": entry.created_at.isoformat(),  # 申请时间，ISO格式便于前端处理
+                "applyTime": entry.created_at.strftime("%Y-%m-%d %H:%M:%S"),  # 前端期望的申请时间格式
+                "review_status": entry.review_status,
+                "attachments": attachments,
+                "student_name": entry.student_name,
+                "student_id": entry.student_school_id,
+                "application_type": entry.application_type,
+                "class_name": class_name,  # 班级名称
+                "project_type": category,  # 项目类型
+                "type": category,  # 另一个可能的项目类型字段名
+                "className": class_name,  # 前端期望的班级名称字段名
+                # 当前教师是否已审核该申请
+                "reviewedByCurrentTeacher": user.id in (
+                    entry.first_reviewer_id, entry.second_reviewer_id, entry.third_reviewer_id
+                )
+            })
+
+        if cursor_mode:
+            return Response({
+                "success": True,
+                "next_cursor": next_cursor,
+                "results": applications
+            })
         return Response({
             "success": True,
-            "count": len(applications),
-            "results": paginated_applications
+            "count": total,
+            "count_exact": count_exact,
+            "results": applications
         })
     
     def retrieve(self, request, pk=None):
@@ -1568,31 +1280,9 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
         model = None
         model_name = None
         
-        # 支持的申请模型列表
-        application_models = [
-            (EnglishScore, 'english_scores'),
-            (AcademicPaper, 'academic_papers'),
-            (PatentWork, 'patent_works'),
-            (AcademicCompetition, 'academic_competitions'),
-            (InnovationProject, 'innovation_projects'),
-            (CCFCSPCertification, 'ccf_csp_certifications'),
-            (InternationalInternship, 'international_internships'),
-            (MilitaryService, 'military_services'),
-            (VolunteerService, 'volunteer_services'),
-            (HonoraryTitle, 'honorary_titles'),
-            (SocialWork, 'social_works'),
-            (SportsCompetition, 'sports_competitions'),
-        ]
-        
-        # 自动尝试通过id查找申请
-        for model_candidate, name_candidate in application_models:
-            try:
-                application = model_candidate.objects.get(id=application_id)
-                model = model_candidate
-                model_name = name_candidate
-                break
-            except model_candidate.DoesNotExist:
-                continue
+        # 通过申请ID查找申请类型，并一次加载学生、班级、学院和审核人
+        application, model = get_application(application_id)
+        model_name = APPLICATION_MODEL_NAMES.get(model)
         
         if not application:
             return Response({
@@ -1606,51 +1296,13 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
             }, status=status.HTTP_403_FORBIDDEN)
         
         # 获取项目名称
-        project_name = ""
-        if model_name == 'english_scores':
-            project_name = f"{application.get_exam_type_display()}"
-        elif model_name == 'academic_papers':
-            project_name = application.paper_title or "学术论文加分申请"
-        elif model_name == 'patent_works':
-            project_name = application.paper_title or "专利著作加分申请"
-        elif model_name == 'academic_competitions':
-            project_name = application.competition_specific_name or application.competition_name or "学业竞赛加分申请"
-        elif model_name == 'innovation_projects':
-            project_name = application.project_name or "创新项目加分申请"
-        elif model_name == 'ccf_csp_certifications':
-            project_name = f"CCF CSP认证_{application.score}"
-        elif model_name == 'international_internships':
-            project_name = application.organization_name or "国际实习加分申请"
-        elif model_name == 'military_services':
-            project_name = f"参军入伍服兵役加分申请_一年以上两年以内"
-        elif model_name == 'volunteer_services':
-            project_name = application.activity_name or "志愿服务加分申请"
-        elif model_name == 'honorary_titles':
-            project_name = application.title_name or "荣誉称号加分申请"
-        elif model_name == 'social_works':
-            project_name = application.organization or "社会工作加分申请"
-        elif model_name == 'sports_competitions':
-            project_name = application.competition_name or "体育竞赛加分申请"
+        project_name = get_application_title(application, model_name)
         
         # 收集附件
-        attachments = collect_attachments(application, model)
+        attachments = get_attachments(application)
         
         # Map category to correct type names for front-end display
-        category_map = {
-            'english_scores': 'english',
-            'academic_papers': 'academic_paper',
-            'patent_works': 'patent_work',
-            'academic_competitions': 'academic_competition',
-            'innovation_projects': 'innovation',
-            'ccf_csp_certifications': 'ccf_csp',
-            'international_internships': 'internship',
-            'military_services': 'military',
-            'volunteer_services': 'volunteer_service',
-            'honorary_titles': 'honor',
-            'social_works': 'social',
-            'sports_competitions': 'sports_competition'
-        }
-        category = category_map[model_name]
+        category = CATEGORY_MAP[model_name]
         
         # 获取学生班级信息
         class_name = "未知"
@@ -1749,7 +1401,7 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
                     project_name = application.competition_name or "体育竞赛加分申请"
                 
                 # 收集附件
-                attachments = collect_attachments(application, model)
+                attachments = get_attachments(application)
                 
                 # Map category to correct type names for front-end display
                 category_map = {
@@ -1822,36 +1474,21 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
         application = None
         model = None
         
-        # 支持的申请模型列表
-        application_models = [
-            (EnglishScore, 'english_scores'),
-            (AcademicPaper, 'academic_papers'),
-            (PatentWork, 'patent_works'),
-            (AcademicCompetition, 'academic_competitions'),
-            (InnovationProject, 'innovation_projects'),
-            (CCFCSPCertification, 'ccf_csp_certifications'),
-            (InternationalInternship, 'international_internships'),
-            (MilitaryService, 'military_services'),
-            (VolunteerService, 'volunteer_services'),
-            (HonoraryTitle, 'honorary_titles'),
-            (SocialWork, 'social_works'),
-            (SportsCompetition, 'sports_competitions'),
-        ]
-        
-        # 自动尝试通过id查找申请
-        for model_candidate, name_candidate in application_models:
-            try:
-                application = model_candidate.objects.get(id=application_id)
-                model = model_candidate
-                break
-            except model_candidate.DoesNotExist:
-                continue
+        # 通过申请ID查找申请类型，并一次加载学生、班级、学院和审核人
+        application, model = get_application(application_id)
         
         if not application:
             return Response({
                 "error": "申请不存在"
             }, status=status.HTTP_404_NOT_FOUND)
         
+        # 申请已被其他老师领取且租约未到期时不能审核
+        lease_holder = get_lease_holder(application_id, user)
+        if lease_holder:
+            return Response({
+                "error": f"该申请已被{lease_holder.name}领取，请稍后再试"
+            }, status=status.HTTP_409_CONFLICT)
+        
         # 获取审批分数
         score = request.data.get('score')
         
@@ -1885,21 +1522,6 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
         
         # 更新申请状态和分数
         try:
-            from django.utils import timezone
-            
-            # 检查教师是否已经审批过该申请
-            has_reviewed = False
-            if (hasattr(application, 'first_reviewer') and application.first_reviewer == user) or \
-               (hasattr(application, 'second_reviewer') and application.second_reviewer == user) or \
-               (hasattr(application, 'third_reviewer') and application.third_reviewer == user):
-                has_reviewed = True
-            
-            # 允许教师修改自己的审核决定
-            # if has_reviewed:
-            #     return Response({
-            #         "error": "您已经审批过该申请"
-            #     }, status=status.HTTP_400_BAD_REQUEST)
-            
             # 获取审批分数和审核意见
             review_comment = request.data.get('review_comment', '')
             
@@ -1910,54 +1532,41 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
                 bonus_points = None
             
             # 检查教师是否已经审批过该申请
-            is_first_reviewer = hasattr(application, 'first_reviewer') and application.first_reviewer == user
-            is_second_reviewer = hasattr(application, 'second_reviewer') and application.second_reviewer == user
-            is_third_reviewer = hasattr(application, 'third_reviewer') and application.third_reviewer == user
+            is_first_reviewer = application.first_reviewer_id == user.id
+            is_second_reviewer = application.second_reviewer_id == user.id
+            is_third_reviewer = application.third_reviewer_id == user.id
             
             # 获取当前审核阶段
             current_status = application.review_status
             
-            # 根据当前状态和审核人身份执行相应的审核操作
+            # 根据当前状态和审核人身份确定审核操作；不能进入下一阶段时（如修改自己的审核决定）只更新加分
+            changes = {}
+            expected_statuses = [current_status]
             if current_status in ['pending', 'first_reviewing'] or is_first_reviewer:
                 # 一审或修改一审决定
-                if hasattr(application, 'perform_first_review'):
-                    application.perform_first_review(user, 'passed', review_comment)
-                else:
-                    # 兼容旧模型，直接更新字段
-                    application.first_reviewer = user
-                    application.first_reviewed_at = timezone.now()
-                    application.review_status = 'first_approved'
+                if application.can_first_review(user):
+                    changes, _ = application.first_review_changes(user, 'passed', review_comment)
+                    expected_statuses = application.FIRST_REVIEW_STATUSES
             elif current_status in ['first_approved', 'second_reviewing'] or is_second_reviewer:
                 # 二审或修改二审决定
-                if hasattr(application, 'perform_second_review'):
-                    application.perform_second_review(user, 'passed', review_comment, bonus_points)
-                else:
-                    # 兼容旧模型，直接更新字段
-                    application.second_reviewer = user
-                    application.second_reviewed_at = timezone.now()
-                    application.review_status = 'second_approved'
+                if application.can_second_review(user):
+                    changes, _ = application.second_review_changes(user, 'passed', review_comment, bonus_points)
+                    expected_statuses = application.SECOND_REVIEW_STATUSES
             elif current_status in ['second_approved', 'third_reviewing'] or is_third_reviewer:
                 # 三审或修改三审决定
-                if hasattr(application, 'perform_third_review'):
-                    application.perform_third_review(user, 'passed', review_comment, bonus_points)
-                else:
-                    # 兼容旧模型，直接更新字段
-                    application.third_reviewer = user
-                    application.third_reviewed_at = timezone.now()
-                    application.review_status = 'approved'
-            elif current_status in ['rejected', 'first_rejected', 'second_rejected', 'third_rejected']:
-                # 已拒绝的申请重新同意，进入一审通过状态
-                if hasattr(application, 'perform_first_review'):
-                    application.perform_first_review(user, 'passed', review_comment)
-                else:
-                    application.first_reviewer = user
-                    application.first_reviewed_at = timezone.now()
-                    application.review_status = 'first_approved'
+                if application.can_third_review(user):
+                    changes, _ = application.third_review_changes(user, 'passed', review_comment, bonus_points)
+                    expected_statuses = application.THIRD_REVIEW_STATUSES
             
-            # 设置实际分数，根据模型类型使用不同的字段名
-            if hasattr(application, 'bonus_points') and bonus_points is not None:
-                application.bonus_points = bonus_points
-            application.save()
+            # 设置实际分数
+            if bonus_points is not None:
+                changes['bonus_points'] = bonus_points
+            
+            # 一次条件更新完成状态转换，审核状态已被其他老师改变时不写入
+            if not application.compare_and_set(expected_statuses, **changes):
+                return Response({
+                    "error": "申请已被其他老师审核，请刷新后重试"
+                }, status=status.HTTP_409_CONFLICT)
             
             return Response({
                 "success": True,
@@ -1986,36 +1595,21 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
         application = None
         model = None
         
-        # 支持的申请模型列表
-        application_models = [
-            (EnglishScore, 'english_scores'),
-            (AcademicPaper, 'academic_papers'),
-            (PatentWork, 'patent_works'),
-            (AcademicCompetition, 'academic_competitions'),
-            (InnovationProject, 'innovation_projects'),
-            (CCFCSPCertification, 'ccf_csp_certifications'),
-            (InternationalInternship, 'international_internships'),
-            (MilitaryService, 'military_services'),
-            (VolunteerService, 'volunteer_services'),
-            (HonoraryTitle, 'honorary_titles'),
-            (SocialWork, 'social_works'),
-            (SportsCompetition, 'sports_competitions'),
-        ]
-        
-        # 自动尝试通过id查找申请
-        for model_candidate, name_candidate in application_models:
-            try:
-                application = model_candidate.objects.get(id=application_id)
-                model = model_candidate
-                break
-            except model_candidate.DoesNotExist:
-                continue
+        # 通过申请ID查找申请类型，并一次加载学生、班级、学院和审核人
+        application, model = get_application(application_id)
         
         if not application:
             return Response({
                 "error": "申请不存在"
             }, status=status.HTTP_404_NOT_FOUND)
         
+        # 申请已被其他老师领取且租约未到期时不能审核
+        lease_holder = get_lease_holder(application_id, user)
+        if lease_holder:
+            return Response({
+                "error": f"该申请已被{lease_holder.name}领取，请稍后再试"
+            }, status=status.HTTP_409_CONFLICT)
+        
         # 获取拒绝理由
         reason = request.data.get('reason')
         if not reason:
@@ -2031,38 +1625,43 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
             reject_status = 'rejected'  # 任意老师拒绝，直接变为最终拒绝
             
             # 检查教师是否已经审批过该申请
-            is_first_reviewer = hasattr(application, 'first_reviewer') and application.first_reviewer == user
-            is_second_reviewer = hasattr(application, 'second_reviewer') and application.second_reviewer == user
-            is_third_reviewer = hasattr(application, 'third_reviewer') and application.third_reviewer == user
+            is_first_reviewer = application.first_reviewer_id == user.id
+            is_second_reviewer = application.second_reviewer_id == user.id
+            is_third_reviewer = application.third_reviewer_id == user.id
             
             # 设置对应的审核人信息
+            changes = {'review_status': reject_status}
             current_status = application.review_status
             if current_status in ['pending', 'first_reviewing'] or is_first_reviewer:
                 # 一审拒绝或修改一审决定为拒绝
-                application.first_reviewer = user
-                application.first_reviewed_at = timezone.now()
+                changes['first_reviewer'] = user
+                changes['first_reviewed_at'] = timezone.now()
             elif current_status in ['first_approved', 'second_reviewing'] or is_second_reviewer:
                 # 二审拒绝或修改二审决定为拒绝
-                application.second_reviewer = user
-                application.second_reviewed_at = timezone.now()
+                changes['second_reviewer'] = user
+                changes['second_reviewed_at'] = timezone.now()
             elif current_status in ['second_approved', 'third_reviewing'] or is_third_reviewer:
                 # 三审拒绝或修改三审决定为拒绝
-                application.third_reviewer = user
-                application.third_reviewed_at = timezone.now()
+                changes['third_reviewer'] = user
+                changes['third_reviewed_at'] = timezone.now()
             
-            application.review_status = reject_status
             # 设置拒绝理由，根据模型类型和审核人身份使用不同的字段名
             if hasattr(application, 'rejection_reason'):
-                application.rejection_reason = reason
+                changes['rejection_reason'] = reason
             elif hasattr(application, 'review_notes'):
-                application.review_notes = reason
-            elif hasattr(application, 'first_review_comment') and (is_first_reviewer or current_status in ['pending', 'first_reviewing']):
-                application.first_review_comment = reason
-            elif hasattr(application, 'second_review_comment') and (is_second_reviewer or current_status in ['first_approved', 'second_reviewing']):
-                application.second_review_comment = reason
-            elif hasattr(application, 'third_review_comment') and (is_third_reviewer or current_status in ['second_approved', 'third_reviewing']):
-                application.third_review_comment = reason
-            application.save()
+                changes['review_notes'] = reason
+            elif is_first_reviewer or current_status in ['pending', 'first_reviewing']:
+                changes['first_review_comment'] = reason
+            elif is_second_reviewer or current_status in ['first_approved', 'second_reviewing']:
+                changes['second_review_comment'] = reason
+            elif is_third_reviewer or current_status in ['second_approved', 'third_reviewing']:
+                changes['third_review_comment'] = reason
+            
+            # 一次条件更新完成状态转换，审核状态已被其他老师改变时不写入
+            if not application.compare_and_set([current_status], **changes):
+                return Response({
+                    "error": "申请已被其他老师审核，请刷新后重试"
+                }, status=status.HTTP_409_CONFLICT)
             
             return Response({
                 "success": True,
@@ -2075,6 +1674,47 @@ class AdminMaterialApplicationViewSet(viewsets.ViewSet):
             return Response({
                 "error": f"拒绝申请失败: {str(e)}"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    @action(detail=False, methods=['post'])
+    def batch_review(self, request):
+        """
+        批量审核（可包含不同类型的申请）
+        请求体：{"application_ids": [...], "stage": "first_review", "result": "passed", "review_comment": "", "bonus_points": null}
+        """
+        user = request.user
+        
+        # 权限检查
+        if not hasattr(user, 'user_type') or user.user_type not in ['teacher', 'admin']:
+            return Response({
+                "error": "只有教师和管理员可以审核申请"
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = BatchReviewSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "error": "参数错误",
+                "details": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        
+        results = batch_review(
+            user,
+            data['application_ids'],
+            data['stage'],
+            data['result'],
+            data.get('review_comment', ''),
+            data.get('bonus_points')
+        )
+        succeeded = sum(1 for item in results if item['success'])
+        return Response({
+            "success": True,
+            "message": f"批量审核完成，成功{succeeded}条，失败{len(results) - succeeded}条",
+            "data": {
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "results": results
+            }
+        }, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -2082,30 +1722,17 @@ def upload_file(request):
     """
     文件上传视图
     接受multipart/form-data格式的文件上传请求
-    返回包含文件URL的JSON响应
+    返回包含文件URL的JSON响应；相同内容已上传过时返回已有文件的URL
     """
     if request.method == 'POST' and request.FILES.get('file'):
         uploaded_file = request.FILES['file']
-        
-        # 生成唯一文件名，避免重名
-        file_ext = uploaded_file.name.split('.')[-1]
-        unique_filename = f"{uuid4()}.{file_ext}"
-        
-        # 确保上传目录存在
-        upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads')
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir, exist_ok=True)
-        
-        # 保存文件
-        file_path = os.path.join(upload_dir, unique_filename)
-        with open(file_path, 'wb+') as destination:
-            for chunk in uploaded_file.chunks():
-                destination.write(chunk)
-        
-        # 生成文件URL
-        file_url = f"{settings.MEDIA_URL}uploads/{unique_filename}"
-        
-        # 返回响应
-        return Response({'url': file_url}, status=status.HTTP_201_CREATED)
+
+        # 按内容哈希保存，相同内容只保存一份
+        blob, created = store_blob(uploaded_file, filename=uploaded_file.name)
+
+        return Response({
+            'url': upload_storage.url(blob.name),
+            'deduplicated': not created
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
     
     return Response({'error': '无效的请求'}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
@@ -1,4 +1,8 @@
 from score import views
+from score import calculation
+from score import snapshots
+from score import verification
+from score import selection
 from django.urls import path
 
 urlpatterns = [
@@ -7,5 +11,14 @@ urlpatterns = [
     path('student-performance/list_all/',views.StudentPerformanceViewSet.as_view({'get':'list_all'}),name='student-performance'),
     path('student-performance/statistics/',views.StudentPerformanceViewSet.as_view({'get':'statistics'}),name='student-performance'),
     path('student-performance/ranking/',views.StudentPerformanceViewSet.as_view({'get':'ranking'}),name='student-performance'),
+    path('student-performance/simulate/',views.StudentPerformanceViewSet.as_view({'post':'simulate'}),name='student-performance'),
     path('student/score-items/',views.StudentPerformanceViewSet.as_view({'get':'score_items'}),name='score-items'),
+    path('score-calculation/recalculate_all/',calculation.ScoreCalculationViewSet.as_view({'post':'recalculate_all'}),name='score-calculation'),
+    path('score-calculation/recalculate_by_student/',calculation.ScoreCalculationViewSet.as_view({'post':'recalculate_by_student'}),name='score-calculation'),
+    path('score-snapshots/',snapshots.ScoreSnapshotViewSet.as_view({'get':'list','post':'create'}),name='score-snapshots'),
+    path('score-snapshots/diff/',snapshots.ScoreSnapshotViewSet.as_view({'get':'diff'}),name='score-snapshots'),
+    path('score-snapshots/<str:label>/',snapshots.ScoreSnapshotViewSet.as_view({'get':'retrieve'}),name='score-snapshots'),
+    path('score-metrics/',verification.ScoreMetricsViewSet.as_view({'get':'summary'}),name='score-metrics'),
+    path('postgraduate-selection/run/',selection.PostgraduateSelectionViewSet.as_view({'post':'run'}),name='postgraduate-selection'),
+    path('postgraduate-selection/results/',selection.PostgraduateSelectionViewSet.as_view({'get':'results'}),name='postgraduate-selection'),
 ]
\ No newline at end of file
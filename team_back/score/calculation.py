@@ -1,19 +1,45 @@
+import hashlib
 import uuid
+from collections import defaultdict
 from decimal import Decimal
-from django.db import models
-from django.db.models import Avg, Max, Min, Count
+from django.db import connection, models, transaction
+from django.db.models import (
+    Avg, Max, Min, Count, BigIntegerField, DecimalField, Func, OuterRef, Subquery, Sum, TextField, Value
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 from rest_framework.permissions import IsAuthenticated
 from user.models import User
-from material.models import (
-    EnglishScore, AcademicPaper, PatentWork, AcademicCompetition,
-    InnovationProject, CCFCSPCertification, InternationalInternship,
-    MilitaryService, VolunteerService, HonoraryTitle, SocialWork, SportsCompetition
-)
+from material.models import APPLICATION_MODELS, EXPERTISE_MODELS, COMPREHENSIVE_MODELS
+from .incremental import mark_students_dirty
+from .leaderboard import build_leaderboard
 from .models import AcademicPerformance
-from .serializers import AcademicPerformanceSerializer, AcademicPerformanceDetailSerializer, PerformanceStatsSerializer
+from .ranking import refresh_rankings
+from .statistics import invalidate_statistics
+from .serializers import AcademicPerformanceDetailSerializer, PerformanceStatsSerializer
+
+
+# 各项成绩满分
+ACADEMIC_SCORE_MAX = 80.0
+EXPERTISE_SCORE_MAX = 15.0
+COMPREHENSIVE_SCORE_MAX = 5.0
+TOTAL_SCORE_MAX = 100.0
+
+# 批量写入时每批处理的学生数
+BULK_CHUNK_SIZE = 1000
+
+# 批量更新时写回的字段
+SCORE_FIELDS = [
+    'academic_score', 'academic_expertise_score',
+    'comprehensive_performance_score', 'total_comprehensive_score', 'source_checksum', 'updated_at'
+]
+
+# 加分来源校验和取模
+CHECKSUM_MODULUS = 1 << 64
 
 
 def calculate_academic_score(gpa):
@@ -25,7 +51,212 @@ def calculate_academic_score(gpa):
         return 0.0
     # 绩点4.0对应80分，线性换算
     academic_score = (float(gpa) / 4.0) * 80.0
-    return min(80.0, max(0.0, academic_score))
+    return min(ACADEMIC_SCORE_MAX, max(0.0, academic_score))
+
+
+def combine_scores(gpa, expertise_points, comprehensive_points):
+    """
+    根据绩点和加分小计合成各项成绩
+    学术专长成绩最高15分，综合表现成绩最高5分，总分最高100分
+    """
+    academic_score = calculate_academic_score(gpa)
+    academic_expertise_score = min(EXPERTISE_SCORE_MAX, float(expertise_points or 0))
+    comprehensive_performance_score = min(COMPREHENSIVE_SCORE_MAX, float(comprehensive_points or 0))
+    total_score = academic_score + academic_expertise_score + comprehensive_performance_score
+    return {
+        'academic_score': round(academic_score, 4),
+        'academic_expertise_score': round(academic_expertise_score, 4),
+        'comprehensive_performance_score': round(comprehensive_performance_score, 4),
+        'total_comprehensive_score': round(min(TOTAL_SCORE_MAX, total_score), 4),
+    }
+
+
+def filter_students(queryset=None, college=None, grade=None, major=None):
+    """按学院（名称或ID）、年级、专业筛选学生"""
+    if queryset is None:
+        queryset = User.objects.filter(user_type='student')
+    if college:
+        try:
+            queryset = queryset.filter(college_id=uuid.UUID(str(college)))
+        except ValueError:
+            queryset = queryset.filter(college__name=college)
+    if grade:
+        queryset = queryset.filter(grade=grade)
+    if major:
+        queryset = queryset.filter(major=major)
+    return queryset
+
+
+def source_digest(model, application_id, bonus_points):
+    """
+    单条已审核通过申请的60位摘要：md5('表名:申请ID:加分') 的前15位十六进制
+    与 SourceDigest 在数据库中的计算结果一致
+    """
+    raw = f'{model._meta.db_table}:{application_id}:{Decimal(bonus_points or 0):.4f}'
+    return int(hashlib.md5(raw.encode('utf-8')).hexdigest()[:15], 16)
+
+
+class SourceDigest(Func):
+    """PostgreSQL：在数据库中计算 source_digest，申请ID和加分（保留4位小数）按文本拼接"""
+    template = "('x' || substr(md5(%(prefix)s || %(expressions)s), 1, 15))::bit(60)::bigint"
+    arg_joiner = " || ':' || "
+    output_field = BigIntegerField()
+
+    def __init__(self, model, **extra):
+        super().__init__(
+            Cast('id', TextField()),
+            Cast(Coalesce('bonus_points', Value(Decimal('0.0000'))), TextField()),
+            prefix=f"'{model._meta.db_table}:'",
+            **extra
+        )
+
+
+def format_checksum(total):
+    """摘要之和（与顺序无关）取模后格式化为16位十六进制"""
+    return f'{int(total) % CHECKSUM_MODULUS:016x}'
+
+
+def collect_bonus_sources(students):
+    """
+    汇总学生已审核通过申请的加分和加分来源校验和
+    每个申请模型执行一次按学生分组的聚合查询（PostgreSQL 上摘要也在数据库中计算并求和），
+    返回 (学术专长加分小计, 综合表现加分小计, 校验和累加值)，均为 {user_id: 值}
+    """
+    student_ids = students.values('id')
+    expertise_points = defaultdict(Decimal)
+    comprehensive_points = defaultdict(Decimal)
+    checksums = defaultdict(int)
+    digest_in_database = connection.vendor == 'postgresql'
+    for model in APPLICATION_MODELS:
+        points = expertise_points if model in EXPERTISE_MODELS else comprehensive_points
+        approved = model.objects.filter(review_status='approved', user_id__in=student_ids).order_by()
+        if digest_in_database:
+            rows = (
+                approved
+                .values('user_id')
+                .annotate(points=Sum('bonus_points'), checksum=Sum(SourceDigest(model)))
+                .values_list('user_id', 'points', 'checksum')
+            )
+            for user_id, subtotal, checksum in rows:
+                points[user_id] += subtotal or 0
+                checksums[user_id] += int(checksum or 0)
+        else:
+            # 其他数据库：逐条读取申请ID和加分，在 Python 中计算摘要
+            rows = approved.values_list('user_id', 'id', 'bonus_points')
+            for user_id, application_id, bonus_points in rows.iterator(chunk_size=BULK_CHUNK_SIZE):
+                points[user_id] += bonus_points or 0
+                checksums[user_id] += source_digest(model, application_id, bonus_points)
+    return expertise_points, comprehensive_points, checksums
+
+
+def collect_bonus_subtotals(students):
+    """
+    汇总学生已审核通过申请的加分
+    返回 (学术专长加分小计, 综合表现加分小计)，均为 {user_id: Decimal}
+    """
+    expertise_points, comprehensive_points, _ = collect_bonus_sources(students)
+    return expertise_points, comprehensive_points
+
+
+def annotate_bonus_subtotals(queryset):
+    """
+    为学生查询集添加加分小计列：expertise_subtotal（学术专长）、comprehensive_subtotal（综合表现）
+    每个申请模型一个按学生关联的 Sum 子查询，整页学生只需一次查询
+    """
+    def subtotal(application_models):
+        expressions = [
+            Coalesce(
+                Subquery(
+                    model.objects
+                    .filter(user=OuterRef('pk'), review_status='approved')
+                    .order_by()
+                    .values('user')
+                    .annotate(points=Sum('bonus_points'))
+                    .values('points')[:1],
+                    output_field=DecimalField(max_digits=12, decimal_places=4)
+                ),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=12, decimal_places=4)
+            )
+            for model in application_models
+        ]
+        total = expressions[0]
+        for expression in expressions[1:]:
+            total = total + expression
+        return total
+
+    return queryset.annotate(
+        expertise_subtotal=subtotal(EXPERTISE_MODELS),
+        comprehensive_subtotal=subtotal(COMPREHENSIVE_MODELS)
+    )
+
+
+def recalculate_scores(students=None, chunk_size=BULK_CHUNK_SIZE, refresh_ranks=True):
+    """
+    批量重新计算学生成绩
+    1. 每个申请模型一次查询得到加分小计和加分来源校验和
+    2. 一次遍历计算整批学生的学业成绩
+    3. 缺失的学业成绩记录使用bulk_create创建，已有记录按批次bulk_update
+    4. 刷新受影响分组的排名（未指定 students 时刷新全部排名），并重新生成排行榜文件
+    返回统计信息 {'total': 学生数, 'created': 新建记录数, 'updated': 更新记录数}
+    """
+    scoped = students is not None
+    if students is None:
+        students = User.objects.filter(user_type='student')
+
+    expertise_points, comprehensive_points, checksums = collect_bonus_sources(students)
+    result = {'total': 0, 'created': 0, 'updated': 0}
+
+    def flush(chunk):
+        user_ids = [user_id for user_id, _ in chunk]
+        existing = dict(
+            AcademicPerformance.objects.filter(user_id__in=user_ids).values_list('user_id', 'id')
+        )
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for user_id, gpa in chunk:
+            scores = combine_scores(gpa, expertise_points.get(user_id), comprehensive_points.get(user_id))
+            scores['source_checksum'] = format_checksum(checksums.get(user_id, 0))
+            if user_id in existing:
+                to_update.append(AcademicPerformance(id=existing[user_id], user_id=user_id, updated_at=now, **scores))
+            else:
+                # 如果没有学业成绩记录，创建一个
+                to_create.append(AcademicPerformance(
+                    user_id=user_id,
+                    gpa=gpa or 0.0,
+                    weighted_score=0.0,
+                    total_courses=0,
+                    total_credits=0.0,
+                    gpa_ranking=0,
+                    ranking_dimension='default',
+                    **scores
+                ))
+        with transaction.atomic():
+            if to_create:
+                AcademicPerformance.objects.bulk_create(to_create, batch_size=chunk_size)
+            if to_update:
+                AcademicPerformance.objects.bulk_update(to_update, SCORE_FIELDS, batch_size=chunk_size)
+        result['total'] += len(chunk)
+        result['created'] += len(to_create)
+        result['updated'] += len(to_update)
+
+    chunk = []
+    for row in students.order_by('id').values_list('id', 'gpa').iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    if result['total']:
+        invalidate_statistics()
+    if refresh_ranks and result['total']:
+        refresh_rankings(students=students if scoped else None, chunk_size=chunk_size)
+        build_leaderboard()
+
+    return result
 
 
 def calculate_total_score(user_id):
@@ -34,113 +265,24 @@ def calculate_total_score(user_id):
     总分 = 学业成绩（80分） + 加分成绩（20分）
     学业成绩：由绩点换算，满绩点4.0对应80分
     加分成绩：学术专长成绩（15分） + 综合表现成绩（5分）
+    只重新计算该学生的成绩；排名和排行榜文件由重算队列刷新
     """
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    students = User.objects.filter(id=user_id)
+    if not students.exists():
         return None
-    
-    # 获取学业成绩记录
-    try:
-        performance = AcademicPerformance.objects.get(user=user)
-    except AcademicPerformance.DoesNotExist:
-        # 如果没有学业成绩记录，创建一个
-        performance = AcademicPerformance(
-            user=user,
-            gpa=user.gpa if hasattr(user, 'gpa') and user.gpa else 0.0,
-            weighted_score=0.0,
-            total_courses=0,
-            total_credits=0.0,
-            gpa_ranking=0,
-            ranking_dimension='default'
-        )
-    
-    # 计算学业成绩（80分）
-    gpa = getattr(user, 'gpa', 0.0) or 0.0
-    academic_score = calculate_academic_score(gpa)
-    performance.academic_score = academic_score
-    
-    # 计算学术专长成绩（15分）
-    academic_expertise_score = 0.0
-    
-    # 获取所有学术专长类申请
-    expertise_applications = []
-    
-    # 学术专长类申请：英语成绩、学术论文、专利作品、学术竞赛、创新项目、CCF CSP认证
-    expertise_models = [
-        EnglishScore, AcademicPaper, PatentWork, AcademicCompetition,
-        InnovationProject, CCFCSPCertification
-    ]
-    
-    for model in expertise_models:
-        expertise_applications.extend(
-            model.objects.filter(user=user, review_status='approved')
-        )
-    
-    # 计算学术专长总分
-    for app in expertise_applications:
-        # 尝试从不同字段获取分数
-        score = getattr(app, 'score', 0.0) or 0.0
-        if not score:
-            score = getattr(app, 'estimated_score', 0.0) or 0.0
-        if not score:
-            score = getattr(app, 'actual_score', 0.0) or 0.0
-        if not score:
-            score = getattr(app, 'final_score', 0.0) or 0.0
-        academic_expertise_score += float(score)
-    
-    # 学术专长成绩最高15分
-    performance.academic_expertise_score = min(15.0, academic_expertise_score)
-    
-    # 计算综合表现成绩（5分）
-    comprehensive_performance_score = 0.0
-    
-    # 获取所有综合表现类申请
-    comprehensive_applications = []
-    
-    # 综合表现类申请：国际实习、兵役服务、志愿服务、荣誉称号、社会工作、体育竞赛
-    comprehensive_models = [
-        InternationalInternship, MilitaryService, VolunteerService,
-        HonoraryTitle, SocialWork, SportsCompetition
-    ]
-    
-    for model in comprehensive_models:
-        comprehensive_applications.extend(
-            model.objects.filter(user=user, review_status='approved')
-        )
-    
-    # 计算综合表现总分
-    for app in comprehensive_applications:
-        # 尝试从不同字段获取分数
-        score = getattr(app, 'score', 0.0) or 0.0
-        if not score:
-            score = getattr(app, 'estimated_score', 0.0) or 0.0
-        if not score:
-            score = getattr(app, 'actual_score', 0.0) or 0.0
-        if not score:
-            score = getattr(app, 'final_score', 0.0) or 0.0
-        comprehensive_performance_score += float(score)
-    
-    # 综合表现成绩最高5分
-    performance.comprehensive_performance_score = min(5.0, comprehensive_performance_score)
-    
-    # 计算总分（满分100分）
-    total_score = academic_score + performance.academic_expertise_score + performance.comprehensive_performance_score
-    performance.total_comprehensive_score = min(100.0, total_score)
-    
-    # 保存成绩记录
-    performance.save()
-    
-    return performance
+
+    recalculate_scores(students, refresh_ranks=False)
+    mark_students_dirty(students.values_list('id', flat=True))
+    return AcademicPerformance.objects.select_related('user').get(user_id=user_id)
 
 
 class ScoreCalculationViewSet(ViewSet):
     """成绩计算相关接口"""
     permission_classes = [IsAuthenticated]
-    
+
     @action(detail=False, methods=['post'])
     def recalculate_all(self, request):
-        """重新计算所有学生的成绩"""
+        """重新计算所有学生的成绩（可按学院、年级、专业限定范围），排名和排行榜文件由重算队列刷新"""
         # 权限检查
         user = request.user
         if not hasattr(user, 'user_type') or user.user_type != 'admin':
@@ -148,37 +290,40 @@ class ScoreCalculationViewSet(ViewSet):
                 {"error": "只有管理员可以重新计算所有学生成绩"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        # 获取所有学生
-        students = User.objects.filter(user_type='student')
-        
-        # 重新计算每个学生的成绩
-        success_count = 0
-        total_count = students.count()
-        
-        for student in students:
-            try:
-                calculate_total_score(student.id)
-                success_count += 1
-            except Exception as e:
-                print(f"计算学生{student.name}成绩失败: {str(e)}")
-        
+
+        scope = {
+            'college': request.data.get('college'),
+            'grade': request.data.get('grade'),
+            'major': request.data.get('major')
+        }
+        students = filter_students(**scope)
+
+        try:
+            result = recalculate_scores(students, refresh_ranks=False)
+            mark_students_dirty(students.values_list('id', flat=True))
+        except Exception as e:
+            return Response(
+                {"error": f"成绩计算失败: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
         return Response({
             "success": True,
-            "message": f"成功计算{success_count}/{total_count}名学生的成绩"
+            "message": f"成功计算{result['total']}名学生的成绩，排名稍后更新",
+            "data": result
         })
-    
+
     @action(detail=False, methods=['post'])
     def recalculate_by_student(self, request):
         """重新计算指定学生的成绩"""
         user_id = request.data.get('user_id')
-        
+
         if not user_id:
             return Response(
                 {"error": "请提供学生ID"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
+
         # 权限检查
         current_user = request.user
         if not hasattr(current_user, 'user_type') or current_user.user_type not in ['teacher', 'admin']:
@@ -186,7 +331,7 @@ class ScoreCalculationViewSet(ViewSet):
                 {"error": "无权重新计算学生成绩"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
+
         # 重新计算成绩
         try:
             performance = calculate_total_score(user_id)
@@ -206,4 +351,4 @@ class ScoreCalculationViewSet(ViewSet):
             return Response(
                 {"error": f"成绩计算失败: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
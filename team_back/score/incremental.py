@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from user.models import User
+from .models import AcademicPerformance, ScoreRecalcTask
+
+
+# 每批重新计算的学生数
+DIRTY_BATCH_SIZE = 500
+
+
+def mark_students_dirty(user_ids):
+    """
+    标记学生成绩待重新计算
+    同一学生的多次标记合并为一条任务，只刷新标记时间
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+    now = timezone.now()
+    ScoreRecalcTask.objects.bulk_create(
+        [ScoreRecalcTask(user_id=user_id, marked_at=now) for user_id in user_ids],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['marked_at']
+    )
+
+
+def process_dirty_students(batch_size=DIRTY_BATCH_SIZE):
+    """
+    重新计算一批待重算的学生，返回本批处理的学生ID列表
+    任务行使用 SKIP LOCKED 认领，多个工作进程不会重复处理同一学生；
+    同时锁定这些学生的学业成绩记录，保证同一学生的重算串行执行。
+    处理期间被再次标记的学生（标记时间更新）会保留任务，留待下一批处理。
+    """
+    from .calculation import recalculate_scores
+    from .ranking import refresh_rankings
+
+    with transaction.atomic():
+        tasks = list(
+            ScoreRecalcTask.objects
+            .select_for_update(skip_locked=True)
+            .order_by('marked_at')
+            .values_list('user_id', 'marked_at')[:batch_size]
+        )
+        if not tasks:
+            return []
+
+        user_ids = [user_id for user_id, _ in tasks]
+        # 学生级锁：并发的重算会在这里等待
+        list(
+            AcademicPerformance.objects
+            .select_for_update()
+            .filter(user_id__in=user_ids)
+            .values_list('id', flat=True)
+        )
+
+        recalculate_scores(User.objects.filter(id__in=user_ids), refresh_ranks=False)
+
+        # 按标记时间分组删除，只删除认领之后未被再次标记的任务
+        batches = defaultdict(list)
+        for user_id, marked_at in tasks:
+            batches[marked_at].append(user_id)
+        for marked_at, batch_user_ids in batches.items():
+            ScoreRecalcTask.objects.filter(user_id__in=batch_user_ids, marked_at__lte=marked_at).delete()
+
+    # 排名在释放学生锁之后刷新，只涉及这批学生所在的分组
+    refresh_rankings(students=User.objects.filter(id__in=user_ids))
+    return user_ids
+
+
+def process_all_dirty_students(batch_size=DIRTY_BATCH_SIZE):
+    """处理所有待重算的学生，返回处理总人数；有学生被重算时重新生成排行榜文件"""
+    from .leaderboard import build_leaderboard
+
+    processed = 0
+    while True:
+        user_ids = process_dirty_students(batch_size)
+        if not user_ids:
+            break
+        processed += len(user_ids)
+    if processed:
+        build_leaderboard()
+    return processed
@@ -0,0 +1,316 @@
+"""
+排行榜：按排名分组预先排好序的成绩数组，写入内存映射文件，由所有工作进程共享
+
+文件结构：
+    MAGIC(8字节) | 索引长度(8字节) | 索引JSON | 数据区
+索引JSON只包含各数据段的偏移量、分组表和排名维度取值表；数据区全部是定长数组：
+    学生ID（16字节UUID，升序）、绩点、综合成绩（float64）、本人分组序号、排名维度序号（int32）、
+    姓名和学号在字符串区中的偏移量（int64），以及各分组按成绩排好序的成绩相反数（float64）和学生序号（int32）
+查找学生时对ID数组做二分查找，查询名次时对成绩数组做二分查找，不需要访问数据库，
+各进程也不需要把学生信息解码成Python对象
+"""
+import bisect
+import json
+import os
+import struct
+import tempfile
+import threading
+import uuid
+from array import array
+from collections import defaultdict
+from mmap import ACCESS_READ, mmap
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AcademicPerformance
+from .ranking import RANKING_DIMENSIONS, make_partition_key, resolve_dimension
+
+
+LEADERBOARD_MAGIC = b'XMULB002'
+USER_ID_SIZE = 16
+
+# 排序方式及对应的成绩字段
+LEADERBOARD_ORDERS = {
+    'gpa': 'gpa',
+    'total': 'total_comprehensive_score',
+}
+
+_lock = threading.Lock()
+_cached = None
+
+
+def get_leaderboard_path():
+    return getattr(settings, 'SCORE_LEADERBOARD_PATH', os.path.join(settings.BASE_DIR, 'var', 'score_leaderboard.bin'))
+
+
+def _pad(buffer):
+    """按8字节对齐"""
+    buffer.extend(b'\0' * (-len(buffer) % 8))
+
+
+def _append(body, data):
+    """追加一个数据段并对齐，返回数据段的偏移量（相对于数据区起点）"""
+    offset = len(body)
+    body.extend(data)
+    _pad(body)
+    return offset
+
+
+def _string_section(body, values):
+    """字符串区：(N+1)个int64偏移量 + UTF-8字节，返回 (偏移量数组的偏移量, 字符串区的偏移量)"""
+    encoded = [(value or '').encode('utf-8') for value in values]
+    offsets = array('q', [0])
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return _append(body, offsets.tobytes()), _append(body, b''.join(encoded))
+
+
+def build_leaderboard(path=None):
+    """
+    从学业成绩记录生成排行榜文件
+    先写入临时文件再原子替换，读取中的进程不受影响。返回学生数
+    """
+    path = path or get_leaderboard_path()
+    group_fields = sorted({field for fields in RANKING_DIMENSIONS.values() for field in fields})
+    rows = (
+        AcademicPerformance.objects
+        .filter(user__user_type='student')
+        .values_list('user_id', 'user__name', 'user__school_id', 'gpa', 'total_comprehensive_score',
+                     'ranking_dimension', *group_fields)
+        .order_by()
+    )
+
+    # 按学生ID排序，学生序号即ID数组中的位置
+    students = sorted(rows.iterator(chunk_size=2000), key=lambda row: row[0].bytes)
+    dimensions = []
+    dimension_indexes = {}
+    partition_keys = []
+    partition_indexes = {}
+    members = defaultdict(list)
+    own_partitions = array('i')
+    student_dimensions = array('i')
+    for index, row in enumerate(students):
+        ranking_dimension = row[5]
+        values = dict(zip(group_fields, row[6:]))
+        dimension = resolve_dimension(ranking_dimension)
+        own_key = f"{dimension}:{make_partition_key(values[field] for field in RANKING_DIMENSIONS[dimension])}"
+        if own_key not in partition_indexes:
+            partition_indexes[own_key] = len(partition_keys)
+            partition_keys.append(own_key)
+        own_partitions.append(partition_indexes[own_key])
+        if ranking_dimension not in dimension_indexes:
+            dimension_indexes[ranking_dimension] = len(dimensions)
+            dimensions.append(ranking_dimension)
+        student_dimensions.append(dimension_indexes[ranking_dimension])
+        for each_dimension, fields in RANKING_DIMENSIONS.items():
+            members[f"{each_dimension}:{make_partition_key(values[field] for field in fields)}"].append(index)
+
+    scores = {
+        'gpa': array('d', (float(row[3]) for row in students)),
+        'total': array('d', (float(row[4]) for row in students)),
+    }
+    body = bytearray()
+    sections = {
+        'user_ids': _append(body, b''.join(row[0].bytes for row in students)),
+        'gpa': _append(body, scores['gpa'].tobytes()),
+        'total': _append(body, scores['total'].tobytes()),
+        'own_partition': _append(body, own_partitions.tobytes()),
+        'dimension': _append(body, student_dimensions.tobytes()),
+    }
+    sections['name_offsets'], sections['names'] = _string_section(body, (row[1] for row in students))
+    sections['school_id_offsets'], sections['school_ids'] = _string_section(body, (row[2] for row in students))
+
+    partitions = {}
+    for key, indexes in members.items():
+        partition = {'count': len(indexes)}
+        for order, values in scores.items():
+            ordered = sorted(indexes, key=lambda index: -values[index])
+            partition[order] = [
+                _append(body, array('d', (-values[index] for index in ordered)).tobytes()),
+                _append(body, array('i', ordered).tobytes()),
+            ]
+        partitions[key] = partition
+
+    index_blob = bytearray(json.dumps({
+        'built_at': timezone.now().isoformat(),
+        'count': len(students),
+        'sections': sections,
+        'dimensions': dimensions,
+        'partition_keys': partition_keys,
+        'partitions': partitions,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    index_length = len(index_blob)
+    _pad(index_blob)
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            output.write(LEADERBOARD_MAGIC)
+            output.write(struct.pack('<Q', index_length))
+            output.write(index_blob)
+            output.write(body)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(students)
+
+
+class Leaderboard:
+    """只读的排行榜文件视图"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            self._mmap = mmap(source.fileno(), 0, access=ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if bytes(buffer[:8]) != LEADERBOARD_MAGIC:
+            raise ValueError('排行榜文件格式错误')
+        index_length = struct.unpack('<Q', buffer[8:16])[0]
+        index = json.loads(bytes(buffer[16:16 + index_length]))
+        self.built_at = index['built_at']
+        self.count = index['count']
+        self.partitions = index['partitions']
+        self.partition_keys = index['partition_keys']
+        self.dimensions = index['dimensions']
+        # 索引JSON之后补齐到8字节，数据区从对齐后的位置开始
+        self._data = buffer[16 + index_length + (-index_length % 8):]
+
+        sections = index['sections']
+        count = self.count
+        self._user_ids = self._section(sections['user_ids'], USER_ID_SIZE * count)
+        self._scores = {
+            'gpa': self._section(sections['gpa'], 8 * count).cast('d'),
+            'total': self._section(sections['total'], 8 * count).cast('d'),
+        }
+        self._own_partitions = self._section(sections['own_partition'], 4 * count).cast('i')
+        self._student_dimensions = self._section(sections['dimension'], 4 * count).cast('i')
+        self._name_offsets = self._section(sections['name_offsets'], 8 * (count + 1)).cast('q')
+        self._names = self._data[sections['names']:]
+        self._school_id_offsets = self._section(sections['school_id_offsets'], 8 * (count + 1)).cast('q')
+        self._school_ids = self._data[sections['school_ids']:]
+
+    def _section(self, offset, length):
+        return self._data[offset:offset + length]
+
+    def _arrays(self, partition, order):
+        keys_offset, ids_offset = partition[order]
+        count = partition['count']
+        keys = self._section(keys_offset, 8 * count).cast('d')
+        ids = self._section(ids_offset, 4 * count).cast('i')
+        return keys, ids
+
+    def _string(self, strings, offsets, index):
+        return bytes(strings[offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def find(self, user_id):
+        """二分查找学生序号，不在排行榜中时返回 None"""
+        if not isinstance(user_id, uuid.UUID):
+            try:
+                user_id = uuid.UUID(str(user_id))
+            except ValueError:
+                return None
+        target = user_id.bytes
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(self._user_ids[middle * USER_ID_SIZE:(middle + 1) * USER_ID_SIZE]) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and bytes(self._user_ids[low * USER_ID_SIZE:(low + 1) * USER_ID_SIZE]) == target:
+            return low
+        return None
+
+    def entry_at(self, index):
+        """学生信息：[学生ID, 姓名, 学号, 绩点, 综合成绩, 排名维度, 本人分组键]"""
+        return [
+            str(uuid.UUID(bytes=bytes(self._user_ids[index * USER_ID_SIZE:(index + 1) * USER_ID_SIZE]))),
+            self._string(self._names, self._name_offsets, index),
+            self._string(self._school_ids, self._school_id_offsets, index),
+            self._scores['gpa'][index],
+            self._scores['total'][index],
+            self.dimensions[self._student_dimensions[index]],
+            self.partition_keys[self._own_partitions[index]],
+        ]
+
+    def get_entry(self, user_id):
+        index = self.find(user_id)
+        return None if index is None else self.entry_at(index)
+
+    def rank_of(self, partition_key, score, order='gpa'):
+        """
+        成绩在分组中的名次（并列取最高名次）及分组人数
+        名次 = 成绩严格高于 score 的人数 + 1
+        """
+        partition = self.partitions.get(partition_key)
+        if not partition:
+            return 1, 0
+        keys, _ = self._arrays(partition, order)
+        return bisect.bisect_left(keys, -float(score)) + 1, partition['count']
+
+    def around(self, user_id, order='gpa', page=None, page_size=20):
+        """
+        返回学生所在分组中，包含该学生（或指定页）的一页排名
+        学生不在排行榜中时返回 None
+        """
+        my_index = self.find(user_id)
+        if my_index is None:
+            return None
+        partition = self.partitions[self.partition_keys[self._own_partitions[my_index]]]
+        keys, ids = self._arrays(partition, order)
+        count = partition['count']
+        my_score = self._scores[order][my_index]
+
+        # 二分定位到并列区间，再在区间内找到本人
+        start = bisect.bisect_left(keys, -my_score)
+        end = bisect.bisect_right(keys, -my_score)
+        my_position = next(i for i in range(start, end) if ids[i] == my_index)
+
+        if page is None:
+            page = my_position // page_size + 1
+        offset = (page - 1) * page_size
+        ranking_list = []
+        for i in range(offset, min(offset + page_size, count)):
+            index = ids[i]
+            ranking_list.append({
+                'rank': bisect.bisect_left(keys, keys[i]) + 1,
+                'student_name': self._string(self._names, self._name_offsets, index),
+                'student_id': self._string(self._school_ids, self._school_id_offsets, index),
+                'gpa': self._scores['gpa'][index],
+                'total_score': self._scores['total'][index],
+                'is_me': index == my_index
+            })
+
+        return {
+            'my_ranking': start + 1,
+            'ranking_dimension': self.dimensions[self._student_dimensions[my_index]],
+            'total_students': count,
+            'order': order,
+            'page': page,
+            'page_size': page_size,
+            'ranking_list': ranking_list
+        }
+
+
+def get_leaderboard():
+    """
+    获取当前进程的排行榜视图，排行榜文件尚未生成时返回 None
+    文件被重新生成后（修改时间或inode变化）自动重新映射
+    """
+    global _cached
+    path = get_leaderboard_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    signature = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _cached is None or _cached[0] != signature:
+            _cached = (signature, Leaderboard(path))
+        return _cached[1]
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from score.snapshots import create_snapshot
+
+
+class Command(BaseCommand):
+    help = '冻结当前全体学生的成绩和排名，保存为成绩快照'
+
+    def add_arguments(self, parser):
+        parser.add_argument('label', help='快照标签，如学期或公示批次')
+        parser.add_argument('--description', help='快照说明')
+
+    def handle(self, *args, **options):
+        try:
+            snapshot = create_snapshot(options['label'], options['description'])
+        except IntegrityError:
+            raise CommandError(f"快照标签已存在: {options['label']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"已创建成绩快照「{snapshot.label}」，共{snapshot.student_count}名学生"
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from score.incremental import DIRTY_BATCH_SIZE, process_all_dirty_students
+
+
+class Command(BaseCommand):
+    help = '重新计算审核状态变化后被标记的学生成绩'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DIRTY_BATCH_SIZE, help='每批重新计算的学生数')
+        parser.add_argument('--loop', action='store_true', help='持续运行，定期处理新的标记')
+        parser.add_argument('--interval', type=float, default=5.0, help='持续运行时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_all_dirty_students(options['batch_size'])
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f"已重新计算{processed}名学生的成绩"))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
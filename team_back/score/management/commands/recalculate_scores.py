@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from score.calculation import BULK_CHUNK_SIZE, filter_students, recalculate_scores
+
+
+class Command(BaseCommand):
+    help = '批量重新计算学生成绩，可按学院、年级、专业限定范围'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--college', help='学院名称或学院ID')
+        parser.add_argument('--grade', help='年级')
+        parser.add_argument('--major', help='专业')
+        parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_SIZE, help='每批写入的学生数')
+
+    def handle(self, *args, **options):
+        scope = {
+            'college': options['college'],
+            'grade': options['grade'],
+            'major': options['major']
+        }
+        students = filter_students(**scope) if any(scope.values()) else None
+
+        started = time.monotonic()
+        result = recalculate_scores(students, chunk_size=options['chunk_size'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"成功计算{result['total']}名学生的成绩"
+            f"（新建{result['created']}条，更新{result['updated']}条），耗时{elapsed:.2f}秒"
+        ))
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from score.selection import DEFAULT_TIE_BREAK, SELECTION_WORKERS, run_selection
+
+
+class Command(BaseCommand):
+    help = '按专业名额遴选保研推荐名单'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', help='遴选批次，如 2025届推免（非预览时必填）')
+        parser.add_argument('--quota', action='append', default=[], metavar='专业=名额', help='专业名额，可重复指定')
+        parser.add_argument('--default-quota', type=int, help='未指定名额的申请专业使用的名额')
+        parser.add_argument('--tie-break', default=','.join(DEFAULT_TIE_BREAK),
+                            help='排序规则，逗号分隔，可选 total、gpa、failed_courses')
+        parser.add_argument('--grade', help='只遴选指定年级')
+        parser.add_argument('--workers', type=int, default=SELECTION_WORKERS, help='并行处理的专业数')
+        parser.add_argument('--dry-run', action='store_true', help='只显示各专业分数线，不写入结果')
+
+    def handle(self, *args, **options):
+        quotas = {}
+        for item in options['quota']:
+            major, _, quota = item.rpartition('=')
+            if not major or not quota.isdigit():
+                raise CommandError(f'名额格式错误: {item}，应为 专业=名额')
+            quotas[major] = int(quota)
+        if not quotas and options['default_quota'] is None:
+            raise CommandError('请通过 --quota 或 --default-quota 指定名额')
+
+        started = time.monotonic()
+        try:
+            summaries = run_selection(
+                quotas,
+                tie_break=options['tie_break'],
+                batch=options['batch'],
+                grade=options['grade'],
+                default_quota=options['default_quota'],
+                dry_run=options['dry_run'],
+                workers=options['workers']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        for summary in summaries:
+            cutoff = summary['cutoff']
+            line = f"{summary['major']}: 名额{summary['quota']}，申请{summary['applicants']}人，入选{summary['selected']}人"
+            if cutoff:
+                line += (f"，分数线 综合成绩{cutoff['total_comprehensive_score']:.4f} / 绩点{cutoff['gpa']:.4f}"
+                         f" / 不及格{cutoff['failed_courses']}门")
+            if summary['tied_at_cutoff']:
+                line += f"，另有{summary['tied_at_cutoff']}人与分数线完全相同，需人工复核"
+            self.stdout.write(line)
+
+        action = '预览' if options['dry_run'] else f"写入批次「{options['batch']}」"
+        self.stdout.write(self.style.SUCCESS(f"遴选{action}完成，共{len(summaries)}个专业，耗时{elapsed:.2f}秒"))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from score.verification import VERIFY_BATCH_SIZE, verify_scores
+
+
+class Command(BaseCommand):
+    help = '校验学生成绩与已审核通过的申请是否一致，重新计算不一致的学生'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=VERIFY_BATCH_SIZE, help='每批校验的学生数')
+        parser.add_argument('--no-repair', action='store_true', help='只检查，不重新计算')
+        parser.add_argument('--loop', action='store_true', help='持续运行，定期校验')
+        parser.add_argument('--interval', type=float, default=3600.0, help='持续运行时的校验间隔（秒）')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            result = verify_scores(options['batch_size'], repair=not options['no_repair'])
+            elapsed = time.monotonic() - started
+            style = self.style.WARNING if result['drifted'] else self.style.SUCCESS
+            self.stdout.write(style(
+                f"校验{result['checked']}名学生（跳过重算队列中的{result['pending']}名），不一致{result['drifted']}名，"
+                f"重新计算{result['repaired']}名，耗时{elapsed:.2f}秒"
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
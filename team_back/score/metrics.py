@@ -0,0 +1,33 @@
+"""
+成绩子系统运行指标：计数器和最新值保存在 score_metric 表中，
+后台命令（如 verify_scores）写入的指标各工作进程都能读到
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ScoreMetric
+
+
+def increment(name, value=1):
+    """累加计数器，返回累加后的值"""
+    with transaction.atomic():
+        metric, created = ScoreMetric.objects.select_for_update().get_or_create(name=name, defaults={'value': value})
+        if not created:
+            metric.value = (metric.value or 0) + value
+            metric.save(update_fields=['value', 'updated_at'])
+    return metric.value
+
+
+def set_value(name, value):
+    """记录最新值"""
+    ScoreMetric.objects.update_or_create(name=name, defaults={'value': value})
+
+
+def record_time(name):
+    """记录当前时间"""
+    set_value(name, timezone.now().isoformat())
+
+
+def get_metrics():
+    """返回全部指标 {名称: 值}"""
+    return dict(ScoreMetric.objects.values_list('name', 'value'))
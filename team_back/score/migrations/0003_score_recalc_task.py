@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score', '0002_initial'),
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreRecalcTask',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_recalc_task', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+                ('marked_at', models.DateTimeField(verbose_name='标记时间')),
+            ],
+            options={
+                'verbose_name': '成绩重算任务',
+                'verbose_name_plural': '成绩重算任务',
+                'db_table': 'score_recalc_task',
+                'indexes': [models.Index(fields=['marked_at'], name='score_recal_marked__5684e9_idx')],
+            },
+        ),
+    ]
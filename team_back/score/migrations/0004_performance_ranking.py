@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score', '0003_score_recalc_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20, verbose_name='排名维度')),
+                ('partition_key', models.CharField(max_length=255, verbose_name='排名分组')),
+                ('gpa_rank', models.IntegerField(verbose_name='绩点排名')),
+                ('score_rank', models.IntegerField(verbose_name='综合成绩排名')),
+                ('cohort_size', models.IntegerField(verbose_name='分组人数')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('performance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='score.academicperformance', verbose_name='学业成绩')),
+            ],
+            options={
+                'verbose_name': '成绩排名',
+                'verbose_name_plural': '成绩排名',
+                'db_table': 'performance_ranking',
+                'indexes': [models.Index(fields=['dimension', 'partition_key', 'score_rank'], name='performance_dimensi_844c16_idx'), models.Index(fields=['dimension', 'partition_key', 'gpa_rank'], name='performance_dimensi_1e595e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('performance', 'dimension'), name='unique_performance_dimension')],
+            },
+        ),
+    ]
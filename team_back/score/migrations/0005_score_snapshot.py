@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:52
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score', '0004_performance_ranking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('label', models.CharField(max_length=100, unique=True, verbose_name='快照标签')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='说明')),
+                ('student_count', models.IntegerField(default=0, verbose_name='学生人数')),
+                ('payload', models.BinaryField(verbose_name='快照数据')),
+                ('checksum', models.CharField(max_length=64, verbose_name='数据校验和')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='score_snapshots', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '成绩快照',
+                'verbose_name_plural': '成绩快照',
+                'db_table': 'score_snapshot',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score', '0005_score_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academicperformance',
+            name='source_checksum',
+            field=models.CharField(blank=True, default='', max_length=16, verbose_name='加分来源校验和'),
+        ),
+    ]
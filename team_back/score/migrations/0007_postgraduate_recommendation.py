@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:54
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score', '0006_performance_source_checksum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostgraduateRecommendation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('batch', models.CharField(max_length=100, verbose_name='遴选批次')),
+                ('major', models.CharField(max_length=100, verbose_name='专业')),
+                ('major_rank', models.IntegerField(verbose_name='专业内排名')),
+                ('quota', models.IntegerField(verbose_name='专业名额')),
+                ('is_selected', models.BooleanField(default=False, verbose_name='是否入选')),
+                ('total_comprehensive_score', models.DecimalField(decimal_places=4, max_digits=7, verbose_name='综合成绩')),
+                ('gpa', models.DecimalField(decimal_places=4, max_digits=7, verbose_name='学分绩点')),
+                ('failed_courses', models.IntegerField(default=0, verbose_name='不及格门数')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postgraduate_recommendations', to=settings.AUTH_USER_MODEL, verbose_name='学生')),
+            ],
+            options={
+                'verbose_name': '保研推荐',
+                'verbose_name_plural': '保研推荐',
+                'db_table': 'postgraduate_recommendation',
+                'indexes': [models.Index(fields=['batch', 'major', 'major_rank'], name='postgraduat_batch_639c4f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('batch', 'user'), name='unique_recommendation_batch_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score', '0007_postgraduate_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreStatsGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.BigIntegerField(default=0, verbose_name='版本号')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '成绩统计版本',
+                'verbose_name_plural': '成绩统计版本',
+                'db_table': 'score_stats_generation',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('score', '0008_stats_generation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreMetric',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='指标名称')),
+                ('value', models.JSONField(null=True, verbose_name='指标值')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '成绩运行指标',
+                'verbose_name_plural': '成绩运行指标',
+                'db_table': 'score_metric',
+                'ordering': ['name'],
+            },
+        ),
+    ]
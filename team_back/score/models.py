@@ -27,6 +27,8 @@ class AcademicPerformance(models.Model):
                                                           verbose_name='综合表现成绩(满分5分)', default=0)
     total_comprehensive_score = models.DecimalField(max_digits=7, decimal_places=4, verbose_name='综合成绩(满分100分)',
                                                     default=0)
+    # 计算成绩时已审核通过申请（ID及加分）的校验和，用于检查成绩是否与申请一致
+    source_checksum = models.CharField(max_length=16, blank=True, default='', verbose_name='加分来源校验和')
 
     # 时间戳
     created_at = models.DateTimeField(auto_now_add=True)
@@ -40,3 +42,141 @@ class AcademicPerformance(models.Model):
     def __str__(self):
         return f"{self.user.name}的学业成绩"
 
+
+
+class ScoreRecalcTask(models.Model):
+    """待重新计算成绩的学生，同一学生的多次变更合并为一条记录"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='score_recalc_task',
+                                verbose_name='用户')
+    marked_at = models.DateTimeField(verbose_name='标记时间')
+
+    class Meta:
+        db_table = 'score_recalc_task'
+        verbose_name = '成绩重算任务'
+        verbose_name_plural = '成绩重算任务'
+        indexes = [
+            models.Index(fields=['marked_at'])
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}待重新计算"
+
+
+class PerformanceRanking(models.Model):
+    """学生在各排名维度下的绩点排名和综合成绩排名"""
+    performance = models.ForeignKey(AcademicPerformance, on_delete=models.CASCADE, related_name='rankings',
+                                    verbose_name='学业成绩')
+    dimension = models.CharField(max_length=20, verbose_name='排名维度')
+    partition_key = models.CharField(max_length=255, verbose_name='排名分组')  # 如："计算机|2022"
+    gpa_rank = models.IntegerField(verbose_name='绩点排名')
+    score_rank = models.IntegerField(verbose_name='综合成绩排名')
+    cohort_size = models.IntegerField(verbose_name='分组人数')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'performance_ranking'
+        verbose_name = '成绩排名'
+        verbose_name_plural = '成绩排名'
+        constraints = [
+            models.UniqueConstraint(fields=['performance', 'dimension'], name='unique_performance_dimension')
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'partition_key', 'score_rank']),
+            models.Index(fields=['dimension', 'partition_key', 'gpa_rank'])
+        ]
+
+    def __str__(self):
+        return f"{self.performance_id}@{self.dimension}: {self.score_rank}/{self.cohort_size}"
+
+
+class ScoreStatsGeneration(models.Model):
+    """
+    成绩统计缓存的版本号（只有一行）
+    成绩变化时加1；版本号保存在数据库中，后台命令和各工作进程都能看到同一个值
+    """
+    generation = models.BigIntegerField(default=0, verbose_name='版本号')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'score_stats_generation'
+        verbose_name = '成绩统计版本'
+        verbose_name_plural = '成绩统计版本'
+
+    def __str__(self):
+        return f"成绩统计版本 {self.generation}"
+
+
+class ScoreMetric(models.Model):
+    """成绩子系统运行指标（计数器或最新值），后台命令和各工作进程读写同一张表"""
+    name = models.CharField(max_length=100, primary_key=True, verbose_name='指标名称')
+    value = models.JSONField(null=True, verbose_name='指标值')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'score_metric'
+        verbose_name = '成绩运行指标'
+        verbose_name_plural = '成绩运行指标'
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class ScoreSnapshot(models.Model):
+    """
+    成绩快照：按标签（如学期、公示批次）冻结全体学生的成绩和排名
+    数据按列压缩保存，创建后不可修改
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    label = models.CharField(max_length=100, unique=True, verbose_name='快照标签')  # 如：2024-2025学年第一次公示
+    description = models.TextField(blank=True, null=True, verbose_name='说明')
+    student_count = models.IntegerField(default=0, verbose_name='学生人数')
+    payload = models.BinaryField(verbose_name='快照数据')  # zlib压缩的JSON
+    checksum = models.CharField(max_length=64, verbose_name='数据校验和')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='score_snapshots', verbose_name='创建人')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'score_snapshot'
+        verbose_name = '成绩快照'
+        verbose_name_plural = '成绩快照'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"成绩快照: {self.label}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('成绩快照创建后不可修改')
+        super().save(*args, **kwargs)
+
+
+class PostgraduateRecommendation(models.Model):
+    """保研推荐遴选结果：每个批次中每名申请学生一条记录"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    batch = models.CharField(max_length=100, verbose_name='遴选批次')  # 如：2025届推免
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='postgraduate_recommendations',
+                             verbose_name='学生')
+    major = models.CharField(max_length=100, verbose_name='专业')
+    major_rank = models.IntegerField(verbose_name='专业内排名')
+    quota = models.IntegerField(verbose_name='专业名额')
+    is_selected = models.BooleanField(default=False, verbose_name='是否入选')
+    total_comprehensive_score = models.DecimalField(max_digits=7, decimal_places=4, verbose_name='综合成绩')
+    gpa = models.DecimalField(max_digits=7, decimal_places=4, verbose_name='学分绩点')
+    failed_courses = models.IntegerField(default=0, verbose_name='不及格门数')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'postgraduate_recommendation'
+        verbose_name = '保研推荐'
+        verbose_name_plural = '保研推荐'
+        constraints = [
+            models.UniqueConstraint(fields=['batch', 'user'], name='unique_recommendation_batch_user')
+        ]
+        indexes = [
+            models.Index(fields=['batch', 'major', 'major_rank'])
+        ]
+
+    def __str__(self):
+        return f"{self.batch} {self.major} 第{self.major_rank}名: {self.user_id}"
@@ -0,0 +1,150 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Rank
+
+from .models import AcademicPerformance, PerformanceRanking
+from .statistics import invalidate_statistics
+
+
+# 排名维度及其分组字段
+RANKING_DIMENSIONS = {
+    'major': ['user__major'],
+    'grade': ['user__grade'],
+    'college': ['user__college_id'],
+    'major_grade': ['user__major', 'user__grade'],
+    'college_grade': ['user__college_id', 'user__grade'],
+}
+
+# AcademicPerformance.ranking_dimension 中的常见取值与排名维度的对应关系
+DIMENSION_ALIASES = {
+    '专业排名': 'major',
+    '年级排名': 'grade',
+    '学院排名': 'college',
+    '专业年级排名': 'major_grade',
+    '学院年级排名': 'college_grade',
+}
+
+# 未能识别的排名维度按专业+年级排名
+DEFAULT_DIMENSION = 'major_grade'
+
+# 排名写回时每批的记录数
+RANKING_CHUNK_SIZE = 1000
+
+
+def resolve_dimension(ranking_dimension):
+    """将 ranking_dimension 字段的取值解析为排名维度"""
+    if ranking_dimension in RANKING_DIMENSIONS:
+        return ranking_dimension
+    return DIMENSION_ALIASES.get(ranking_dimension, DEFAULT_DIMENSION)
+
+
+def make_partition_key(values):
+    """由分组字段的取值生成分组键"""
+    return '|'.join('' if value is None else str(value) for value in values)
+
+
+def partition_filter(dimension, partitions):
+    """生成只包含指定分组的查询条件"""
+    fields = RANKING_DIMENSIONS[dimension]
+    return reduce(or_, (Q(**dict(zip(fields, values))) for values in partitions))
+
+
+def refresh_rankings(dimensions=None, students=None, chunk_size=RANKING_CHUNK_SIZE):
+    """
+    使用 RANK() OVER (PARTITION BY ...) 批量计算排名
+    一次查询同时计算所有维度的绩点排名和综合成绩排名，再按批次写回。
+    指定 students 时只刷新这些学生所在的分组。
+    返回写回的排名记录数
+    """
+    dimensions = list(dimensions or RANKING_DIMENSIONS)
+    queryset = AcademicPerformance.objects.filter(user__user_type='student')
+
+    # 只刷新指定学生所在的分组：分组必须完整参与计算，排名才正确
+    touched = None
+    if students is not None:
+        touched = {}
+        rows = list(
+            AcademicPerformance.objects
+            .filter(user__in=students)
+            .values(*{field for dimension in dimensions for field in RANKING_DIMENSIONS[dimension]})
+        )
+        if not rows:
+            return 0
+        for dimension in dimensions:
+            fields = RANKING_DIMENSIONS[dimension]
+            touched[dimension] = {tuple(row[field] for field in fields) for row in rows}
+        queryset = queryset.filter(reduce(or_, (
+            partition_filter(dimension, partitions) for dimension, partitions in touched.items()
+        )))
+
+    annotations = {}
+    for dimension in dimensions:
+        partition_by = [F(field) for field in RANKING_DIMENSIONS[dimension]]
+        annotations[f'{dimension}_gpa_rank'] = Window(
+            expression=Rank(), partition_by=partition_by, order_by=F('gpa').desc()
+        )
+        annotations[f'{dimension}_score_rank'] = Window(
+            expression=Rank(), partition_by=partition_by, order_by=F('total_comprehensive_score').desc()
+        )
+        annotations[f'{dimension}_cohort_size'] = Window(
+            expression=Count('id'), partition_by=partition_by
+        )
+
+    group_fields = sorted({field for dimension in dimensions for field in RANKING_DIMENSIONS[dimension]})
+    rows = (
+        queryset
+        .annotate(**annotations)
+        .values('id', 'ranking_dimension', 'gpa_ranking', *group_fields, *annotations)
+        .order_by()
+    )
+
+    written = 0
+    rankings = []
+    performances = []
+
+    def flush():
+        with transaction.atomic():
+            PerformanceRanking.objects.bulk_create(
+                rankings,
+                batch_size=chunk_size,
+                update_conflicts=True,
+                unique_fields=['performance', 'dimension'],
+                update_fields=['partition_key', 'gpa_rank', 'score_rank', 'cohort_size', 'updated_at']
+            )
+            if performances:
+                AcademicPerformance.objects.bulk_update(performances, ['gpa_ranking'], batch_size=chunk_size)
+
+    for row in rows.iterator(chunk_size=chunk_size):
+        own_dimension = resolve_dimension(row['ranking_dimension'])
+        for dimension in dimensions:
+            values = tuple(row[field] for field in RANKING_DIMENSIONS[dimension])
+            if touched is not None and values not in touched[dimension]:
+                continue
+            rankings.append(PerformanceRanking(
+                performance_id=row['id'],
+                dimension=dimension,
+                partition_key=make_partition_key(values),
+                gpa_rank=row[f'{dimension}_gpa_rank'],
+                score_rank=row[f'{dimension}_score_rank'],
+                cohort_size=row[f'{dimension}_cohort_size'],
+            ))
+            # 同步学生本人排名维度下的绩点排名
+            gpa_rank = row[f'{dimension}_gpa_rank']
+            if dimension == own_dimension and row['gpa_ranking'] != gpa_rank:
+                performances.append(AcademicPerformance(id=row['id'], gpa_ranking=gpa_rank))
+        if len(rankings) >= chunk_size:
+            flush()
+            written += len(rankings)
+            rankings = []
+            performances = []
+
+    if rankings:
+        flush()
+        written += len(rankings)
+
+    if written:
+        invalidate_statistics()
+    return written
@@ -0,0 +1,254 @@
+"""
+保研推荐遴选：按专业名额和排序规则，从已保存的学业成绩中选出推荐名单
+每个专业一次有序查询，多个专业并行处理，结果写入 PostgraduateRecommendation
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from .models import AcademicPerformance, PostgraduateRecommendation
+from .serializers import PostgraduateSelectionSerializer
+
+
+# 可用的排序规则：字段及排序方向（成绩、绩点从高到低，不及格门数从少到多）
+TIE_BREAK_RULES = {
+    'total': '-total_comprehensive_score',
+    'gpa': '-gpa',
+    'failed_courses': 'failed_courses',
+}
+
+DEFAULT_TIE_BREAK = ['total', 'gpa', 'failed_courses']
+
+# 并行处理的专业数
+SELECTION_WORKERS = 4
+
+
+def parse_tie_break(value):
+    """解析排序规则（列表或逗号分隔的字符串），无效规则抛出 ValueError"""
+    if not value:
+        return list(DEFAULT_TIE_BREAK)
+    if isinstance(value, str):
+        rules = [rule.strip() for rule in value.split(',')]
+    elif isinstance(value, list):
+        rules = value
+    else:
+        raise ValueError("排序规则应为列表或逗号分隔的字符串")
+    invalid = [str(rule) for rule in rules if not isinstance(rule, str) or rule not in TIE_BREAK_RULES]
+    if invalid:
+        raise ValueError(f"无效的排序规则: {', '.join(invalid)}")
+    return rules
+
+
+def get_applicants(grade=None):
+    """有保研资格且申请保研的学生的学业成绩"""
+    queryset = AcademicPerformance.objects.filter(
+        user__user_type='student',
+        user__has_postgraduate_qualification=True,
+        user__is_applying_postgraduate=True
+    )
+    if grade:
+        queryset = queryset.filter(user__grade=grade)
+    return queryset
+
+
+def select_major(major, quota, tie_break, grade=None):
+    """
+    遴选单个专业：一次按排序规则排好序的查询，前 quota 名入选
+    排序规则全部相同时按学号排序，保证结果确定
+    """
+    order_by = [TIE_BREAK_RULES[rule] for rule in tie_break] + ['user__school_id']
+    fields = ['user_id', 'user__school_id', 'user__name', 'total_comprehensive_score', 'gpa', 'failed_courses']
+    rows = list(get_applicants(grade).filter(user__major=major).order_by(*order_by).values(*fields))
+
+    sort_fields = [TIE_BREAK_RULES[rule].lstrip('-') for rule in tie_break]
+    results = []
+    for index, row in enumerate(rows):
+        results.append({
+            'user_id': row['user_id'],
+            'school_id': row['user__school_id'],
+            'name': row['user__name'],
+            'major_rank': index + 1,
+            'is_selected': index < quota,
+            'total_comprehensive_score': row['total_comprehensive_score'],
+            'gpa': row['gpa'],
+            'failed_courses': row['failed_courses'],
+        })
+
+    cutoff = results[min(quota, len(results)) - 1] if results and quota > 0 else None
+    # 与最后一名入选者排序规则完全相同、却未入选的人数（需人工复核）
+    tied_outside = 0
+    if cutoff is not None:
+        cutoff_key = [cutoff[field] for field in sort_fields]
+        tied_outside = sum(
+            1 for item in results[quota:] if [item[field] for field in sort_fields] == cutoff_key
+        )
+
+    return {
+        'major': major,
+        'quota': quota,
+        'applicants': len(results),
+        'selected': min(quota, len(results)),
+        'cutoff': {
+            'total_comprehensive_score': float(cutoff['total_comprehensive_score']),
+            'gpa': float(cutoff['gpa']),
+            'failed_courses': cutoff['failed_courses'],
+        } if cutoff else None,
+        'tied_at_cutoff': tied_outside,
+        'results': results,
+    }
+
+
+def run_selection(quotas, tie_break=None, batch=None, grade=None, default_quota=None, dry_run=False,
+                  workers=SELECTION_WORKERS):
+    """
+    按专业名额遴选保研推荐名单
+    quotas 为 {专业: 名额}；指定 default_quota 时，未列出的申请专业使用该名额
+    dry_run 为 True 时只返回各专业的分数线，不写入结果表
+    返回各专业的遴选摘要列表
+    """
+    tie_break = parse_tie_break(tie_break)
+    quotas = dict(quotas or {})
+    negative = [major for major, quota in quotas.items() if quota < 0]
+    if negative or (default_quota is not None and default_quota < 0):
+        raise ValueError(f"名额不能为负数: {', '.join(negative) or '默认名额'}")
+    if default_quota is not None:
+        majors = get_applicants(grade).exclude(user__major__isnull=True).values_list('user__major', flat=True).distinct()
+        for major in majors:
+            quotas.setdefault(major, default_quota)
+    if not dry_run and not batch:
+        raise ValueError('请提供遴选批次')
+
+    def select_in_thread(item):
+        try:
+            return select_major(item[0], item[1], tie_break, grade)
+        finally:
+            # 工作线程使用独立的数据库连接，结束时关闭
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(quotas) or 1))) as executor:
+        summaries = list(executor.map(select_in_thread, sorted(quotas.items())))
+
+    if not dry_run:
+        user_ids = [item['user_id'] for summary in summaries for item in summary['results']]
+        with transaction.atomic():
+            # 同一批次每名学生只有一条结果：换了专业的学生在原专业下的旧结果也要删除
+            PostgraduateRecommendation.objects.filter(
+                Q(major__in=list(quotas)) | Q(user_id__in=user_ids), batch=batch
+            ).delete()
+            PostgraduateRecommendation.objects.bulk_create([
+                PostgraduateRecommendation(
+                    batch=batch,
+                    user_id=item['user_id'],
+                    major=summary['major'],
+                    major_rank=item['major_rank'],
+                    quota=summary['quota'],
+                    is_selected=item['is_selected'],
+                    total_comprehensive_score=item['total_comprehensive_score'],
+                    gpa=item['gpa'],
+                    failed_courses=item['failed_courses']
+                )
+                for summary in summaries for item in summary['results']
+            ], batch_size=1000)
+    return summaries
+
+
+class PostgraduateSelectionViewSet(ViewSet):
+    """保研推荐遴选接口（管理员）"""
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['post'])
+    def run(self, request):
+        """
+        执行遴选
+        请求体：{"batch": "2025届推免", "quotas": {"计算机科学与技术": 10}, "default_quota": null,
+                 "tie_break": ["total", "gpa", "failed_courses"], "grade": "2022", "dry_run": true}
+        """
+        user = request.user
+        if not hasattr(user, 'user_type') or user.user_type != 'admin':
+            return Response(
+                {"error": "只有管理员可以执行保研遴选"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = PostgraduateSelectionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"error": "遴选参数错误", "details": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = serializer.validated_data
+        dry_run = params['dry_run']
+        try:
+            summaries = run_selection(
+                params['quotas'],
+                tie_break=params.get('tie_break'),
+                batch=params.get('batch'),
+                grade=params.get('grade'),
+                default_quota=params.get('default_quota'),
+                dry_run=dry_run
+            )
+        except ValueError as e:
+            return Response(
+                {"error": f"遴选参数错误: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except IntegrityError:
+            return Response(
+                {"error": "该批次的遴选结果正在被同时写入，请稍后重试"},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        for summary in summaries:
+            if dry_run:
+                summary.pop('results')
+            else:
+                summary['results'] = [item for item in summary['results'] if item['is_selected']]
+
+        return Response({
+            "success": True,
+            "message": "遴选预览完成" if dry_run else "遴选完成",
+            "data": summaries
+        })
+
+    @action(detail=False, methods=['get'])
+    def results(self, request):
+        """查看某一批次的遴选结果（参数 batch，可选 major、selected_only）"""
+        user = request.user
+        if not hasattr(user, 'user_type') or user.user_type not in ['teacher', 'admin']:
+            return Response(
+                {"error": "无权查看保研遴选结果"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        batch = request.query_params.get('batch')
+        if not batch:
+            return Response(
+                {"error": "请提供遴选批次"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = PostgraduateRecommendation.objects.filter(batch=batch).select_related('user')
+        if request.query_params.get('major'):
+            queryset = queryset.filter(major=request.query_params['major'])
+        if request.query_params.get('selected_only') in ('1', 'true', 'True'):
+            queryset = queryset.filter(is_selected=True)
+
+        return Response([
+            {
+                'student_name': item.user.name,
+                'student_id': item.user.school_id,
+                'major': item.major,
+                'major_rank': item.major_rank,
+                'quota': item.quota,
+                'is_selected': item.is_selected,
+                'total_score': float(item.total_comprehensive_score),
+                'gpa': float(item.gpa),
+                'failed_courses': item.failed_courses
+            }
+            for item in queryset.order_by('major', 'major_rank')
+        ])
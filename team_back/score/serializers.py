@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import AcademicPerformance
+from .models import AcademicPerformance, ScoreSnapshot
 from user.models import User
 
 class StudentBasicInfoSerializer(serializers.ModelSerializer):
@@ -48,4 +48,35 @@ class PerformanceStatsSerializer(serializers.Serializer):
     min_gpa = serializers.FloatField()
     avg_total_score = serializers.FloatField()
     total_students = serializers.IntegerField()
-    ranking_distribution = serializers.DictField()
\ No newline at end of file
+    q1_gpa = serializers.FloatField(allow_null=True)
+    median_gpa = serializers.FloatField(allow_null=True)
+    q3_gpa = serializers.FloatField(allow_null=True)
+    p90_gpa = serializers.FloatField(allow_null=True)
+    stddev_gpa = serializers.FloatField(allow_null=True)
+    q1_total_score = serializers.FloatField(allow_null=True)
+    median_total_score = serializers.FloatField(allow_null=True)
+    q3_total_score = serializers.FloatField(allow_null=True)
+    p90_total_score = serializers.FloatField(allow_null=True)
+    stddev_total_score = serializers.FloatField(allow_null=True)
+    bucket_width = serializers.IntegerField()
+    ranking_distribution = serializers.DictField()
+
+
+class ScoreSnapshotSerializer(serializers.ModelSerializer):
+    """成绩快照序列化器（不含快照数据）"""
+    created_by_name = serializers.CharField(source='created_by.name', read_only=True, allow_null=True)
+
+    class Meta:
+        model = ScoreSnapshot
+        fields = ['id', 'label', 'description', 'student_count', 'checksum', 'created_by_name', 'created_at']
+        read_only_fields = fields
+
+
+class PostgraduateSelectionSerializer(serializers.Serializer):
+    """保研遴选请求参数"""
+    batch = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    quotas = serializers.DictField(child=serializers.IntegerField(min_value=0), required=False, default=dict)
+    default_quota = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    tie_break = serializers.JSONField(required=False, allow_null=True)
+    grade = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    dry_run = serializers.BooleanField(required=False, default=False)
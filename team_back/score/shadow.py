@@ -0,0 +1,150 @@
+"""
+加分规则影子评估：在内存中用候选加分表重新计算全部已审核通过申请的加分，
+按学术专长15分、综合表现5分封顶合成总分，并在每名学生本人的排名维度下重新排名
+只读取数据，不写入申请、成绩和排名表；用于新规则生效前评估对学生总分和名次的影响
+"""
+import bisect
+from array import array
+from collections import defaultdict
+from decimal import Decimal
+
+from material.models import APPLICATION_MODEL_NAMES, APPLICATION_MODELS, EXPERTISE_MODELS
+from material.rules import RULE_EVALUATORS, get_active_rules
+
+from .calculation import BULK_CHUNK_SIZE, combine_scores
+from .models import AcademicPerformance
+from .ranking import RANKING_DIMENSIONS, make_partition_key, resolve_dimension
+
+
+def collect_shadow_points(rules, base_rules):
+    """
+    读取全部已审核通过申请，返回按学生汇总的加分小计及各类申请的统计：
+    (当前学术专长小计, 当前综合表现小计, 候选学术专长小计, 候选综合表现小计, {申请类型: 统计})
+    当前加分与现行规则的计算结果一致的申请按候选规则重新计算；
+    审核中被老师调整过加分的申请（与现行规则计算结果不一致）以及没有加分规则的类型保留当前加分
+    """
+    base_expertise = defaultdict(Decimal)
+    base_comprehensive = defaultdict(Decimal)
+    shadow_expertise = defaultdict(Decimal)
+    shadow_comprehensive = defaultdict(Decimal)
+    applications = {}
+    for model in APPLICATION_MODELS:
+        application_type = APPLICATION_MODEL_NAMES[model]
+        is_expertise = model in EXPERTISE_MODELS
+        base_points = base_expertise if is_expertise else base_comprehensive
+        shadow_points = shadow_expertise if is_expertise else shadow_comprehensive
+        evaluator = RULE_EVALUATORS.get(application_type)
+        fields = evaluator[2] if evaluator else []
+        approved = (
+            model.objects
+            .filter(review_status='approved', user__user_type='student')
+            .only('id', 'user_id', 'bonus_points', *fields)
+            .order_by()
+        )
+        type_report = {'evaluated': 0, 'changed': 0, 'adjusted_by_reviewer': 0}
+        for application in approved.iterator(chunk_size=BULK_CHUNK_SIZE):
+            current = application.bonus_points or Decimal('0')
+            candidate = current
+            if evaluator:
+                if Decimal(str(base_rules.evaluate(application, application_type))) == current:
+                    candidate = Decimal(str(rules.evaluate(application, application_type)))
+                else:
+                    type_report['adjusted_by_reviewer'] += 1
+            type_report['evaluated'] += 1
+            if candidate != current:
+                type_report['changed'] += 1
+            base_points[application.user_id] += current
+            shadow_points[application.user_id] += candidate
+        applications[application_type] = type_report
+    return base_expertise, base_comprehensive, shadow_expertise, shadow_comprehensive, applications
+
+
+def rank_in_partitions(rows, key):
+    """
+    按分组计算名次：每个分组的成绩取相反数后升序排列成数组，
+    名次 = 成绩严格高于本人的人数 + 1（与 RANK() 一致）。返回与 rows 顺序一致的名次列表
+    """
+    partitions = defaultdict(list)
+    for row in rows:
+        partitions[row['partition_key']].append(-row[key])
+    ordered = {partition_key: array('d', sorted(values)) for partition_key, values in partitions.items()}
+    return [bisect.bisect_left(ordered[row['partition_key']], -row[key]) + 1 for row in rows]
+
+
+def shadow_evaluate(rules, base_rules=None, limit=None):
+    """
+    用候选加分表 rules 评估全体学生总分和名次的变化，base_rules 默认为当前生效的加分表
+    返回报告：汇总信息、各类申请的统计、总分或名次发生变化的学生（按名次变化幅度排序，limit 限制条数）
+    """
+    base_rules = base_rules or get_active_rules()
+    (base_expertise, base_comprehensive,
+     shadow_expertise, shadow_comprehensive, applications) = collect_shadow_points(rules, base_rules)
+
+    group_fields = sorted({field for fields in RANKING_DIMENSIONS.values() for field in fields})
+    performances = (
+        AcademicPerformance.objects
+        .filter(user__user_type='student')
+        .values_list('user_id', 'user__school_id', 'user__name', 'user__gpa', 'ranking_dimension', *group_fields)
+        .order_by()
+    )
+    rows = []
+    for user_id, school_id, name, gpa, ranking_dimension, *values in performances.iterator(chunk_size=2000):
+        values = dict(zip(group_fields, values))
+        dimension = resolve_dimension(ranking_dimension)
+        base = combine_scores(gpa, base_expertise.get(user_id), base_comprehensive.get(user_id))
+        shadow = combine_scores(gpa, shadow_expertise.get(user_id), shadow_comprehensive.get(user_id))
+        rows.append({
+            'user_id': user_id,
+            'school_id': school_id,
+            'name': name,
+            'ranking_dimension': dimension,
+            'partition_key': f"{dimension}:{make_partition_key(values[field] for field in RANKING_DIMENSIONS[dimension])}",
+            'base_total': base['total_comprehensive_score'],
+            'shadow_total': shadow['total_comprehensive_score'],
+            'base_expertise': base['academic_expertise_score'],
+            'shadow_expertise': shadow['academic_expertise_score'],
+            'base_comprehensive': base['comprehensive_performance_score'],
+            'shadow_comprehensive': shadow['comprehensive_performance_score'],
+        })
+
+    base_ranks = rank_in_partitions(rows, 'base_total')
+    shadow_ranks = rank_in_partitions(rows, 'shadow_total')
+    cohort_sizes = defaultdict(int)
+    for row in rows:
+        cohort_sizes[row['partition_key']] += 1
+
+    changed = []
+    for row, base_rank, shadow_rank in zip(rows, base_ranks, shadow_ranks):
+        if base_rank == shadow_rank and row['base_total'] == row['shadow_total']:
+            continue
+        changed.append({
+            'user_id': str(row['user_id']),
+            'school_id': row['school_id'],
+            'name': row['name'],
+            'ranking_dimension': row['ranking_dimension'],
+            'cohort_size': cohort_sizes[row['partition_key']],
+            'base_rank': base_rank,
+            'shadow_rank': shadow_rank,
+            'rank_change': base_rank - shadow_rank,
+            'base_total': row['base_total'],
+            'shadow_total': row['shadow_total'],
+            'total_change': round(row['shadow_total'] - row['base_total'], 4),
+            'expertise_change': round(row['shadow_expertise'] - row['base_expertise'], 4),
+            'comprehensive_change': round(row['shadow_comprehensive'] - row['base_comprehensive'], 4),
+        })
+    changed.sort(key=lambda item: (-abs(item['rank_change']), -abs(item['total_change']), item['school_id'] or ''))
+
+    rank_changes = [item['rank_change'] for item in changed]
+    return {
+        'base_version': base_rules.version,
+        'candidate_version': rules.version,
+        'summary': {
+            'students': len(rows),
+            'total_changed': sum(1 for item in changed if item['total_change']),
+            'rank_changed': sum(1 for change in rank_changes if change),
+            'max_rank_rise': max([change for change in rank_changes if change > 0], default=0),
+            'max_rank_drop': -min([change for change in rank_changes if change < 0], default=0),
+        },
+        'applications': applications,
+        'changed': changed[:limit] if limit else changed,
+    }
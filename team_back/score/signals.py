@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_init, post_save
+
+from material.models import APPLICATION_MODELS
+from .incremental import mark_students_dirty
+
+
+def remember_review_state(sender, instance, **kwargs):
+    """记录申请加载时的审核状态和加分，用于保存时判断是否需要重算成绩"""
+    # 直接读取__dict__，避免延迟加载的字段触发额外查询
+    instance._score_state = (instance.__dict__.get('review_status'), instance.__dict__.get('bonus_points'))
+
+
+def affects_score(old_state, new_state):
+    """只有审核通过（或从审核通过变为其他状态）的申请会影响成绩"""
+    if old_state == new_state:
+        return False
+    return 'approved' in (old_state[0], new_state[0])
+
+
+def application_saved(sender, instance, created, **kwargs):
+    """申请审核状态或加分变化时标记学生待重算"""
+    new_state = (instance.review_status, instance.bonus_points)
+    old_state = (None, None) if created else getattr(instance, '_score_state', (None, None))
+    if affects_score(old_state, new_state):
+        mark_students_dirty([instance.user_id])
+    instance._score_state = new_state
+
+
+def application_deleted(sender, instance, **kwargs):
+    """删除已审核通过的申请时标记学生待重算"""
+    if instance.review_status == 'approved':
+        mark_students_dirty([instance.user_id])
+
+
+def connect_signals():
+    for model in APPLICATION_MODELS:
+        uid = f'score_{model._meta.model_name}'
+        post_init.connect(remember_review_state, sender=model, dispatch_uid=f'{uid}_init')
+        post_save.connect(application_saved, sender=model, dispatch_uid=f'{uid}_save')
+        post_delete.connect(application_deleted, sender=model, dispatch_uid=f'{uid}_delete')
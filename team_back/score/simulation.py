@@ -0,0 +1,118 @@
+"""
+成绩模拟：按与正式申请相同的加分细则估算假设申请的加分，预测总分和排名
+模拟只在内存中构造申请对象，不保存、不查询申请表；排名由排行榜文件中的有序成绩数组得到
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from material.models import APPLICATION_TYPES, EXPERTISE_MODELS
+
+from .calculation import COMPREHENSIVE_SCORE_MAX, EXPERTISE_SCORE_MAX, TOTAL_SCORE_MAX
+from .leaderboard import get_leaderboard
+
+
+# 单次模拟最多的假设申请数
+MAX_SIMULATED_APPLICATIONS = 50
+
+# 不允许由模拟请求指定的字段：审核流程字段和加分由系统决定
+PROTECTED_FIELDS = {
+    'id', 'user', 'review_status', 'result', 'bonus_points', 'college_opinion',
+    'first_reviewer', 'first_review_comment', 'first_reviewed_at',
+    'second_reviewer', 'second_review_comment', 'second_reviewed_at',
+    'third_reviewer', 'third_review_comment', 'third_reviewed_at',
+    'created_at', 'updated_at',
+}
+
+
+def build_hypothetical_application(model, data, user):
+    """用请求数据构造未保存的申请对象，字段取值按模型字段类型转换"""
+    instance = model(user=user)
+    for field in model._meta.concrete_fields:
+        if field.name not in data or field.name in PROTECTED_FIELDS:
+            continue
+        if field.is_relation or isinstance(field, models.FileField):
+            continue
+        value = data[field.name]
+        setattr(instance, field.attname, None if value in (None, '') and field.null else field.to_python(value))
+    return instance
+
+
+def estimate_bonus_points(instance):
+    """按模型的加分细则估算加分；没有加分细则的类型使用预估分数"""
+    if hasattr(instance, 'calculate_bonus_points'):
+        return Decimal(str(instance.calculate_bonus_points() or 0))
+    return Decimal(str(instance.estimated_score or 0))
+
+
+def simulate_scores(user, performance, applications):
+    """
+    模拟加入假设申请后的成绩和排名
+    performance 为学生当前的学业成绩记录；各项成绩已封顶，
+    由于加分非负，min(上限, 已封顶成绩 + 新增加分) 与按原始小计计算的结果相同
+    """
+    results = []
+    expertise_delta = Decimal('0')
+    comprehensive_delta = Decimal('0')
+    for item in applications:
+        application_type = item.get('application_type')
+        model = APPLICATION_TYPES.get(application_type)
+        if model is None:
+            results.append({'application_type': application_type, 'bonus_points': None, 'error': '无效的申请类型'})
+            continue
+        try:
+            bonus_points = estimate_bonus_points(build_hypothetical_application(model, item, user))
+        except (ValidationError, TypeError, ValueError, ArithmeticError) as e:
+            results.append({'application_type': application_type, 'bonus_points': None, 'error': f'无法计算加分: {e}'})
+            continue
+        is_expertise = model in EXPERTISE_MODELS
+        if is_expertise:
+            expertise_delta += bonus_points
+        else:
+            comprehensive_delta += bonus_points
+        results.append({
+            'application_type': application_type,
+            'category': 'academic_expertise' if is_expertise else 'comprehensive_performance',
+            'bonus_points': float(bonus_points),
+            'error': None
+        })
+
+    academic_score = float(performance.academic_score)
+    expertise_score = min(EXPERTISE_SCORE_MAX, float(performance.academic_expertise_score) + float(expertise_delta))
+    comprehensive_score = min(
+        COMPREHENSIVE_SCORE_MAX, float(performance.comprehensive_performance_score) + float(comprehensive_delta)
+    )
+    projected_total = round(min(TOTAL_SCORE_MAX, academic_score + expertise_score + comprehensive_score), 4)
+    current_total = float(performance.total_comprehensive_score)
+
+    current_rank = projected_rank = total_students = None
+    leaderboard = get_leaderboard()
+    entry = leaderboard.get_entry(user.id) if leaderboard else None
+    if entry is not None:
+        partition_key = entry[6]
+        current_rank, total_students = leaderboard.rank_of(partition_key, entry[4], order='total')
+        projected_rank, _ = leaderboard.rank_of(partition_key, projected_total, order='total')
+        # 有序数组中包含本人当前成绩，预测成绩低于当前成绩时需排除本人
+        if entry[4] > projected_total:
+            projected_rank -= 1
+
+    return {
+        'ranking_dimension': performance.ranking_dimension,
+        'total_students': total_students,
+        'current': {
+            'academic_score': academic_score,
+            'academic_expertise_score': float(performance.academic_expertise_score),
+            'comprehensive_performance_score': float(performance.comprehensive_performance_score),
+            'total_comprehensive_score': current_total,
+            'rank': current_rank
+        },
+        'projected': {
+            'academic_score': academic_score,
+            'academic_expertise_score': round(expertise_score, 4),
+            'comprehensive_performance_score': round(comprehensive_score, 4),
+            'total_comprehensive_score': projected_total,
+            'rank': projected_rank
+        },
+        'applications': results
+    }
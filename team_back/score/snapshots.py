@@ -0,0 +1,320 @@
+"""
+成绩快照：冻结某一时刻全体学生的成绩和排名，用于公示结果的复现和对比
+快照数据按列组织后用zlib压缩保存，快照不可修改
+解压后的列数据按 (快照ID, 校验和) 缓存，查看和对比时按列筛选，只为返回的学生构造记录
+教师只能查看和对比自己管辖班级的学生
+"""
+import hashlib
+import json
+import zlib
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from .models import AcademicPerformance, PerformanceRanking, ScoreSnapshot
+from .ranking import resolve_dimension
+from .serializers import ScoreSnapshotSerializer
+
+
+# 快照中每名学生保存的字段（按列保存）
+SNAPSHOT_COLUMNS = [
+    'user_id', 'school_id', 'name', 'college_id', 'class_id', 'major', 'grade', 'ranking_dimension',
+    'gpa', 'academic_score', 'academic_expertise_score', 'comprehensive_performance_score',
+    'total_comprehensive_score', 'gpa_rank', 'score_rank', 'cohort_size',
+]
+
+# 数值字段保存为浮点数
+NUMERIC_COLUMNS = {
+    'gpa', 'academic_score', 'academic_expertise_score',
+    'comprehensive_performance_score', 'total_comprehensive_score',
+}
+
+# 解压后的列数据缓存时间（秒）；快照不可修改，不需要失效
+SNAPSHOT_CACHE_TIMEOUT = 3600
+# 学生人数超过此值的快照不缓存，限制单个缓存项的大小
+SNAPSHOT_CACHE_MAX_STUDENTS = 50000
+
+
+def encode_snapshot(rows):
+    """按列编码并压缩，返回 (压缩数据, 校验和)"""
+    columns = {column: [row[column] for row in rows] for column in SNAPSHOT_COLUMNS}
+    raw = json.dumps({'columns': columns}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(raw, 9), hashlib.sha256(raw).hexdigest()
+
+
+def decode_columns(payload):
+    """解压快照数据，返回 {列名: 值列表}"""
+    return json.loads(zlib.decompress(bytes(payload)))['columns']
+
+
+def decode_snapshot(payload):
+    """解压快照数据，返回按学生组织的记录列表"""
+    columns = decode_columns(payload)
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+
+
+def collect_snapshot_rows():
+    """读取当前全体学生的成绩及其本人排名维度下的排名"""
+    performances = (
+        AcademicPerformance.objects
+        .filter(user__user_type='student')
+        .values(
+            'id', 'user_id', 'user__school_id', 'user__name', 'user__college_id', 'user__clazz_id',
+            'user__major', 'user__grade',
+            'ranking_dimension', 'gpa', 'academic_score', 'academic_expertise_score',
+            'comprehensive_performance_score', 'total_comprehensive_score', 'gpa_ranking'
+        )
+        .order_by('user__school_id')
+    )
+    rankings = {
+        (row['performance_id'], row['dimension']): row
+        for row in PerformanceRanking.objects.values('performance_id', 'dimension', 'gpa_rank', 'score_rank', 'cohort_size')
+    }
+
+    rows = []
+    for performance in performances.iterator(chunk_size=2000):
+        ranking = rankings.get((performance['id'], resolve_dimension(performance['ranking_dimension'])), {})
+        row = {
+            'user_id': str(performance['user_id']),
+            'school_id': performance['user__school_id'],
+            'name': performance['user__name'],
+            'college_id': str(performance['user__college_id']) if performance['user__college_id'] else None,
+            'class_id': str(performance['user__clazz_id']) if performance['user__clazz_id'] else None,
+            'major': performance['user__major'],
+            'grade': performance['user__grade'],
+            'ranking_dimension': performance['ranking_dimension'],
+            'gpa_rank': ranking.get('gpa_rank', performance['gpa_ranking']),
+            'score_rank': ranking.get('score_rank'),
+            'cohort_size': ranking.get('cohort_size'),
+        }
+        for column in NUMERIC_COLUMNS:
+            row[column] = float(performance[column])
+        rows.append(row)
+    return rows
+
+
+def create_snapshot(label, description=None, created_by=None):
+    """冻结当前成绩，标签重复时抛出 IntegrityError"""
+    rows = collect_snapshot_rows()
+    payload, checksum = encode_snapshot(rows)
+    snapshot = ScoreSnapshot.objects.create(
+        label=label,
+        description=description,
+        student_count=len(rows),
+        payload=payload,
+        checksum=checksum,
+        created_by=created_by
+    )
+    return snapshot
+
+
+def get_snapshot_columns(snapshot):
+    """快照的列数据，先读缓存；缓存未命中时读取并解压快照数据"""
+    key = f'score:snapshot:{snapshot.id}:{snapshot.checksum}'
+    columns = cache.get(key)
+    if columns is None:
+        payload = ScoreSnapshot.objects.filter(id=snapshot.id).values_list('payload', flat=True).first()
+        columns = decode_columns(payload)
+        if snapshot.student_count <= SNAPSHOT_CACHE_MAX_STUDENTS:
+            cache.set(key, columns, SNAPSHOT_CACHE_TIMEOUT)
+    return columns
+
+
+def select_rows(columns, class_ids=None, filters=None):
+    """
+    满足条件的学生在各列中的下标；指定 class_ids 时只保留这些班级的学生
+    （早期快照没有保存班级，按班级筛选时不返回任何学生），filters 为 {列名: 值}
+    """
+    count = len(columns['user_id'])
+    indices = range(count)
+    if class_ids is not None:
+        class_column = columns.get('class_id') or [None] * count
+        indices = [index for index in indices if class_column[index] in class_ids]
+    for column, value in (filters or {}).items():
+        values = columns[column]
+        indices = [index for index in indices if values[index] == value]
+    return indices
+
+
+def build_rows(columns, indices):
+    """按下标构造学生记录"""
+    names = list(columns)
+    return [{name: columns[name][index] for name in names} for index in indices]
+
+
+def get_snapshot_rows(snapshot, class_ids=None):
+    """快照记录；指定 class_ids 时只返回这些班级的学生"""
+    columns = get_snapshot_columns(snapshot)
+    return build_rows(columns, select_rows(columns, class_ids))
+
+
+def diff_snapshots(base_columns, target_columns, class_ids=None):
+    """
+    返回排名或总分发生变化的学生，以及只出现在其中一个快照中的学生
+    直接比较两个快照的列数据，只为结果中的学生构造记录
+    """
+    base = {base_columns['user_id'][index]: index for index in select_rows(base_columns, class_ids)}
+    target = {target_columns['user_id'][index]: index for index in select_rows(target_columns, class_ids)}
+    base_rank, target_rank = base_columns['score_rank'], target_columns['score_rank']
+    base_total, target_total = base_columns['total_comprehensive_score'], target_columns['total_comprehensive_score']
+
+    def brief(columns, user_id, index):
+        return {'user_id': user_id, 'school_id': columns['school_id'][index], 'name': columns['name'][index]}
+
+    changed = []
+    for user_id, new in target.items():
+        old = base.get(user_id)
+        if old is None:
+            continue
+        if base_rank[old] == target_rank[new] and base_total[old] == target_total[new]:
+            continue
+        changed.append({
+            **brief(target_columns, user_id, new),
+            'base_rank': base_rank[old],
+            'target_rank': target_rank[new],
+            'rank_change': (
+                base_rank[old] - target_rank[new]
+                if base_rank[old] is not None and target_rank[new] is not None else None
+            ),
+            'base_total': base_total[old],
+            'target_total': target_total[new],
+            'total_change': round(target_total[new] - base_total[old], 4),
+        })
+    changed.sort(key=lambda item: (-abs(item['rank_change'] or 0), item['school_id'] or ''))
+
+    return {
+        'changed': changed,
+        'added': [brief(target_columns, user_id, index) for user_id, index in target.items() if user_id not in base],
+        'removed': [brief(base_columns, user_id, index) for user_id, index in base.items() if user_id not in target],
+    }
+
+
+class ScoreSnapshotViewSet(ViewSet):
+    """成绩快照相关接口"""
+    permission_classes = [IsAuthenticated]
+
+    def _check_permission(self, request, admin_only=False):
+        user = request.user
+        allowed = ['admin'] if admin_only else ['teacher', 'admin']
+        if not hasattr(user, 'user_type') or user.user_type not in allowed:
+            return Response(
+                {"error": "只有管理员可以创建成绩快照" if admin_only else "无权查看成绩快照"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return None
+
+    def _class_scope(self, request):
+        """教师管辖的班级ID集合；管理员不限制，返回 None"""
+        user = request.user
+        if user.user_type == 'teacher':
+            return {str(class_id) for class_id in user.class_bindings.values_list('class_obj_id', flat=True)}
+        return None
+
+    def list(self, request):
+        """快照列表"""
+        denied = self._check_permission(request)
+        if denied:
+            return denied
+        snapshots = ScoreSnapshot.objects.select_related('created_by').defer('payload')
+        return Response(ScoreSnapshotSerializer(snapshots, many=True).data)
+
+    def create(self, request):
+        """冻结当前全体学生的成绩和排名"""
+        denied = self._check_permission(request, admin_only=True)
+        if denied:
+            return denied
+
+        label = (request.data.get('label') or '').strip()
+        if not label:
+            return Response(
+                {"error": "请提供快照标签"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            snapshot = create_snapshot(label, request.data.get('description'), created_by=request.user)
+        except IntegrityError:
+            return Response(
+                {"error": "快照标签已存在"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            "success": True,
+            "message": f"已创建成绩快照，共{snapshot.student_count}名学生",
+            "data": ScoreSnapshotSerializer(snapshot).data
+        }, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, label=None):
+        """
+        快照详情及学生成绩（分页，教师只能看到管辖班级的学生）
+        参数：college、major、grade 筛选，page、page_size 分页
+        """
+        denied = self._check_permission(request)
+        if denied:
+            return denied
+        snapshot = ScoreSnapshot.objects.select_related('created_by').defer('payload').filter(label=label).first()
+        if snapshot is None:
+            return Response(
+                {"error": "成绩快照不存在"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        filters = {}
+        for field, column in (('college', 'college_id'), ('major', 'major'), ('grade', 'grade')):
+            value = request.query_params.get(field)
+            if value:
+                filters[column] = value
+
+        try:
+            page = max(1, int(request.query_params.get('page', 1)))
+            page_size = min(500, max(1, int(request.query_params.get('page_size', 50))))
+        except ValueError:
+            return Response(
+                {"error": "分页参数必须是整数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        columns = get_snapshot_columns(snapshot)
+        indices = select_rows(columns, self._class_scope(request), filters)
+        data = ScoreSnapshotSerializer(snapshot).data
+        data['count'] = len(indices)
+        data['page'] = page
+        data['page_size'] = page_size
+        data['results'] = build_rows(columns, indices[(page - 1) * page_size:page * page_size])
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def diff(self, request):
+        """对比两个快照：参数 base、target 为快照标签（教师只对比管辖班级的学生）"""
+        denied = self._check_permission(request)
+        if denied:
+            return denied
+
+        labels = [request.query_params.get('base'), request.query_params.get('target')]
+        if not all(labels):
+            return Response(
+                {"error": "请提供 base 和 target 快照标签"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        snapshots = {snapshot.label: snapshot for snapshot in ScoreSnapshot.objects.filter(label__in=labels).defer('payload')}
+        missing = [label for label in labels if label not in snapshots]
+        if missing:
+            return Response(
+                {"error": f"成绩快照不存在: {', '.join(missing)}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        result = diff_snapshots(
+            get_snapshot_columns(snapshots[labels[0]]),
+            get_snapshot_columns(snapshots[labels[1]]),
+            self._class_scope(request)
+        )
+        result['base'] = labels[0]
+        result['target'] = labels[1]
+        return Response(result)
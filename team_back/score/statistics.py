@@ -0,0 +1,133 @@
+"""
+成绩统计：排名分布、分位数、标准差都在数据库中计算，结果按教师范围和筛选条件缓存
+缓存键包含数据库中的统计版本号，任一进程（包括后台命令）使版本号加1后，所有工作进程的缓存立即失效
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Aggregate, Avg, Count, F, FloatField, IntegerField, Max, Min, StdDev
+from django.db.models.functions import Cast
+
+from .models import ScoreStatsGeneration
+
+
+# 排名分布默认的分段宽度
+DEFAULT_BUCKET_WIDTH = 10
+MAX_BUCKET_WIDTH = 1000
+
+# 统计结果缓存时间（秒）；成绩变化时通过版本号立即失效
+STATS_CACHE_TIMEOUT = 600
+# 统计版本号所在行的ID
+STATS_GENERATION_ID = 1
+
+# 统计的分位数
+PERCENTILES = {
+    'q1': 0.25,
+    'median': 0.5,
+    'q3': 0.75,
+    'p90': 0.9,
+}
+
+# 统计字段及其在结果中的后缀
+STAT_FIELDS = {
+    'gpa': 'gpa',
+    'total_comprehensive_score': 'total_score',
+}
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL 的 PERCENTILE_CONT(p) WITHIN GROUP (ORDER BY ...)"""
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def get_stats_generation():
+    return ScoreStatsGeneration.objects.filter(id=STATS_GENERATION_ID).values_list('generation', flat=True).first() or 0
+
+
+def invalidate_statistics():
+    """成绩或排名变化后调用，使所有统计缓存失效"""
+    if not ScoreStatsGeneration.objects.filter(id=STATS_GENERATION_ID).update(generation=F('generation') + 1):
+        ScoreStatsGeneration.objects.get_or_create(id=STATS_GENERATION_ID, defaults={'generation': 1})
+
+
+def make_stats_cache_key(scope, filters, bucket_width):
+    raw = '|'.join([str(scope), *(f'{key}={filters.get(key) or ""}' for key in sorted(filters)), str(bucket_width)])
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'score:stats:{get_stats_generation()}:{digest}'
+
+
+def _interpolated_percentiles(queryset, field, count):
+    """非 PostgreSQL 数据库：按排序后的偏移量取值并线性插值"""
+    result = {}
+    ordered = queryset.order_by(field).values_list(field, flat=True)
+    for name, percentile in PERCENTILES.items():
+        position = (count - 1) * percentile
+        lower = int(position)
+        values = [float(value) for value in ordered[lower:lower + 2]]
+        if len(values) == 1 or position == lower:
+            result[name] = values[0]
+        else:
+            result[name] = values[0] + (values[1] - values[0]) * (position - lower)
+    return result
+
+
+def ranking_distribution(queryset, bucket_width=DEFAULT_BUCKET_WIDTH):
+    """按排名分段计数，分段编号在数据库中计算：(gpa_ranking - 1) / 分段宽度；尚未排名（排名为0）的记录不计入"""
+    rows = (
+        queryset
+        .filter(gpa_ranking__gt=0)
+        .annotate(bucket=Cast((F('gpa_ranking') - 1) / bucket_width, IntegerField()))
+        .values('bucket')
+        .annotate(count=Count('id'))
+        .order_by('bucket')
+    )
+    distribution = {}
+    for row in rows:
+        start = row['bucket'] * bucket_width + 1
+        distribution[f"{start}-{start + bucket_width - 1}"] = row['count']
+    return distribution
+
+
+def compute_statistics(queryset, bucket_width=DEFAULT_BUCKET_WIDTH):
+    """计算平均值、最值、分位数、标准差和排名分布"""
+    aggregates = {
+        'avg_gpa': Avg('gpa'),
+        'max_gpa': Max('gpa'),
+        'min_gpa': Min('gpa'),
+        'avg_total_score': Avg('total_comprehensive_score'),
+        'total_students': Count('id'),
+    }
+    use_percentile_cont = connection.vendor == 'postgresql'
+    for field, suffix in STAT_FIELDS.items():
+        aggregates[f'stddev_{suffix}'] = StdDev(field)
+        if use_percentile_cont:
+            for name, percentile in PERCENTILES.items():
+                aggregates[f'{name}_{suffix}'] = PercentileCont(Cast(field, FloatField()), percentile)
+
+    stats = queryset.aggregate(**aggregates)
+    if not use_percentile_cont:
+        for field, suffix in STAT_FIELDS.items():
+            values = _interpolated_percentiles(queryset, field, stats['total_students']) if stats['total_students'] else {}
+            for name in PERCENTILES:
+                stats[f'{name}_{suffix}'] = values.get(name)
+
+    stats['bucket_width'] = bucket_width
+    stats['ranking_distribution'] = ranking_distribution(queryset, bucket_width)
+    return stats
+
+
+def get_cached_statistics(queryset, scope, filters, bucket_width=DEFAULT_BUCKET_WIDTH):
+    """按范围和筛选条件缓存统计结果"""
+    key = make_stats_cache_key(scope, filters, bucket_width)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_statistics(queryset, bucket_width)
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
@@ -1,3 +1,201 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import struct
+import tempfile
+import uuid
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from user.models import College, User
+from .leaderboard import LEADERBOARD_MAGIC, Leaderboard, build_leaderboard, get_leaderboard
+from .models import AcademicPerformance, PerformanceRanking, ScoreRecalcTask
+from .ranking import refresh_rankings, resolve_dimension
+
+
+# 测试学生：(学号, 姓名, 专业, 年级, 绩点, 综合成绩, 排名维度)，包含绩点和综合成绩并列的情况
+STUDENTS = [
+    ('s1', '张三', 'CS', '2022', '3.8', '90', '专业年级排名'),
+    ('s2', '李四', 'CS', '2022', '3.8', '85', 'major_grade'),
+    ('s3', '欧阳娜娜', 'CS', '2022', '3.5', '85', '专业排名'),
+    ('s4', 'Alice', 'CS', '2022', '3.2', '70', '年级排名'),
+    ('s5', '王五', 'SE', '2022', '3.9', '88', 'college'),
+    ('s6', '赵六', 'SE', '2022', '3.1', '60', '未知维度'),
+    ('s7', '孙七', 'CS', '2023', '3.0', '75', '专业年级排名'),
+    ('s8', '周八', 'CS', '2023', '3.0', '75', '专业年级排名'),
+]
+
+
+class LeaderboardTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.college = College.objects.create(name='信息学院')
+        cls.students = {}
+        for school_id, name, major, grade, gpa, total, ranking_dimension in STUDENTS:
+            student = User.objects.create_user(
+                school_id=school_id, name=name, college=cls.college, user_type='student',
+                major=major, grade=grade, password='x'
+            )
+            AcademicPerformance.objects.create(
+                user=student, gpa=Decimal(gpa), weighted_score=Decimal('80'), total_courses=30,
+                total_credits=Decimal('100'), gpa_ranking=0, ranking_dimension=ranking_dimension,
+                total_comprehensive_score=Decimal(total)
+            )
+            cls.students[school_id] = student
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'leaderboard.bin')
+        settings_override = override_settings(SCORE_LEADERBOARD_PATH=self.path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class LeaderboardFileTest(LeaderboardTestMixin, TestCase):
+    """排行榜文件与 refresh_rankings 计算的排名一致"""
+
+    def setUp(self):
+        super().setUp()
+        refresh_rankings()
+        self.assertEqual(build_leaderboard(), len(STUDENTS))
+        self.leaderboard = get_leaderboard()
+
+    def own_ranking(self, performance):
+        return performance.rankings.get(dimension=resolve_dimension(performance.ranking_dimension))
+
+    def test_header_and_sections(self):
+        with open(self.path, 'rb') as source:
+            content = source.read()
+        self.assertEqual(content[:8], LEADERBOARD_MAGIC)
+        index_length = struct.unpack('<Q', content[8:16])[0]
+        index = json.loads(content[16:16 + index_length])
+        self.assertEqual(index['count'], len(STUDENTS))
+        self.assertEqual((16 + index_length + (-index_length % 8)) % 8, 0)
+
+        cohort_sizes = {
+            f'{dimension}:{partition_key}': cohort_size
+            for dimension, partition_key, cohort_size in
+            PerformanceRanking.objects.values_list('dimension', 'partition_key', 'cohort_size')
+        }
+        self.assertEqual({key: partition['count'] for key, partition in index['partitions'].items()}, cohort_sizes)
+
+        user_ids = [uuid.UUID(self.leaderboard.entry_at(i)[0]).bytes for i in range(self.leaderboard.count)]
+        self.assertEqual(user_ids, sorted(user_ids))
+
+    def test_find_and_entries(self):
+        for performance in AcademicPerformance.objects.select_related('user'):
+            with self.subTest(school_id=performance.user.school_id):
+                ranking = self.own_ranking(performance)
+                self.assertEqual(self.leaderboard.get_entry(str(performance.user_id)), [
+                    str(performance.user_id),
+                    performance.user.name,
+                    performance.user.school_id,
+                    float(performance.gpa),
+                    float(performance.total_comprehensive_score),
+                    performance.ranking_dimension,
+                    f'{ranking.dimension}:{ranking.partition_key}',
+                ])
+        self.assertIsNone(self.leaderboard.find(uuid.uuid4()))
+        self.assertIsNone(self.leaderboard.find('not-a-uuid'))
+
+    def test_rank_of_matches_rankings(self):
+        for ranking in PerformanceRanking.objects.select_related('performance'):
+            performance = ranking.performance
+            key = f'{ranking.dimension}:{ranking.partition_key}'
+            with self.subTest(key=key, performance=performance.id):
+                self.assertEqual(
+                    self.leaderboard.rank_of(key, performance.gpa, 'gpa'), (ranking.gpa_rank, ranking.cohort_size)
+                )
+                self.assertEqual(
+                    self.leaderboard.rank_of(key, performance.total_comprehensive_score, 'total'),
+                    (ranking.score_rank, ranking.cohort_size)
+                )
+        self.assertEqual(self.leaderboard.rank_of('major_grade:CS|2022', 4.0), (1, 4))
+        self.assertEqual(self.leaderboard.rank_of('major_grade:CS|2022', 1.0), (5, 4))
+        self.assertEqual(self.leaderboard.rank_of('major_grade:EE|2022', 3.0), (1, 0))
+
+    def test_around_matches_rankings(self):
+        for performance in AcademicPerformance.objects.select_related('user'):
+            ranking = self.own_ranking(performance)
+            for order, rank_field in (('gpa', 'gpa_rank'), ('total', 'score_rank')):
+                with self.subTest(school_id=performance.user.school_id, order=order):
+                    result = self.leaderboard.around(performance.user_id, order=order, page_size=2)
+                    self.assertEqual(result['my_ranking'], getattr(ranking, rank_field))
+                    self.assertEqual(result['total_students'], ranking.cohort_size)
+                    self.assertIn(performance.user.school_id, [
+                        item['student_id'] for item in result['ranking_list'] if item['is_me']
+                    ])
+
+                    # 逐页读取整个分组，名次与 refresh_rankings 的结果一致
+                    expected = {
+                        row['performance__user__school_id']: row[rank_field]
+                        for row in PerformanceRanking.objects.filter(
+                            dimension=ranking.dimension, partition_key=ranking.partition_key
+                        ).values('performance__user__school_id', rank_field)
+                    }
+                    pages = (ranking.cohort_size + 1) // 2
+                    listed = [
+                        item
+                        for page in range(1, pages + 1)
+                        for item in self.leaderboard.around(performance.user_id, order, page, 2)['ranking_list']
+                    ]
+                    self.assertEqual({item['student_id']: item['rank'] for item in listed}, expected)
+                    self.assertEqual(len(listed), len(expected))
+                    self.assertEqual([item['rank'] for item in listed], sorted(item['rank'] for item in listed))
+
+    def test_ties_share_rank(self):
+        result = self.leaderboard.around(self.students['s2'].id, order='gpa')
+        ranks = {item['student_id']: item['rank'] for item in result['ranking_list']}
+        self.assertEqual((ranks['s1'], ranks['s2'], ranks['s3'], ranks['s4']), (1, 1, 3, 4))
+        self.assertEqual(result['my_ranking'], 1)
+
+        result = self.leaderboard.around(self.students['s8'].id, order='total')
+        self.assertEqual([item['rank'] for item in result['ranking_list']], [1, 1])
+
+
+class EmptyLeaderboardTest(TestCase):
+    """没有学生成绩时生成空排行榜"""
+
+    def test_empty_cohort(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'leaderboard.bin')
+        self.assertEqual(build_leaderboard(path), 0)
+
+        leaderboard = Leaderboard(path)
+        self.assertEqual((leaderboard.count, leaderboard.partitions), (0, {}))
+        self.assertIsNone(leaderboard.find(uuid.uuid4()))
+        self.assertIsNone(leaderboard.around(uuid.uuid4()))
+        self.assertEqual(leaderboard.rank_of('major_grade:CS|2022', 3.0), (1, 0))
+
+
+class RankingViewTest(LeaderboardTestMixin, TestCase):
+    """排名接口读取排行榜文件"""
+
+    def get_ranking(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/score/student-performance/ranking/', params)
+
+    def test_returns_page_from_leaderboard(self):
+        refresh_rankings()
+        build_leaderboard()
+        # s4 按年级排名：2022级综合成绩第5名，每页2人时在第3页
+        response = self.get_ranking(self.students['s4'], order='total', page_size=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['my_ranking'], response.json()['page']), (5, 3))
+
+    def test_missing_file_returns_503_and_marks_student_dirty(self):
+        ScoreRecalcTask.objects.all().delete()
+        student = self.students['s1']
+        response = self.get_ranking(student)
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(ScoreRecalcTask.objects.filter(user=student).exists())
+
+        other = User.objects.create_user(
+            school_id='s9', name='没有成绩', college=self.college, user_type='student', password='x'
+        )
+        self.assertEqual(self.get_ranking(other).status_code, 404)
@@ -0,0 +1,101 @@
+"""
+成绩一致性校验：按批比较学生当前已审核通过申请的校验和与计算成绩时保存的校验和，
+只重新计算不一致的学生，并把检查结果写入运行指标
+仍在重算队列中的学生（增量重算尚未完成）不计为不一致，留给队列处理
+"""
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from user.models import User
+from . import metrics
+from .calculation import collect_bonus_sources, format_checksum, recalculate_scores
+from .leaderboard import build_leaderboard
+from .models import AcademicPerformance, ScoreRecalcTask
+from .ranking import refresh_rankings
+
+
+# 每批校验的学生数
+VERIFY_BATCH_SIZE = 500
+
+
+def find_drifted_students(user_ids):
+    """
+    返回 (不一致的学生ID, 在重算队列中而跳过的学生ID)
+    不一致包括从未计算过校验和的学生
+    """
+    pending = set(ScoreRecalcTask.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    user_ids = [user_id for user_id in user_ids if user_id not in pending]
+    if not user_ids:
+        return [], pending
+    stored = dict(
+        AcademicPerformance.objects.filter(user_id__in=user_ids).values_list('user_id', 'source_checksum')
+    )
+    _, _, checksums = collect_bonus_sources(User.objects.filter(id__in=user_ids))
+    drifted = [
+        user_id for user_id in user_ids
+        if stored.get(user_id) != format_checksum(checksums.get(user_id, 0))
+    ]
+    return drifted, pending
+
+
+def verify_scores(batch_size=VERIFY_BATCH_SIZE, repair=True):
+    """
+    按学生ID顺序分批校验全部学生的成绩
+    repair 为 True 时重新计算不一致的学生，并刷新其所在分组的排名
+    返回 {'checked': 校验人数, 'pending': 在重算队列中而跳过的人数, 'drifted': 不一致人数, 'repaired': 重新计算人数}
+    """
+    result = {'checked': 0, 'pending': 0, 'drifted': 0, 'repaired': 0}
+    drifted_ids = []
+    last_id = None
+    while True:
+        students = User.objects.filter(user_type='student').order_by('id')
+        if last_id is not None:
+            students = students.filter(id__gt=last_id)
+        user_ids = list(students.values_list('id', flat=True)[:batch_size])
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+
+        drifted, pending = find_drifted_students(user_ids)
+        result['checked'] += len(user_ids) - len(pending)
+        result['pending'] += len(pending)
+        result['drifted'] += len(drifted)
+        if drifted and repair:
+            recalculate_scores(User.objects.filter(id__in=drifted), refresh_ranks=False)
+            result['repaired'] += len(drifted)
+        drifted_ids.extend(drifted)
+
+    if result['repaired']:
+        refresh_rankings(students=User.objects.filter(id__in=drifted_ids))
+        build_leaderboard()
+
+    metrics.increment('drift.runs')
+    metrics.increment('drift.checked', result['checked'])
+    metrics.increment('drift.detected', result['drifted'])
+    metrics.increment('drift.repaired', result['repaired'])
+    metrics.set_value('drift.last_pending', result['pending'])
+    metrics.set_value('drift.last_drifted', result['drifted'])
+    metrics.record_time('drift.last_run_at')
+    return result
+
+
+class ScoreMetricsViewSet(ViewSet):
+    """成绩子系统运行指标接口"""
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """查看运行指标（管理员）"""
+        user = request.user
+        if not hasattr(user, 'user_type') or user.user_type != 'admin':
+            return Response(
+                {"error": "只有管理员可以查看运行指标"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        data = metrics.get_metrics()
+        data['recalc.pending'] = ScoreRecalcTask.objects.count()
+        return Response(data)
@@ -1,17 +1,21 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Avg, Max, Min, Count, Q
 from django.shortcuts import get_object_or_404
+from .incremental import mark_students_dirty
+from .leaderboard import LEADERBOARD_ORDERS, get_leaderboard
 from .models import AcademicPerformance
+from .simulation import MAX_SIMULATED_APPLICATIONS, simulate_scores
+from .statistics import DEFAULT_BUCKET_WIDTH, MAX_BUCKET_WIDTH, get_cached_statistics
 from .serializers import (
     AcademicPerformanceDetailSerializer,
     AcademicPerformanceListSerializer,
     PerformanceStatsSerializer
 )
 from user.models import User
+from xmuhelper.pagination import CountStrategyPagination, InvalidCursor, paginate_keyset, use_cursor
 
 
 class StudentPerformanceViewSet(viewsets.ViewSet):
@@ -94,7 +98,7 @@ class StudentPerformanceViewSet(viewsets.ViewSet):
         ranking_dimension = request.query_params.get('ranking_dimension')
 
         # 构建查询条件
-        queryset = AcademicPerformance.objects.filter(user__user_type='student')
+        queryset = AcademicPerformance.objects.filter(user__user_type='student').select_related('user__college')
 
         # 权限控制：
         # 管理员可以看到所有学生成绩
@@ -131,10 +135,28 @@ class StudentPerformanceViewSet(viewsets.ViewSet):
         if sort_order == 'desc':
             sort_by = f'-{sort_by}'
 
+        # 游标分页（cursor 参数或 pagination=cursor）：按 (排序字段, id) 翻页，不统计总数
+        if use_cursor(request):
+            try:
+                page, next_cursor = paginate_keyset(
+                    queryset,
+                    sort_by,
+                    cursor=request.query_params.get('cursor'),
+                    page_size=request.query_params.get('page_size', 20)
+                )
+            except InvalidCursor as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except ValueError:
+                return Response({"error": "分页参数必须是整数"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                'next_cursor': next_cursor,
+                'results': AcademicPerformanceListSerializer(page, many=True).data
+            })
+
         queryset = queryset.order_by(sort_by)
 
-        # 分页 - 使用 DRF 的分页器
-        paginator = PageNumberPagination()
+        # 分页 - 使用 DRF 的分页器；总数按查询条件缓存，范围很大时使用估算值（count_exact 标明）
+        paginator = CountStrategyPagination()
         paginator.page_size = request.query_params.get('page_size', 20)  # 默认20条
 
         page = paginator.paginate_queryset(queryset, request)
@@ -149,7 +171,10 @@ class StudentPerformanceViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """获取成绩统计信息（教师/管理员）"""
+        """
+        获取成绩统计信息（教师/管理员）
+        参数：college、major、grade 筛选，bucket_width 排名分布的分段宽度（默认10）
+        """
         user = request.user
 
         # 权限检查
@@ -164,17 +189,28 @@ class StudentPerformanceViewSet(viewsets.ViewSet):
         major = request.query_params.get('major')
         grade = request.query_params.get('grade')
 
+        try:
+            bucket_width = int(request.query_params.get('bucket_width', DEFAULT_BUCKET_WIDTH))
+        except ValueError:
+            return Response(
+                {"error": "分段宽度必须是整数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        bucket_width = min(MAX_BUCKET_WIDTH, max(1, bucket_width))
+
         # 构建查询条件
         queryset = AcademicPerformance.objects.filter(user__user_type='student')
 
         # 权限控制：
         # 管理员可以看到所有学生成绩统计
         # 教师只能看到自己管辖班级的学生成绩统计
+        scope = 'admin'
         if user.user_type == 'teacher':
             # 获取教师管辖的所有班级
-            teacher_classes = user.class_bindings.values_list('class_obj_id', flat=True)
+            teacher_classes = sorted(str(class_id) for class_id in user.class_bindings.values_list('class_obj_id', flat=True))
             # 过滤出学生所在班级在教师管辖班级列表中的成绩统计
             queryset = queryset.filter(user__clazz_id__in=teacher_classes)
+            scope = 'teacher:' + ','.join(teacher_classes)
 
         if college:
             queryset = queryset.filter(user__college=college)
@@ -183,29 +219,20 @@ class StudentPerformanceViewSet(viewsets.ViewSet):
         if grade:
             queryset = queryset.filter(user__grade=grade)
 
-        # 计算统计信息
-        stats = queryset.aggregate(
-            avg_gpa=Avg('gpa'),
-            max_gpa=Max('gpa'),
-            min_gpa=Min('gpa'),
-            avg_total_score=Avg('total_comprehensive_score'),
-            total_students=Count('id')
-        )
-
-        # 排名分布
-        ranking_distribution = {}
-        for performance in queryset:
-            rank_range = f"{(performance.gpa_ranking - 1) // 10 * 10 + 1}-{(performance.gpa_ranking - 1) // 10 * 10 + 10}"
-            ranking_distribution[rank_range] = ranking_distribution.get(rank_range, 0) + 1
-
-        stats['ranking_distribution'] = ranking_distribution
+        # 计算统计信息（排名分布、分位数均在数据库中计算，结果按范围和筛选条件缓存）
+        filters = {'college': college, 'major': major, 'grade': grade}
+        stats = get_cached_statistics(queryset, scope, filters, bucket_width)
 
         serializer = PerformanceStatsSerializer(stats)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def ranking(self, request):
-        """获取排名信息"""
+        """
+        获取排名信息
+        从共享的排行榜文件中二分查找名次，默认返回本人所在的一页
+        参数：order（gpa/total，默认gpa）、page（不传时定位到本人所在页）、page_size（默认20，最大100）
+        """
         user = request.user
 
         if not hasattr(user, 'user_type') or user.user_type != 'student':
@@ -214,39 +241,80 @@ class StudentPerformanceViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        order = request.query_params.get('order', 'gpa')
+        if order not in LEADERBOARD_ORDERS:
+            return Response(
+                {"error": "排序方式只能是 gpa 或 total"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         try:
-            my_performance = AcademicPerformance.objects.get(user=user)
-
-            # 获取同维度下的所有排名
-            same_dimension_performances = AcademicPerformance.objects.filter(
-                ranking_dimension=my_performance.ranking_dimension
-            ).order_by('gpa_ranking')
-
-            # 构建排名列表
-            ranking_list = []
-            for idx, performance in enumerate(same_dimension_performances, 1):
-                ranking_list.append({
-                    'rank': idx,
-                    'student_name': performance.user.name,
-                    'student_id': performance.user.school_id,
-                    'gpa': float(performance.gpa),
-                    'total_score': float(performance.total_comprehensive_score),
-                    'is_me': performance.user == user
-                })
+            page = request.query_params.get('page')
+            page = max(1, int(page)) if page else None
+            page_size = min(100, max(1, int(request.query_params.get('page_size', 20))))
+        except ValueError:
+            return Response(
+                {"error": "分页参数必须是整数"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            return Response({
-                'my_ranking': my_performance.gpa_ranking,
-                'ranking_dimension': my_performance.ranking_dimension,
-                'total_students': len(ranking_list),
-                'ranking_list': ranking_list
-            })
+        leaderboard = get_leaderboard()
+        result = leaderboard.around(user.id, order=order, page=page, page_size=page_size) if leaderboard else None
+        if result is None:
+            if not AcademicPerformance.objects.filter(user=user).exists():
+                return Response(
+                    {"error": "未找到学业成绩记录"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            # 排行榜尚未生成，或成绩记录在排行榜生成之后才创建：交给重算队列，队列处理完后会重新生成排行榜
+            mark_students_dirty([user.id])
+            return Response(
+                {"error": "排名正在更新，请稍后再试"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
 
+        return Response(result)
+
+    @action(detail=False, methods=['post'])
+    def simulate(self, request):
+        """
+        模拟加分：提交若干假设申请，返回预测的总分和排名（不保存任何申请）
+        请求体：{"applications": [{"application_type": "academic_paper", ...申请字段}]}
+        """
+        user = request.user
+
+        if not hasattr(user, 'user_type') or user.user_type != 'student':
+            return Response(
+                {"error": "只有学生可以模拟加分"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        applications = request.data.get('applications')
+        if not isinstance(applications, list) or not applications:
+            return Response(
+                {"error": "请提供假设申请列表"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(applications) > MAX_SIMULATED_APPLICATIONS:
+            return Response(
+                {"error": f"一次最多模拟{MAX_SIMULATED_APPLICATIONS}项申请"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(item, dict) for item in applications):
+            return Response(
+                {"error": "申请格式错误"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            performance = AcademicPerformance.objects.get(user=user)
         except AcademicPerformance.DoesNotExist:
             return Response(
                 {"error": "未找到学业成绩记录"},
                 status=status.HTTP_404_NOT_FOUND
             )
-    
+
+        return Response(simulate_scores(user, performance, applications))
+
     @action(detail=False, methods=['get'], url_path='student/score-items')
     def score_items(self, request):
         """获取学生加分项目列表，整合material应用中的所有加分项目"""
@@ -147,89 +147,37 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined', 'last_login', 'is_student',
                            'is_teacher', 'is_admin', 'college_name', 'class_name', 'class_id', 'total_score', 'bonus_score']
     
+    def _get_bonus_subtotals(self, obj):
+        """
+        获取学生的加分小计 (学术专长, 综合表现)
+        优先使用查询集中 annotate_bonus_subtotals 添加的列；没有时单独查询一次并缓存在对象上
+        """
+        if not hasattr(obj, 'expertise_subtotal'):
+            from score.calculation import annotate_bonus_subtotals
+            obj.expertise_subtotal, obj.comprehensive_subtotal = (
+                annotate_bonus_subtotals(User.objects.filter(pk=obj.pk))
+                .values_list('expertise_subtotal', 'comprehensive_subtotal')
+                .first() or (0, 0)
+            )
+        return float(obj.expertise_subtotal or 0), float(obj.comprehensive_subtotal or 0)
+
     def get_bonus_score(self, obj):
         """计算学生加分成绩：学术专长成绩（15分）+综合表现成绩（5分）"""
         if obj.user_type != 'student':
             return 0.0
-        
-        # 计算加分成绩（20分）：学术专长成绩（15分）+综合表现成绩（5分）
-        bonus_score = 0.0
-        
-        try:
-            # 学术专长类申请：英语成绩、学术论文、专利作品、学术竞赛、创新项目、CCF CSP认证
-            from material.models import (
-                EnglishScore, AcademicPaper, PatentWork, AcademicCompetition,
-                InnovationProject, CCFCSPCertification, InternationalInternship,
-                MilitaryService, VolunteerService, HonoraryTitle, SocialWork, SportsCompetition
-            )
-            
-            # 计算学术专长成绩（15分）
-            academic_expertise_score = 0.0
-            expertise_models = [
-                EnglishScore, AcademicPaper, PatentWork, AcademicCompetition,
-                InnovationProject, CCFCSPCertification
-            ]
-            
-            for model in expertise_models:
-                # 获取已批准的申请
-                applications = model.objects.filter(user=obj, review_status='approved')
-                for app in applications:
-                    # 直接使用bonus_points字段，而不是重新计算
-                    try:
-                        score = float(app.bonus_points)
-                        academic_expertise_score += score
-                    except Exception as e:
-                        print(f"计算学术专长加分失败 for {app}: {e}")
-            
-            # 学术专长成绩最高15分
-            academic_expertise_score = min(15.0, academic_expertise_score)
-            
-            # 计算综合表现成绩（5分）
-            comprehensive_performance_score = 0.0
-            comprehensive_models = [
-                InternationalInternship, MilitaryService, VolunteerService,
-                HonoraryTitle, SocialWork, SportsCompetition
-            ]
-            
-            for model in comprehensive_models:
-                # 获取已批准的申请
-                applications = model.objects.filter(user=obj, review_status='approved')
-                for app in applications:
-                    # 直接使用bonus_points字段，而不是重新计算
-                    try:
-                        score = float(app.bonus_points)
-                        comprehensive_performance_score += score
-                    except Exception as e:
-                        print(f"计算综合表现加分失败 for {app}: {e}")
-            
-            # 综合表现成绩最高5分
-            comprehensive_performance_score = min(5.0, comprehensive_performance_score)
-            
-            # 计算总分加分
-            bonus_score = academic_expertise_score + comprehensive_performance_score
-        except Exception as e:
-            print(f"计算加分失败 for user {obj}: {e}")
-            # 如果所有方法都失败，使用默认值0
-            bonus_score = 0.0
-        
+
+        from score.calculation import COMPREHENSIVE_SCORE_MAX, EXPERTISE_SCORE_MAX
+        expertise_points, comprehensive_points = self._get_bonus_subtotals(obj)
+        # 学术专长成绩最高15分，综合表现成绩最高5分
+        bonus_score = min(EXPERTISE_SCORE_MAX, expertise_points) + min(COMPREHENSIVE_SCORE_MAX, comprehensive_points)
         return round(bonus_score, 2)
     
     def get_total_score(self, obj):
         """计算学生总分：学业成绩（80分）+加分成绩（20分）"""
         if obj.user_type != 'student':
             return 0
-        
-        # 计算学业成绩（80分）：由绩点转化，满绩点4.0对应80分
-        gpa = getattr(obj, 'gpa', 0.0) or 0.0
-        academic_score = (float(gpa) / 4.0) * 80.0
-        academic_score = min(80.0, max(0.0, academic_score))
-        
-        # 使用get_bonus_score方法获取加分成绩
-        bonus_score = self.get_bonus_score(obj)
-        
-        # 总分 = 学业成绩 + 加分成绩
-        total_score = academic_score + bonus_score
-        # 总分最高100分
-        return round(total_score, 2)
-
 
+        from score.calculation import combine_scores
+        expertise_points, comprehensive_points = self._get_bonus_subtotals(obj)
+        scores = combine_scores(getattr(obj, 'gpa', 0.0), expertise_points, comprehensive_points)
+        return round(scores['total_comprehensive_score'], 2)
@@ -7,10 +7,15 @@ from rest_framework.permissions import IsAuthenticated
 from .serializers import LoginSerializer, UserSerializer
 from django.contrib.auth import get_user_model
 from django.db import models
+from score.calculation import annotate_bonus_subtotals
 from .models import College, Class, ClassBinding
+from xmuhelper.pagination import InvalidCursor, get_count, paginate_keyset, use_cursor
 
 User = get_user_model()
 
+# 用户列表游标分页的排序字段（学号唯一且有索引）
+USER_CURSOR_ORDERING = 'school_id'
+
 class LoginView(APIView):
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -116,57 +121,24 @@ class AdminStatisticsView(APIView):
             }, status=status.HTTP_403_FORBIDDEN)
         
         try:
-            # 导入所有申请模型
-            from material.models import (
-                EnglishScore,
-                AcademicPaper,
-                PatentWork,
-                AcademicCompetition,
-                InnovationProject,
-                CCFCSPCertification,
-                InternationalInternship,
-                MilitaryService,
-                VolunteerService,
-                HonoraryTitle,
-                SocialWork,
-                SportsCompetition
+            from material.stats import count_all_types, get_status_counts
+
+            # 统计学生、教师和管理员数量（一次查询）
+            user_counts = User.objects.aggregate(
+                students=models.Count('id', filter=models.Q(user_type='student')),
+                teachers=models.Count('id', filter=models.Q(user_type='teacher')),
+                admins=models.Count('id', filter=models.Q(user_type='admin'))
             )
-            
-            # 统计学生、教师和管理员数量
-            total_students = User.objects.filter(user_type='student').count()
-            total_teachers = User.objects.filter(user_type='teacher').count()
-            total_admins = User.objects.filter(user_type='admin').count()
-            
-            # 统计待审批和已审批申请数量
-            pending_applications = 0
-            approved_applications = 0
-            
-            # 统计所有申请状态
-            for model in [
-                EnglishScore,
-                AcademicPaper,
-                PatentWork,
-                AcademicCompetition,
-                InnovationProject,
-                CCFCSPCertification,
-                InternationalInternship,
-                MilitaryService,
-                VolunteerService,
-                HonoraryTitle,
-                SocialWork,
-                SportsCompetition
-            ]:
-                # 待审批状态包括：pending（待一审）、first_reviewing（一审中）、second_reviewing（二审中）
-                pending_count = model.objects.filter(
-                    review_status__in=['pending', 'first_reviewing', 'second_reviewing']
-                ).count()
-                pending_applications += pending_count
-                
-                # 已审批状态包括：first_approved（一审通过）、approved（审核通过）、first_rejected（一审不通过）、rejected（审核不通过）
-                approved_count = model.objects.filter(
-                    review_status__in=['first_approved', 'approved', 'first_rejected', 'rejected']
-                ).count()
-                approved_applications += approved_count
+            total_students = user_counts['students']
+            total_teachers = user_counts['teachers']
+            total_admins = user_counts['admins']
+
+            # 统计所有申请状态（一次查询）
+            counts = get_status_counts()
+            # 待审批状态包括：pending（待一审）、first_reviewing（一审中）、second_reviewing（二审中）
+            pending_applications = count_all_types(counts, ['pending', 'first_reviewing', 'second_reviewing'])
+            # 已审批状态包括：first_approved（一审通过）、approved（审核通过）、first_rejected（一审不通过）、rejected（审核不通过）
+            approved_applications = count_all_types(counts, ['first_approved', 'approved', 'first_rejected', 'rejected'])
             
             # 构建符合前端期望格式的统计数据
             statistics = {
@@ -308,7 +280,10 @@ class ClassManagementView(APIView):
                 path = request.path
                 if path.endswith('/students/'):
                     # 获取班级学生
-                    students = User.objects.filter(clazz=cls, user_type='student')
+                    # 加分小计以子查询列的形式一并查出，避免逐个学生查询
+                    students = annotate_bonus_subtotals(
+                        User.objects.filter(clazz=cls, user_type='student').select_related('college', 'clazz')
+                    )
                     # 使用UserSerializer序列化学生数据，确保获取正确的综测成绩
                     from .serializers import UserSerializer
                     serializer = UserSerializer(students, many=True)
@@ -566,9 +541,17 @@ class StudentManagementView(APIView):
                     models.Q(college__name__icontains=search)
                 )
             
-            # 分页
-            total = query.count()
-            students = query[(page-1)*page_size:page*page_size]
+            # 游标分页：按学号翻页，不统计总数
+            cursor_mode = use_cursor(request)
+            if cursor_mode:
+                students, next_cursor = paginate_keyset(
+                    query.select_related('college', 'clazz'), USER_CURSOR_ORDERING,
+                    cursor=request.GET.get('cursor'), page_size=page_size
+                )
+            else:
+                # 分页：总数按查询条件缓存，未搜索且范围很大时使用估算值
+                total, count_exact = get_count(query, allow_estimate=not search)
+                students = query.select_related('college', 'clazz')[(page-1)*page_size:page*page_size]
             
             # 构建响应数据
             student_list = [{
@@ -593,16 +576,29 @@ class StudentManagementView(APIView):
                 'created_at': student.date_joined.strftime('%Y-%m-%d %H:%M:%S')
             } for student in students]
             
-            return Response({
-                'code': 200,
-                'message': 'success',
-                'data': {
+            if cursor_mode:
+                data = {
+                    'results': student_list,
+                    'next_cursor': next_cursor,
+                    'page_size': page_size
+                }
+            else:
+                data = {
                     'results': student_list,
                     'count': total,
+                    'count_exact': count_exact,
                     'page': page,
                     'page_size': page_size
                 }
+            return Response({
+                'code': 200,
+                'message': 'success',
+                'data': data
             }, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 "error": f"获取学生列表失败: {str(e)}"
@@ -636,9 +632,17 @@ class TeacherManagementView(APIView):
                     models.Q(college__name__icontains=search)
                 )
             
-            # 分页
-            total = query.count()
-            teachers = query[(page-1)*page_size:page*page_size]
+            # 游标分页：按工号翻页，不统计总数
+            cursor_mode = use_cursor(request)
+            if cursor_mode:
+                teachers, next_cursor = paginate_keyset(
+                    query.select_related('college'), USER_CURSOR_ORDERING,
+                    cursor=request.GET.get('cursor'), page_size=page_size
+                )
+            else:
+                # 分页：总数按查询条件缓存，未搜索且范围很大时使用估算值
+                total, count_exact = get_count(query, allow_estimate=not search)
+                teachers = query.select_related('college')[(page-1)*page_size:page*page_size]
             
             # 构建响应数据
             teacher_list = [{
@@ -655,16 +659,29 @@ class TeacherManagementView(APIView):
                 'created_at': teacher.date_joined.strftime('%Y-%m-%d %H:%M:%S')
             } for teacher in teachers]
             
-            return Response({
-                'code': 200,
-                'message': 'success',
-                'data': {
+            if cursor_mode:
+                data = {
+                    'results': teacher_list,
+                    'next_cursor': next_cursor,
+                    'page_size': page_size
+                }
+            else:
+                data = {
                     'results': teacher_list,
                     'count': total,
+                    'count_exact': count_exact,
                     'page': page,
                     'page_size': page_size
                 }
+            return Response({
+                'code': 200,
+                'message': 'success',
+                'data': data
             }, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 "error": f"获取教师列表失败: {str(e)}"
@@ -703,25 +720,46 @@ class AdminUserListView(APIView):
                     models.Q(college__name__icontains=search)
                 )
             
-            # 分页
-            total = query.count()
-            users = query[(page-1)*page_size:page*page_size]
+            # 游标分页：按学号翻页，不统计总数
+            cursor_mode = use_cursor(request)
+            query = annotate_bonus_subtotals(query.select_related('college', 'clazz'))
+            if cursor_mode:
+                users, next_cursor = paginate_keyset(
+                    query, USER_CURSOR_ORDERING, cursor=request.GET.get('cursor'), page_size=page_size
+                )
+            else:
+                # 分页：总数按查询条件缓存，未搜索且范围很大时使用估算值
+                total, count_exact = get_count(query, allow_estimate=not search)
+                users = query[(page-1)*page_size:page*page_size]
             
             # 使用UserSerializer序列化数据
             serializer = UserSerializer(users, many=True)
             user_list = serializer.data
             
             # 处理分页响应
-            return Response({
-                'code': 200,
-                'message': 'success',
-                'data': {
+            if cursor_mode:
+                data = {
+                    'results': user_list,
+                    'next_cursor': next_cursor,
+                    'page_size': page_size
+                }
+            else:
+                data = {
                     'results': user_list,
                     'count': total,
+                    'count_exact': count_exact,
                     'page': page,
                     'page_size': page_size
                 }
+            return Response({
+                'code': 200,
+                'message': 'success',
+                'data': data
             }, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 "error": f"获取用户列表失败: {str(e)}"
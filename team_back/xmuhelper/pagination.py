@@ -0,0 +1,207 @@
+"""
+列表分页工具
+
+键集（游标）分页：按 (排序字段, id) 定位下一页，不使用 OFFSET，也不统计总数
+翻到第500页与第1页的代价相同；游标对客户端不透明（base64编码的排序方式和上一页最后一条记录的排序键）
+排序字段为空的记录排在最后
+
+总数统计：精确总数按查询条件缓存一小段时间；范围很大的查询使用数据库执行计划的估算行数，
+响应中用 count_exact 标明总数是否精确；使用估算值时页码不受估算的总页数限制
+"""
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+import uuid
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import F
+from django.db.models.fields.tuple_lookups import Tuple, TupleGreaterThan, TupleLessThan
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+
+MAX_CURSOR_PAGE_SIZE = 500
+
+# 精确总数的缓存时间（秒）
+COUNT_CACHE_TIMEOUT = 60
+COUNT_CACHE_PREFIX = 'pagination:count:'
+
+# 执行计划估算行数达到该值时直接使用估算值
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析，或与当前排序方式不一致"""
+
+
+def use_cursor(request):
+    """请求是否使用游标分页：携带 cursor 参数，或 pagination=cursor（第一页）"""
+    params = request.query_params if hasattr(request, 'query_params') else request.GET
+    return 'cursor' in params or params.get('pagination') == 'cursor'
+
+
+def _to_json(value):
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(ordering, value, pk):
+    """生成游标"""
+    raw = json.dumps({'o': ordering, 'v': _to_json(value), 'id': _to_json(pk)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """解析游标，返回 (排序键, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value, pk = data['v'], data['id']
+        cursor_ordering = data['o']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor('无效的分页游标')
+    if cursor_ordering != ordering:
+        raise InvalidCursor('分页游标与当前排序方式不一致')
+    return value, pk
+
+
+def paginate_keyset(queryset, ordering, cursor=None, page_size=20):
+    """
+    按 ordering（单个字段，'-' 前缀表示降序；id 作为第二排序键，方向相同）取一页
+    返回 (当前页记录列表, 下一页游标)，没有下一页时游标为 None
+    游标之后的非空部分用行值比较 (字段, id) > (v, pk) 定位，可以走 (字段, id) 索引的一次范围扫描；
+    排序字段为空的部分单独查询，只在非空部分不足一页时才查
+    """
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+    page_size = max(1, min(int(page_size), MAX_CURSOR_PAGE_SIZE))
+    limit = page_size + 1
+
+    queryset = queryset.annotate(keyset_value=F(field))
+    if descending:
+        queryset = queryset.order_by(F(field).desc(nulls_last=True), '-id')
+    else:
+        queryset = queryset.order_by(F(field).asc(nulls_last=True), 'id')
+    null_segment = queryset.filter(**{f'{field}__isnull': True})
+
+    if not cursor:
+        rows = list(queryset[:limit])
+    else:
+        value, pk = decode_cursor(cursor, ordering)
+        after = 'lt' if descending else 'gt'
+        if value is None:
+            # 已进入排序字段为空的部分，只按 id 继续
+            rows = list(null_segment.filter(**{f'id__{after}': pk})[:limit])
+        else:
+            row_after = (TupleLessThan if descending else TupleGreaterThan)(Tuple(F(field), F('id')), (value, pk))
+            rows = list(queryset.filter(row_after)[:limit])
+            if len(rows) < limit:
+                rows += list(null_segment[:limit - len(rows)])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(ordering, last.keyset_value, last.pk)
+    return rows, next_cursor
+
+
+def estimate_count(queryset):
+    """数据库执行计划估算的行数（仅 PostgreSQL），无法估算时返回 None"""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().values('pk').explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_cache_key(queryset):
+    """按查询语句和参数生成总数缓存键，不同查询条件互不影响"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.md5(repr((queryset.db, sql, params)).encode('utf-8')).hexdigest()
+    return f'{COUNT_CACHE_PREFIX}{digest}'
+
+
+def get_count(queryset, allow_estimate=True):
+    """
+    返回 (总数, 是否精确)
+    依次使用：缓存的精确总数 -> 估算行数（allow_estimate 且估算值足够大时）-> COUNT(*) 并缓存
+    """
+    key = count_cache_key(queryset)
+    total = cache.get(key)
+    if total is not None:
+        return total, True
+    if allow_estimate:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return estimate, False
+    total = queryset.count()
+    cache.set(key, total, COUNT_CACHE_TIMEOUT)
+    return total, True
+
+
+class CountStrategyPage(Page):
+    """总数为估算值时，是否有下一页由多取的一条记录决定"""
+    has_more = None
+
+    def has_next(self):
+        if self.has_more is not None:
+            return self.has_more
+        return super().has_next()
+
+
+class CountStrategyPaginator(Paginator):
+    """
+    使用 get_count 统计总数的分页器
+    总数为估算值时不按估算的总页数拒绝页码，取 page_size + 1 条记录判断是否有下一页
+    """
+    allow_estimate = True
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        total, self.count_exact = get_count(self.object_list, allow_estimate=self.allow_estimate)
+        return total
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # 页码小于1时总是无效；只有超出估算的总页数时才放行
+            if self.count_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_exact:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('该页没有数据')
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return CountStrategyPage(*args, **kwargs)
+
+
+class CountStrategyPagination(PageNumberPagination):
+    """页码分页，总数可能为估算值（响应中的 count_exact 标明）"""
+    django_paginator_class = CountStrategyPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_exact'] = self.page.paginator.count_exact
+        return response
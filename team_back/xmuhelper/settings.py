@@ -167,6 +167,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'if-none-match',  # 加分规则文档的条件请求
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -175,6 +176,9 @@ CORS_ALLOW_HEADERS = [
 
 CORS_ALLOW_CREDENTIALS = True  # 允许携带凭证
 
+# 允许前端读取的响应头（加分规则文档的版本和ETag）
+CORS_EXPOSE_HEADERS = ['etag', 'x-scoring-rules-version']
+
 # 媒体文件配置
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -199,3 +203,9 @@ import os
 if not os.path.exists(FILE_UPLOAD_TEMP_DIR):
     os.makedirs(FILE_UPLOAD_TEMP_DIR, exist_ok=True)
 
+
+# 排行榜文件（内存映射，由所有工作进程共享），放在本地磁盘上
+SCORE_LEADERBOARD_PATH = os.path.join(BASE_DIR, 'var', 'score_leaderboard.bin')
+
+# 教师领取待审核申请的默认租约时长（秒），到期未审核自动释放
+REVIEW_LEASE_SECONDS = 600
@@ -0,0 +1,183 @@
+import base64
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from user.models import College, User
+from .pagination import (
+    CountStrategyPagination, CountStrategyPaginator, InvalidCursor, decode_cursor, encode_cursor, paginate_keyset
+)
+
+
+# 测试学生的 (绩点, 专业)：包含并列的绩点和为空的绩点、专业
+STUDENTS = [
+    (3.5, 'CS'), (3.5, 'CS'), (3.5, 'SE'), (3.9, None), (2.8, 'SE'),
+    (None, 'CS'), (3.1, None), (None, None), (3.9, 'EE'), (None, 'SE'), (2.8, 'CS'),
+]
+
+
+class StudentsMixin:
+    @classmethod
+    def setUpTestData(cls):
+        college = College.objects.create(name='信息学院')
+        for index, (gpa, major) in enumerate(STUDENTS):
+            User.objects.create_user(
+                school_id=f's{index}', name=f'学生{index}', college=college, user_type='student',
+                gpa=gpa, major=major, password='x'
+            )
+
+    def setUp(self):
+        self.queryset = User.objects.filter(user_type='student')
+
+
+class KeysetPaginationTest(StudentsMixin, TestCase):
+    """键集分页：逐页读取时每条记录恰好出现一次，顺序与 (排序字段, id) 一致，空值排在最后"""
+
+    def expected_ids(self, ordering):
+        field = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+        users = list(self.queryset)
+        present = sorted(
+            (user for user in users if getattr(user, field) is not None),
+            key=lambda user: (getattr(user, field), user.id), reverse=descending
+        )
+        missing = sorted((user for user in users if getattr(user, field) is None), key=lambda user: user.id,
+                         reverse=descending)
+        return [user.id for user in present + missing]
+
+    def walk(self, ordering, page_size):
+        """逐页读取，返回 (记录ID列表, 各页游标)"""
+        ids, cursors, cursor = [], [], None
+        while True:
+            rows, cursor = paginate_keyset(self.queryset, ordering, cursor=cursor, page_size=page_size)
+            ids += [row.id for row in rows]
+            if cursor is None:
+                return ids, cursors
+            cursors.append(cursor)
+            self.assertLessEqual(len(cursors), len(STUDENTS))
+
+    def test_walk_returns_every_row_once(self):
+        for ordering in ('gpa', '-gpa', 'major', '-major', 'school_id'):
+            for page_size in (1, 2, 3, 4, len(STUDENTS), len(STUDENTS) + 1):
+                with self.subTest(ordering=ordering, page_size=page_size):
+                    ids, _ = self.walk(ordering, page_size)
+                    self.assertEqual(ids, self.expected_ids(ordering))
+
+    def test_page_boundary_inside_ties(self):
+        # 前3页每页2条：第2页在并列的绩点3.5中间结束
+        ids, cursors = self.walk('gpa', 2)
+        values = [decode_cursor(cursor, 'gpa')[0] for cursor in cursors]
+        self.assertEqual(values[:3], [2.8, 3.5, 3.5])
+        self.assertEqual(ids, self.expected_ids('gpa'))
+
+    def test_cursor_moves_into_null_segment(self):
+        present = sum(1 for gpa, _ in STUDENTS if gpa is not None)
+        # 第一页正好取完非空部分，游标仍为非空值；第二页只来自空值部分
+        rows, cursor = paginate_keyset(self.queryset, '-gpa', page_size=present)
+        self.assertIsNotNone(decode_cursor(cursor, '-gpa')[0])
+        rows, cursor = paginate_keyset(self.queryset, '-gpa', cursor=cursor, page_size=2)
+        self.assertEqual([row.gpa for row in rows], [None, None])
+        # 已在空值部分时游标的排序键为空，只按 id 继续
+        self.assertIsNone(decode_cursor(cursor, '-gpa')[0])
+        rows, cursor = paginate_keyset(self.queryset, '-gpa', cursor=cursor, page_size=2)
+        self.assertEqual([row.gpa for row in rows], [None])
+        self.assertIsNone(cursor)
+
+    def test_page_size_is_clamped(self):
+        rows, cursor = paginate_keyset(self.queryset, 'gpa', page_size=0)
+        self.assertEqual(len(rows), 1)
+        self.assertIsNotNone(cursor)
+        with self.assertRaises(ValueError):
+            paginate_keyset(self.queryset, 'gpa', page_size='x')
+
+    def test_invalid_cursor(self):
+        def encode(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii').rstrip('=')
+
+        _, cursor = paginate_keyset(self.queryset, 'gpa', page_size=2)
+        for bad_cursor in ('不是游标', '!!!', encode(['gpa', 3.5]), encode({'o': 'gpa', 'v': 3.5}), cursor[:-3]):
+            with self.subTest(cursor=bad_cursor):
+                with self.assertRaisesMessage(InvalidCursor, '无效的分页游标'):
+                    paginate_keyset(self.queryset, 'gpa', cursor=bad_cursor)
+
+        with self.assertRaisesMessage(InvalidCursor, '分页游标与当前排序方式不一致'):
+            paginate_keyset(self.queryset, '-gpa', cursor=cursor)
+        with self.assertRaisesMessage(InvalidCursor, '分页游标与当前排序方式不一致'):
+            paginate_keyset(self.queryset, 'major', cursor=encode_cursor('gpa', 3.5, self.queryset[0].pk))
+
+
+class CountStrategyPaginatorTest(StudentsMixin, TestCase):
+    """总数统计：精确总数按查询条件缓存；使用估算值时页码不受估算的总页数限制"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.ordered = self.queryset.order_by('school_id')
+
+    def estimated(self, estimate):
+        """估算行数为 estimate，且估算值总会被采用"""
+        patches = [
+            mock.patch('xmuhelper.pagination.estimate_count', return_value=estimate),
+            mock.patch('xmuhelper.pagination.ESTIMATED_COUNT_THRESHOLD', 1),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_exact_count_is_cached_per_query(self):
+        paginator = CountStrategyPaginator(self.ordered, 4)
+        self.assertEqual((paginator.count, paginator.count_exact), (len(STUDENTS), True))
+        with self.assertNumQueries(0):
+            self.assertEqual(CountStrategyPaginator(self.ordered, 4).count, len(STUDENTS))
+        with self.assertNumQueries(1):
+            self.assertEqual(CountStrategyPaginator(self.ordered.filter(major='CS'), 4).count, 4)
+
+        paginator = CountStrategyPaginator(self.ordered, 4)
+        self.assertFalse(paginator.page(3).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+    def test_estimated_count_allows_pages_past_estimate(self):
+        self.estimated(3)
+        paginator = CountStrategyPaginator(self.ordered, 2)
+        self.assertEqual((paginator.count, paginator.count_exact), (3, False))
+        self.assertEqual(paginator.num_pages, 2)
+
+        # 估算只有2页，实际有6页
+        ids = []
+        for number in range(1, 7):
+            page = paginator.page(number)
+            ids += [user.id for user in page]
+            self.assertEqual(page.has_next(), number < 6)
+        self.assertEqual(ids, list(self.ordered.values_list('id', flat=True)))
+
+        with self.assertRaises(EmptyPage):
+            paginator.page(7)
+        with self.assertRaises(EmptyPage):
+            paginator.page(0)
+        with self.assertRaises(PageNotAnInteger):
+            paginator.page('x')
+
+    def test_estimate_ignored_when_not_allowed(self):
+        self.estimated(3)
+        paginator = CountStrategyPaginator(self.ordered, 2)
+        paginator.allow_estimate = False
+        self.assertEqual((paginator.count, paginator.count_exact), (len(STUDENTS), True))
+        with self.assertRaises(EmptyPage):
+            paginator.page(7)
+
+    def test_response_reports_count_exact(self):
+        self.estimated(3)
+        pagination = CountStrategyPagination()
+        pagination.page_size = 4
+        request = Request(APIRequestFactory().get('/', {'page': 3}))
+        rows = pagination.paginate_queryset(self.ordered, request)
+        self.assertEqual(len(rows), len(STUDENTS) - 8)
+        data = pagination.get_paginated_response([user.school_id for user in rows]).data
+        self.assertEqual((data['count'], data['count_exact'], data['next']), (3, False, None))